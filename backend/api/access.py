@@ -0,0 +1,109 @@
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Response
+from pydantic import BaseModel, Field
+
+from backend.engines.request_engine import request_engine
+from backend.stores.identity_store import identity_store
+from backend.stores.request_store import AccessRequest, request_store
+
+router = APIRouter()
+
+
+class AccessRequestCreate(BaseModel):
+    requester_id: str
+    entitlement: str
+    justification: str
+
+
+class AccessRequestAction(BaseModel):
+    approver_id: str
+    reason: Optional[str] = None
+
+
+@router.post("/api/requests")
+def submit_request(req: AccessRequestCreate) -> AccessRequest:
+    try:
+        return request_engine.submit_request(
+            req.requester_id, req.entitlement, req.justification
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/api/requests")
+def list_requests(
+    response: Response,
+    status: Optional[str] = None,
+    requester_id: Optional[str] = None,
+    target_identity_id: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+) -> List[AccessRequest]:
+    """List access requests newest first.
+
+    When a page is full, the cursor for the next page is returned in the
+    ``X-Next-Cursor`` header.
+    """
+    try:
+        requests = request_store.list_requests(
+            status, requester_id, target_identity_id, limit=limit, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if limit is not None and len(requests) == limit:
+        response.headers["X-Next-Cursor"] = requests[-1].id
+    return requests
+
+
+@router.post("/api/requests/{request_id}/approve")
+def approve_request(request_id: str, action: AccessRequestAction) -> AccessRequest:
+    try:
+        return request_engine.approve_request(request_id, action.approver_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/api/requests/{request_id}/reject")
+def reject_request(request_id: str, action: AccessRequestAction) -> AccessRequest:
+    try:
+        return request_engine.reject_request(
+            request_id, action.approver_id, action.reason or "No reason provided"
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/api/approvers/{approver_id}/inbox")
+def approver_inbox(approver_id: str) -> List[AccessRequest]:
+    """Pending access requests routed to an approver."""
+    if identity_store.get_identity(approver_id) is None:
+        raise HTTPException(status_code=404, detail="Approver not found")
+    return request_engine.inbox(approver_id)
+
+
+class BulkDecisionItem(BaseModel):
+    request_id: str
+    decision: str  # approve, reject
+    reason: Optional[str] = None
+
+
+class BulkDecision(BaseModel):
+    approver_id: str
+    decisions: List[BulkDecisionItem] = Field(..., max_length=1000)
+
+
+@router.post("/api/requests:bulk-decision")
+def bulk_decision(body: BulkDecision) -> Dict[str, Any]:
+    """Approve or reject many requests; returns one outcome per item."""
+    try:
+        results = request_engine.decide_requests(
+            body.approver_id, [item.model_dump() for item in body.decisions]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "results": results,
+        "decided": sum(1 for r in results if r["status"] != "error"),
+        "errors": sum(1 for r in results if r["status"] == "error"),
+    }
@@ -0,0 +1,81 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Iterator, List, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+
+from backend.stores.audit_log import AuditEvent, audit_log_store
+
+router = APIRouter()
+
+
+@router.get("/api/audit/logs", response_model=List[AuditEvent])
+def list_audit_logs(
+    response: Response,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    target: Optional[str] = None,
+    actor: Optional[str] = None,
+    action: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+) -> List[AuditEvent]:
+    """List audit events newest first within ``[start, end)``.
+
+    When a page is full, the cursor for the next page is returned in the
+    ``X-Next-Cursor`` header.
+    """
+    try:
+        logs = audit_log_store.query_logs(
+            start, end, target, actor, action, limit=limit, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if len(logs) == limit:
+        response.headers["X-Next-Cursor"] = audit_log_store.cursor_for(logs[-1])
+    return logs
+
+
+_AUDIT_CSV_COLUMNS = ["id", "timestamp", "actor", "action", "target", "status"]
+
+
+def _export_audit_logs(events: Iterator[AuditEvent], fmt: str) -> Iterator[str]:
+    if fmt == "ndjson":
+        for event in events:
+            yield event.model_dump_json() + "\n"
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(_AUDIT_CSV_COLUMNS + ["details"])
+    for event in events:
+        writer.writerow(
+            [getattr(event, column) for column in _AUDIT_CSV_COLUMNS]
+            + [json.dumps(event.details) if event.details is not None else ""]
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+@router.get("/api/audit/export")
+def export_audit_logs(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    target: Optional[str] = None,
+    actor: Optional[str] = None,
+    action: Optional[str] = None,
+) -> StreamingResponse:
+    """Stream matching audit events oldest first as NDJSON or CSV."""
+    events = audit_log_store.iter_logs(start, end, target, actor, action)
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/csv"
+    return StreamingResponse(
+        _export_audit_logs(events, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="audit_logs.{format}"'},
+    )
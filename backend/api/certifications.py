@@ -0,0 +1,100 @@
+import json
+from typing import Any, Dict, Iterator, List
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from backend.engines.certification_engine import Campaign, certification_engine
+
+router = APIRouter()
+
+
+class CampaignCreate(BaseModel):
+    name: str
+    scope_type: str  # department, system, entitlement
+    scope_value: str
+    created_by: str = "system"
+
+
+class CertificationDecision(BaseModel):
+    identity_id: str
+    entitlement: str
+    decision: str  # certify, revoke
+
+
+class CertificationDecisionBatch(BaseModel):
+    reviewer_id: str
+    decisions: List[CertificationDecision]
+
+
+@router.post("/api/certifications")
+def create_campaign(req: CampaignCreate) -> Campaign:
+    try:
+        return certification_engine.create_campaign(
+            req.name, req.scope_type, req.scope_value, created_by=req.created_by
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/api/certifications")
+def list_campaigns() -> List[Campaign]:
+    return certification_engine.list_campaigns()
+
+
+@router.get("/api/certifications/{campaign_id}")
+def get_campaign(campaign_id: str) -> Campaign:
+    campaign = certification_engine.get_campaign(campaign_id)
+    if not campaign:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return campaign
+
+
+def _ndjson(items: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    for item in items:
+        yield json.dumps(item) + "\n"
+
+
+@router.get("/api/certifications/{campaign_id}/items")
+def stream_campaign_items(
+    campaign_id: str, pending_only: bool = False
+) -> StreamingResponse:
+    """Stream the campaign's review items as NDJSON."""
+    if not certification_engine.get_campaign(campaign_id):
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    items = certification_engine.iter_items(campaign_id, pending_only=pending_only)
+    return StreamingResponse(_ndjson(items), media_type="application/x-ndjson")
+
+
+@router.post("/api/certifications/{campaign_id}/decisions")
+def record_decisions(
+    campaign_id: str, batch: CertificationDecisionBatch
+) -> Dict[str, Any]:
+    try:
+        return certification_engine.record_decisions(
+            campaign_id,
+            (decision.model_dump() for decision in batch.decisions),
+            reviewer=batch.reviewer_id,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/api/certifications/{campaign_id}/revocations")
+def apply_revocations(
+    campaign_id: str, batch_size: int = Query(500, ge=1, le=10000)
+) -> Dict[str, Any]:
+    """Apply the next batch of queued revocations."""
+    try:
+        return certification_engine.apply_revocations(campaign_id, batch_size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/api/certifications/{campaign_id}/complete")
+def complete_campaign(campaign_id: str) -> Campaign:
+    try:
+        return certification_engine.complete_campaign(campaign_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,94 @@
+import hashlib
+from typing import List, Optional, Set
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+
+from backend.stores.identity_store import IdentityProfile, identity_store
+from backend.stores.org_hierarchy import org_hierarchy
+
+router = APIRouter()
+
+
+@router.get("/api/identities")
+def list_identities(
+    request: Request,
+    department: Optional[str] = None,
+    status: Optional[str] = None,
+    lifecycle_state: Optional[str] = None,
+    manager_id: Optional[str] = None,
+    risk_score: Optional[str] = None,
+    email: Optional[str] = None,
+    sort: str = "created_at",
+    fields: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+) -> Response:
+    """List identities, optionally filtered, sorted and paginated.
+
+    ``sort`` names a field, prefixed with ``-`` for descending order, and
+    ``fields`` is a comma-separated projection (e.g. ``id,email,status``).
+    When a page is full, the cursor for the next page is returned in the
+    ``X-Next-Cursor`` header. Pages carry an ``ETag`` derived from the query
+    and the versions of the identities on it; a matching ``If-None-Match``
+    gets an empty 304 response.
+    """
+    include: Optional[Set[str]] = None
+    if fields:
+        include = {name.strip() for name in fields.split(",") if name.strip()}
+        unknown = sorted(include - set(IdentityProfile.model_fields))
+        if unknown:
+            raise HTTPException(
+                status_code=400, detail=f"Unknown fields: {', '.join(unknown)}"
+            )
+    descending = sort.startswith("-")
+    sort_field = sort.lstrip("-")
+    try:
+        identities = identity_store.query_identities(
+            {
+                "department": department,
+                "status": status,
+                "lifecycle_state": lifecycle_state,
+                "manager_id": manager_id,
+                "risk_score": risk_score,
+                "email": email,
+            },
+            sort=sort_field,
+            descending=descending,
+            limit=limit,
+            cursor=cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    headers = {}
+    if limit is not None and len(identities) == limit:
+        headers["X-Next-Cursor"] = identity_store.cursor_for(identities[-1], sort_field)
+
+    digest = hashlib.sha1(str(request.url.query).encode())
+    for identity in identities:
+        digest.update(f"{identity.id}:{identity.version};".encode())
+    headers["ETag"] = f'"{digest.hexdigest()}"'
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+
+    # Models are serialised directly instead of being re-validated
+    body = ",".join(
+        identity.model_dump_json(include=include) for identity in identities
+    )
+    return Response(content=f"[{body}]", media_type="application/json", headers=headers)
+
+
+@router.get("/api/identities/{identity_id}")
+def get_identity(identity_id: str) -> IdentityProfile:
+    identity = identity_store.get_identity(identity_id)
+    if not identity:
+        raise HTTPException(status_code=404, detail="Identity not found")
+    return identity
+
+
+@router.get("/api/identities/{identity_id}/management-chain")
+def get_management_chain(identity_id: str) -> List[str]:
+    """Ids of the identity's manager, skip-level manager and so on."""
+    if identity_store.get_identity(identity_id) is None:
+        raise HTTPException(status_code=404, detail="Identity not found")
+    return org_hierarchy.management_chain(identity_id)
@@ -0,0 +1,222 @@
+import codecs
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from starlette.types import Receive, Scope, Send
+
+from backend.config import settings
+from backend.engines.jml_engine import jml_engine
+
+router = APIRouter()
+
+
+class HRFeedEvent(BaseModel):
+    # Unique id from the HR system; redelivered events with the same id are
+    # answered from the dedupe cache instead of being processed again.
+    event_id: Optional[str] = None
+    event_type: str
+    employee_id: str
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    email: Optional[str] = None
+    department: Optional[str] = None
+    job_title: Optional[str] = None
+    manager_id: Optional[str] = None
+    location: Optional[str] = None
+
+
+@router.post("/api/hr/event")
+def trigger_hr_event(event: HRFeedEvent) -> Dict[str, Any]:
+    """Simulate an event coming from the HR system (Workday/BambooHR)."""
+    payload = event.model_dump(exclude_none=True)
+    result = jml_engine.process_event(event.event_type, payload)
+    return result
+
+
+class HREventStreamParser:
+    """Incrementally parse an HR feed body into JSON records.
+
+    Accepts either a single JSON array of events or newline-delimited JSON
+    (NDJSON). The format is detected from the first non-whitespace character.
+    Only the current, not yet complete record is buffered; a record still
+    incomplete after ``max_record_chars`` characters is rejected as malformed.
+    """
+
+    def __init__(self, max_record_chars: Optional[int] = None) -> None:
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._mode: Optional[str] = None  # "array" or "ndjson"
+        self._array_closed = False
+        self._expect_value = True
+        self._after_comma = False
+        self._max_record_chars = (
+            max_record_chars
+            if max_record_chars is not None
+            else settings.HR_BATCH_MAX_RECORD_CHARS
+        )
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        """Consume a chunk of the body and return every completed record."""
+        self._buffer += self._text.decode(chunk)
+        return self._drain(final=False)
+
+    def close(self) -> List[Any]:
+        """Flush the remaining buffer at end of body."""
+        self._buffer += self._text.decode(b"", final=True)
+        records = self._drain(final=True)
+        if self._mode == "array" and not self._array_closed:
+            raise ValueError("Unterminated JSON array")
+        return records
+
+    def _drain(self, final: bool) -> List[Any]:
+        if self._mode is None:
+            stripped = self._buffer.lstrip()
+            if not stripped:
+                self._buffer = ""
+                return []
+            if stripped[0] == "[":
+                self._mode = "array"
+                self._buffer = stripped[1:]
+            else:
+                self._mode = "ndjson"
+                self._buffer = stripped
+
+        if self._mode == "ndjson":
+            return self._drain_ndjson(final)
+        return self._drain_array(final)
+
+    def _drain_ndjson(self, final: bool) -> List[Any]:
+        *lines, self._buffer = self._buffer.split("\n")
+        if final:
+            lines.append(self._buffer)
+            self._buffer = ""
+        elif len(self._buffer) > self._max_record_chars:
+            raise ValueError(f"NDJSON line exceeds {self._max_record_chars} characters")
+        records = []
+        for line in lines:
+            line = line.strip()
+            if line:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"Malformed NDJSON line: {e}") from e
+        return records
+
+    def _drain_array(self, final: bool) -> List[Any]:
+        records = []
+        pos = 0
+        buf = self._buffer
+        while True:
+            while pos < len(buf) and buf[pos].isspace():
+                pos += 1
+            if pos >= len(buf):
+                break
+            if self._array_closed:
+                raise ValueError("Unexpected data after JSON array")
+            char = buf[pos]
+            if char == "]":
+                if self._after_comma:
+                    raise ValueError("Trailing ',' in JSON array")
+                self._array_closed = True
+                pos += 1
+                continue
+            if not self._expect_value:
+                if char != ",":
+                    raise ValueError(f"Expected ',' or ']' in JSON array, got {char!r}")
+                self._expect_value = True
+                self._after_comma = True
+                pos += 1
+                continue
+            if char == ",":
+                raise ValueError("Expected a value in JSON array, got ','")
+            try:
+                record, end = self._decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError as e:
+                if final or len(buf) - pos > self._max_record_chars:
+                    raise ValueError(f"Malformed JSON array element: {e}") from e
+                break  # Record is incomplete, wait for more data
+            records.append(record)
+            self._expect_value = False
+            self._after_comma = False
+            pos = end
+        self._buffer = buf[pos:]
+        return records
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """Streaming response whose body iterator reads the request body itself.
+
+    The stock response listens for client disconnects on ``receive`` while it
+    streams, which would steal body chunks from the iterator. Here the request
+    stream is the only consumer and surfaces disconnects on its own.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+def _process_records(records: List[Any], start: int) -> bytes:
+    """Validate a parsed slice of the feed and run it through the JML engine."""
+    results: Dict[int, Dict[str, Any]] = {}
+    events: List[Tuple[str, Dict[str, Any]]] = []
+    indexes: List[int] = []
+
+    for index, record in enumerate(records, start):
+        if not isinstance(record, dict):
+            results[index] = {
+                "index": index,
+                "status": "error",
+                "message": "Event must be a JSON object",
+            }
+            continue
+        try:
+            event = HRFeedEvent(**record)
+        except ValidationError as e:
+            results[index] = {"index": index, "status": "error", "message": str(e)}
+            continue
+        events.append((event.event_type, event.model_dump(exclude_none=True)))
+        indexes.append(index)
+
+    for index, result in zip(indexes, jml_engine.process_events(events)):
+        results[index] = {"index": index, **result}
+
+    return b"".join(
+        json.dumps(results[i], default=str).encode() + b"\n" for i in sorted(results)
+    )
+
+
+async def _stream_batch_results(request: Request) -> AsyncIterator[bytes]:
+    parser = HREventStreamParser()
+    processed = 0
+    try:
+        async for chunk in request.stream():
+            records = parser.feed(chunk)
+            if records:
+                yield await run_in_threadpool(_process_records, records, processed)
+                processed += len(records)
+        records = parser.close()
+        if records:
+            yield await run_in_threadpool(_process_records, records, processed)
+    except ValueError as e:
+        # Events before the parse error have already been processed.
+        error = {"index": None, "status": "error", "message": str(e)}
+        yield json.dumps(error).encode() + b"\n"
+
+
+@router.post("/api/hr/events:batch")
+async def trigger_hr_events_batch(request: Request) -> DuplexStreamingResponse:
+    """Ingest a batch of HR events from a JSON array or an NDJSON stream.
+
+    Events are processed as they are parsed and one NDJSON result line is
+    streamed back per event, in input order.
+    """
+    return DuplexStreamingResponse(
+        _stream_batch_results(request), media_type="application/x-ndjson"
+    )
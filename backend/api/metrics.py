@@ -0,0 +1,64 @@
+from typing import Dict
+
+from fastapi import APIRouter, Response
+
+from backend.engines.reconciliation_engine import reconciliation_engine
+from backend.metrics import LabelValues, metrics
+from backend.stores.audit_log import audit_log_store
+from backend.stores.event_cache import hr_event_cache
+from backend.stores.identity_store import identity_store
+from backend.stores.outbox_store import outbox_store
+from backend.stores.request_store import request_store
+
+router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _store_records() -> Dict[LabelValues, float]:
+    return {
+        ("identity",): identity_store.count(),
+        ("access_request",): request_store.count(),
+        ("audit_event",): audit_log_store.count(),
+        ("outbox_operation",): outbox_store.count(),
+        ("hr_event_cache",): len(hr_event_cache),
+    }
+
+
+def _queue_depths() -> Dict[LabelValues, float]:
+    depths = outbox_store.queue_depths()
+    sink = audit_log_store.sink
+    return {
+        ("outbox_scheduled",): depths["scheduled"],
+        ("outbox_waiting",): depths["waiting"],
+        ("access_requests_pending",): request_store.count("pending"),
+        ("audit_sink",): sink.queue_depth if sink is not None else 0,
+        ("reconciliation_pending",): reconciliation_engine.pending_identities,
+    }
+
+
+metrics.gauge(
+    "iga_store_records", "Records held by each store", ("store",), _store_records
+)
+metrics.gauge(
+    "iga_identities",
+    "Identities by status",
+    ("status",),
+    lambda: {(status,): n for status, n in identity_store.status_counts().items()},
+)
+metrics.gauge(
+    "iga_outbox_operations",
+    "Outbox operations by status",
+    ("status",),
+    lambda: {(status,): n for status, n in outbox_store.status_counts().items()},
+)
+metrics.gauge(
+    "iga_queue_depth", "Work waiting in each queue", ("queue",), _queue_depths
+)
+
+
+@router.get("/metrics")
+def get_metrics() -> Response:
+    """Counters, latency histograms, store sizes and queue depths in the
+    Prometheus text format."""
+    return Response(content=metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,25 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException
+
+from backend.engines.outbox_engine import outbox_engine
+from backend.stores.outbox_store import OutboxOperation, outbox_store
+
+router = APIRouter()
+
+
+@router.get("/api/outbox")
+def list_outbox(status: Optional[str] = None) -> List[OutboxOperation]:
+    """List connector operations, e.g. ``status=dead`` for the dead letters."""
+    return outbox_store.list_operations(status)
+
+
+@router.post("/api/outbox/{operation_id}/retry")
+def retry_outbox_operation(operation_id: str) -> OutboxOperation:
+    """Re-queue a dead-lettered operation and its dependents."""
+    try:
+        op = outbox_store.retry_dead(operation_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    outbox_engine.flush()
+    return outbox_store.get(op.id) or op
@@ -0,0 +1,40 @@
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, HTTPException
+
+from backend.engines.policy_engine import policy_engine
+from backend.engines.risk_engine import risk_engine
+
+router = APIRouter()
+
+
+@router.get("/api/policy")
+def get_policy() -> Dict[str, Any]:
+    """The birthright and SoD policy currently in force."""
+    return {
+        **policy_engine.policy.to_dict(),
+        "source": policy_engine.policy_file,
+        "loaded_at": policy_engine.loaded_at,
+    }
+
+
+@router.post("/api/policy/reload")
+def reload_policy() -> Dict[str, Any]:
+    """Reload the policy file; the current policy stays on failure."""
+    previous = policy_engine.policy_version
+    try:
+        policy = policy_engine.reload()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"previous_version": previous, "version": policy.version}
+
+
+@router.post("/api/policy/scan")
+def scan_policy(
+    update_risk: bool = True, use_numpy: Optional[bool] = None
+) -> Dict[str, Any]:
+    """Evaluate SoD rules across the whole identity population."""
+    try:
+        return risk_engine.scan_population(update_risk=update_risk, use_numpy=use_numpy)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,26 @@
+from typing import Any, Dict
+
+from fastapi import APIRouter, HTTPException
+
+from backend.engines.reconciliation_engine import reconciliation_engine
+
+router = APIRouter()
+
+
+@router.post("/api/reconciliation/run")
+def run_reconciliation(full: bool = False, remediate: bool = False) -> Dict[str, Any]:
+    """Compare connector memberships with entitlements, re-diffing only what
+    changed since the last run unless ``full`` is set."""
+    try:
+        return reconciliation_engine.run(full=full, remediate=remediate)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/api/reconciliation/report")
+def get_reconciliation_report() -> Dict[str, Any]:
+    """The report of the most recent run."""
+    report = reconciliation_engine.last_report
+    if report is None:
+        raise HTTPException(status_code=404, detail="No reconciliation has run yet")
+    return report
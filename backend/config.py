@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List, Optional
 
 
 class Settings(BaseSettings):
@@ -13,8 +13,60 @@ class Settings(BaseSettings):
     SLACK_ENABLED: bool = True
     JIRA_ENABLED: bool = True
 
+    # Audit Settings
+    # Directory for durable JSONL audit segments; None keeps audit in memory only.
+    AUDIT_LOG_DIR: Optional[str] = None
+    AUDIT_SEGMENT_MAX_BYTES: int = 64 * 1024 * 1024
+    AUDIT_FSYNC_EVERY: int = 256  # group commit: fsync every N events...
+    AUDIT_FSYNC_INTERVAL_MS: int = 100  # ...or every T milliseconds
+    AUDIT_QUEUE_SIZE: int = 10000
+    AUDIT_CLOSE_TIMEOUT_SECONDS: float = 30  # bound on the shutdown flush
+
+    # Persistence Settings
+    # Directory for the identity/request write-ahead log; None keeps state in memory.
+    PERSISTENCE_DIR: Optional[str] = None
+    PERSISTENCE_FSYNC_EVERY: int = 256
+    PERSISTENCE_FSYNC_INTERVAL_MS: int = 100
+    PERSISTENCE_SNAPSHOT_EVERY: int = 100000  # WAL records between snapshots
+
+    # Provisioning Settings
+    PROVISION_MAX_WORKERS: int = 16
+    PROVISION_CONNECTOR_CONCURRENCY: int = 4  # default in-flight calls per connector
+    PROVISION_CONCURRENCY_LIMITS: Dict[str, int] = {}  # e.g. {"GitHub": 2}
+    PROVISION_RATE_LIMITS: Dict[str, float] = {}  # calls per second, e.g. {"Slack": 1}
+
+    # HR Event Settings
+    # Processed event ids remembered for deduplication of redelivered events
+    EVENT_DEDUPE_MAX_ENTRIES: int = 100000
+    EVENT_DEDUPE_TTL_SECONDS: int = 7 * 24 * 3600
+    # Largest single record buffered by the batch endpoint before the body is
+    # rejected as malformed
+    HR_BATCH_MAX_RECORD_CHARS: int = 1024 * 1024
+
+    # Outbox Settings
+    # Run connector operations on a background dispatcher; when False they
+    # run inline on the calling thread (failed attempts are still retried).
+    OUTBOX_BACKGROUND: bool = True
+    OUTBOX_MAX_ATTEMPTS: int = 8  # attempts before dead-lettering
+    OUTBOX_BACKOFF_BASE_MS: int = 500
+    OUTBOX_BACKOFF_MAX_MS: int = 300000
+    OUTBOX_BATCH_SIZE: int = 256
+    # Done operations are forgotten after this long; resubmitting the same
+    # idempotency key within the window is still recognised as a duplicate.
+    OUTBOX_RETENTION_SECONDS: int = 7 * 24 * 3600
+    OUTBOX_PRUNE_INTERVAL_SECONDS: int = 60
+
     # Policy Settings
+    # Departments with birthright tables; others in the policy file are ignored.
     BIRTHRIGHT_DEPARTMENTS: List[str] = ["Engineering", "Sales", "Marketing", "HR"]
+    # Versioned birthright/SoD policy; None uses backend/policies/policy.json.
+    POLICY_FILE: Optional[str] = None
+    POLICY_RELOAD_INTERVAL_SECONDS: float = 30  # 0 disables hot reload
+
+    # Concurrency Settings
+    # Per-employee lock stripes: events for one employee are serialised,
+    # events for employees in different stripes run in parallel.
+    EMPLOYEE_LOCK_STRIPES: int = 256
 
     class Config:
         env_file = ".env"
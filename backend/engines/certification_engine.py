@@ -0,0 +1,354 @@
+import logging
+import threading
+import uuid
+from datetime import datetime
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from backend.engines.jml_engine import jml_engine
+from backend.stores.audit_log import audit_log_store
+from backend.stores.identity_store import IdentityProfile, identity_store
+
+logger = logging.getLogger("CertificationEngine")
+
+SCOPE_TYPES = ("department", "system", "entitlement")
+DECISIONS = ("certify", "revoke")
+
+
+class CampaignProgress(BaseModel):
+    # Items in scope when the campaign was created. It is not updated when
+    # the population changes, so ``decided`` may end up above or below it.
+    total_items: int = 0
+    decided: int = 0
+    certified: int = 0
+    revoked: int = 0
+    revocations_applied: int = 0
+    revocations_pending: int = 0
+
+
+class Campaign(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    name: str
+    scope_type: str  # department, system, entitlement
+    scope_value: str
+    status: str = "active"  # active, completed
+    created_by: str = "system"
+    created_at: datetime = Field(default_factory=datetime.now)
+    completed_at: Optional[datetime] = None
+    progress: CampaignProgress = Field(default_factory=CampaignProgress)
+
+
+class _CampaignState:
+    """Decisions and queued revocations kept alongside a campaign."""
+
+    def __init__(self) -> None:
+        # Guards the fields below and the campaign's progress
+        self.lock = threading.RLock()
+        # (identity_id, entitlement) -> decision
+        self.decisions: Dict[Tuple[str, str], str] = {}
+        # identity_id -> entitlements awaiting revocation, in decision order
+        self.pending: Dict[str, List[str]] = {}
+
+
+class CertificationEngine:
+    """Access certification campaigns over the identity store.
+
+    A campaign only stores its scope and the decisions made so far. Review
+    items (one per identity x entitlement in scope) are generated on demand
+    from the live identity store, so a campaign covering millions of rows
+    never materialises them. Revoke decisions are queued per identity and
+    applied in batches through the JML revocation path.
+
+    Because recounting would mean another pass over the whole scope,
+    ``progress.total_items`` is a snapshot taken at creation, while the items
+    themselves follow the live store.
+    """
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self._campaigns: Dict[str, Campaign] = {}
+        self._state: Dict[str, _CampaignState] = {}
+
+    def create_campaign(
+        self, name: str, scope_type: str, scope_value: str, created_by: str = "system"
+    ) -> Campaign:
+        if scope_type not in SCOPE_TYPES:
+            raise ValueError(
+                f"Invalid scope_type {scope_type!r}. Expected one of {SCOPE_TYPES}"
+            )
+        campaign = Campaign(
+            name=name,
+            scope_type=scope_type,
+            scope_value=scope_value,
+            created_by=created_by,
+        )
+        # Count the items in one streaming pass; nothing is kept.
+        campaign.progress.total_items = sum(1 for _ in self._scope_items(campaign))
+        self._campaigns[campaign.id] = campaign
+        self._state[campaign.id] = _CampaignState()
+
+        audit_log_store.log_event(
+            "create_campaign",
+            f"campaign:{campaign.id}",
+            actor=created_by,
+            details={
+                "name": name,
+                "scope_type": scope_type,
+                "scope_value": scope_value,
+                "total_items": campaign.progress.total_items,
+            },
+        )
+        logger.info(
+            f"Campaign {campaign.id} ({scope_type}={scope_value}) created with "
+            f"{campaign.progress.total_items} review items"
+        )
+        return campaign
+
+    def get_campaign(self, campaign_id: str) -> Optional[Campaign]:
+        return self._campaigns.get(campaign_id)
+
+    def list_campaigns(self) -> List[Campaign]:
+        return list(self._campaigns.values())
+
+    def iter_items(
+        self, campaign_id: str, pending_only: bool = False
+    ) -> Iterator[Dict[str, Any]]:
+        """Lazily yield the campaign's review items with their decisions."""
+        campaign = self._require(campaign_id)
+        decisions = self._state[campaign_id].decisions
+        for identity, entitlement in self._scope_items(campaign):
+            decision = decisions.get((identity.id, entitlement))
+            if pending_only and decision is not None:
+                continue
+            yield {
+                "identity_id": identity.id,
+                "employee_id": identity.employee_id,
+                "email": identity.email,
+                "department": identity.department,
+                "entitlement": entitlement,
+                "decision": decision,
+            }
+
+    def record_decisions(
+        self,
+        campaign_id: str,
+        decisions: Iterable[Dict[str, str]],
+        reviewer: str = "system",
+    ) -> Dict[str, Any]:
+        """Record a batch of certify/revoke decisions.
+
+        Each decision is ``{"identity_id", "entitlement", "decision"}``.
+        Invalid entries are reported back rather than failing the batch. A
+        later decision on the same item replaces the earlier one.
+        """
+        campaign = self._require(campaign_id)
+        state = self._state[campaign_id]
+        with state.lock:
+            if campaign.status != "active":
+                raise ValueError(f"Campaign is {campaign.status}")
+            recorded, errors = self._record(campaign, state, decisions)
+            progress = campaign.progress.model_dump()
+
+        audit_log_store.log_event(
+            "record_certification_decisions",
+            f"campaign:{campaign_id}",
+            actor=reviewer,
+            details={"recorded": recorded, "errors": len(errors)},
+        )
+        return {"recorded": recorded, "errors": errors, "progress": progress}
+
+    def _record(
+        self,
+        campaign: Campaign,
+        state: _CampaignState,
+        decisions: Iterable[Dict[str, str]],
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """Apply decisions to the campaign state; the caller holds its lock."""
+        progress = campaign.progress
+        recorded = 0
+        errors: List[Dict[str, Any]] = []
+        for index, item in enumerate(decisions):
+            identity_id = item.get("identity_id", "")
+            entitlement = item.get("entitlement", "")
+            decision = item.get("decision", "")
+            error = self._validate_decision(campaign, identity_id, entitlement)
+            if error is None and decision not in DECISIONS:
+                error = f"Invalid decision {decision!r}"
+            if error is not None:
+                errors.append({"index": index, "message": error})
+                continue
+
+            key = (identity_id, entitlement)
+            previous = state.decisions.get(key)
+            if previous == decision:
+                recorded += 1
+                continue
+            if previous is None:
+                progress.decided += 1
+            elif previous == "certify":
+                progress.certified -= 1
+            else:
+                progress.revoked -= 1
+                if self._unqueue(state, identity_id, entitlement):
+                    progress.revocations_pending -= 1
+
+            state.decisions[key] = decision
+            if decision == "certify":
+                progress.certified += 1
+            else:
+                progress.revoked += 1
+                state.pending.setdefault(identity_id, []).append(entitlement)
+                progress.revocations_pending += 1
+            recorded += 1
+        return recorded, errors
+
+    def apply_revocations(
+        self, campaign_id: str, batch_size: int = 500
+    ) -> Dict[str, Any]:
+        """Apply queued revocations for up to ``batch_size`` identities.
+
+        All of an identity's revoked entitlements are removed in one call to
+        the JML revocation path and one identity store update.
+        """
+        campaign = self._require(campaign_id)
+        state = self._state[campaign_id]
+        progress = campaign.progress
+
+        # Claim the batch under the campaign lock; connector calls run
+        # outside it, under each identity's own lock.
+        batch: List[Tuple[str, List[str]]] = []
+        with state.lock:
+            for identity_id in list(islice(state.pending, batch_size)):
+                entitlements = state.pending.pop(identity_id, None)
+                if entitlements is None:
+                    continue
+                progress.revocations_pending -= len(entitlements)
+                batch.append((identity_id, entitlements))
+
+        applied = 0
+        for identity_id, entitlements in batch:
+            with jml_engine.identity_lock(identity_id):
+                held = self._revoke(identity_id, entitlements)
+            applied += len(held)
+            with state.lock:
+                progress.revocations_applied += len(held)
+
+        with state.lock:
+            snapshot = progress.model_dump()
+        if batch:
+            logger.info(
+                f"Campaign {campaign_id}: revoked {applied} entitlements from "
+                f"{len(batch)} identities "
+                f"({snapshot['revocations_pending']} pending)"
+            )
+        return {
+            "identities": len(batch),
+            "revocations_applied": applied,
+            "progress": snapshot,
+        }
+
+    @staticmethod
+    def _revoke(identity_id: str, entitlements: List[str]) -> List[str]:
+        """Revoke the entitlements the identity still holds; returns them."""
+        identity = identity_store.get_identity(identity_id)
+        if identity is None:
+            return []
+        held = [e for e in entitlements if e in identity.entitlements]
+        if held:
+            jml_engine._revoke_entitlements(identity, held)
+            revoked = set(held)
+            identity_store.update_identity(
+                identity.id,
+                {
+                    "entitlements": [
+                        e for e in identity.entitlements if e not in revoked
+                    ]
+                },
+            )
+        return held
+
+    def complete_campaign(self, campaign_id: str, batch_size: int = 500) -> Campaign:
+        """Apply every outstanding revocation and close the campaign."""
+        campaign = self._require(campaign_id)
+        state = self._state[campaign_id]
+        while True:
+            with state.lock:
+                # Close it only once nothing is left queued
+                if not state.pending:
+                    campaign.status = "completed"
+                    campaign.completed_at = datetime.now()
+                    progress = campaign.progress.model_dump()
+                    break
+            self.apply_revocations(campaign_id, batch_size)
+        audit_log_store.log_event(
+            "complete_campaign",
+            f"campaign:{campaign_id}",
+            details=progress,
+        )
+        return campaign
+
+    def _require(self, campaign_id: str) -> Campaign:
+        campaign = self._campaigns.get(campaign_id)
+        if campaign is None:
+            raise ValueError("Campaign not found")
+        return campaign
+
+    def _scope_items(self, campaign: Campaign) -> Iterator[Tuple[IdentityProfile, str]]:
+        """Yield (identity, entitlement) pairs in scope, one at a time."""
+        scope_type, value = campaign.scope_type, campaign.scope_value
+        prefix = f"{value}:"
+        if scope_type == "department":
+            identities = identity_store.find_identities(department=value)
+        else:
+            identities = identity_store.list_identities()
+        for identity in identities:
+            if identity.status == "terminated":
+                continue
+            if scope_type == "department":
+                for entitlement in identity.entitlements:
+                    yield identity, entitlement
+            elif scope_type == "system":
+                for entitlement in identity.entitlements:
+                    if entitlement.startswith(prefix):
+                        yield identity, entitlement
+            elif value in identity.entitlements:
+                yield identity, value
+
+    def _validate_decision(
+        self, campaign: Campaign, identity_id: str, entitlement: str
+    ) -> Optional[str]:
+        identity = identity_store.get_identity(identity_id)
+        if identity is None:
+            return "Identity not found"
+        if not self._in_scope(campaign, identity, entitlement):
+            return "Item is not part of this campaign"
+        return None
+
+    @staticmethod
+    def _in_scope(
+        campaign: Campaign, identity: IdentityProfile, entitlement: str
+    ) -> bool:
+        if identity.status == "terminated" or entitlement not in identity.entitlements:
+            return False
+        if campaign.scope_type == "department":
+            return identity.department == campaign.scope_value
+        if campaign.scope_type == "system":
+            return entitlement.startswith(f"{campaign.scope_value}:")
+        return entitlement == campaign.scope_value
+
+    @staticmethod
+    def _unqueue(state: _CampaignState, identity_id: str, entitlement: str) -> bool:
+        queued = state.pending.get(identity_id)
+        if queued is None or entitlement not in queued:
+            return False
+        queued.remove(entitlement)
+        if not queued:
+            del state.pending[identity_id]
+        return True
+
+
+certification_engine = CertificationEngine()
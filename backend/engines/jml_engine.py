@@ -1,21 +1,115 @@
+import hashlib
 import logging
-from typing import Any, Dict, List
+import time
+from collections import Counter
+from typing import Any, ContextManager, Dict, Iterable, Iterator, List, Optional, Tuple
 from backend.stores.identity_store import IdentityProfile, identity_store
 from backend.stores.audit_log import audit_log_store
+from backend.stores.event_cache import hr_event_cache
+from backend.stores.outbox_store import outbox_store
+from backend.stores.striped_lock import employee_locks
 from backend.engines.policy_engine import policy_engine
+from backend.engines.outbox_engine import outbox_engine
+from backend.metrics import StageTimer, metrics
 from connectors.azuread_connector import azure_ad_connector
 from connectors.github_connector import github_connector
+from connectors.registry import connector_registry
 from connectors.slack_connector import slack_connector
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("JMLEngine")
 
+_FLOWS = {
+    "EmployeeCreated": "joiner",
+    "EmployeeUpdated": "mover",
+    "EmployeeTerminated": "leaver",
+}
+_hr_events = metrics.counter(
+    "iga_hr_events_total", "HR events processed", ("flow", "status")
+)
+_flow_duration = metrics.histogram(
+    "iga_jml_flow_duration_seconds", "Time to process one HR event", ("flow",)
+)
+_stage_duration = metrics.histogram(
+    "iga_jml_stage_duration_seconds",
+    "Time spent in each stage of a JML flow",
+    ("flow", "stage"),
+)
+
 
 class JMLEngine:
+    """Joiner, mover and leaver flows driven by HR events.
+
+    Events may be processed on many threads at once. Each event holds its
+    employee's lock stripe for the whole flow, so events for one employee
+    (including duplicate deliveries) run one after another while events for
+    other employees run in parallel. Access grants and revocations made
+    outside HR events take the same lock through ``identity_lock``.
+    """
+
     def process_event(self, event_type: str, payload: Dict[str, Any]) -> Dict[str, Any]:
         logger.info(f"Processing event: {event_type} for {payload.get('email')}")
+        return self._dispatch(event_type, payload)
+
+    def process_events(
+        self, events: Iterable[Tuple[str, Dict[str, Any]]]
+    ) -> Iterator[Dict[str, Any]]:
+        """Process a stream of HR events in batch mode.
+
+        Events are consumed lazily and one result is yielded per event, in
+        order, so arbitrarily large feeds run in constant memory. Instead of a
+        log line per event, one summary is logged when ``events`` is
+        exhausted; the batch endpoint calls this once per parsed chunk, so a
+        large feed logs one summary per chunk.
+        """
+        totals: Counter[str] = Counter()
+        for event_type, payload in events:
+            result = self._dispatch(event_type, payload)
+            totals[result.get("status", "unknown")] += 1
+            yield {
+                "event_type": event_type,
+                "employee_id": payload.get("employee_id"),
+                **result,
+            }
+        if totals:
+            logger.info(
+                f"Batch processed {sum(totals.values())} events: {dict(totals)}"
+            )
 
+    def identity_lock(self, identity_id: str) -> ContextManager[object]:
+        """The lock serialising lifecycle changes to one identity."""
+        identity = identity_store.get_identity(identity_id)
+        return employee_locks.hold(
+            identity.employee_id if identity is not None else identity_id
+        )
+
+    def _dispatch(self, event_type: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        with employee_locks.hold(payload.get("employee_id")):
+            return self._dispatch_locked(event_type, payload)
+
+    def _dispatch_locked(
+        self, event_type: str, payload: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        started = time.perf_counter()
+        flow = _FLOWS.get(event_type, "unknown")
+        event_id = payload.get("event_id")
+        if event_id is not None:
+            cached = hr_event_cache.get(event_id)
+            if cached is not None:
+                logger.info(f"Duplicate event {event_id} skipped")
+                _hr_events.inc(flow, "duplicate")
+                return {**cached, "duplicate": True}
+
+        result = self._run_handler(event_type, payload)
+        # Failed events are not remembered, so a corrected redelivery runs.
+        if event_id is not None and result.get("status") != "error":
+            hr_event_cache.put(event_id, result)
+        _flow_duration.observe(time.perf_counter() - started, flow)
+        _hr_events.inc(flow, str(result.get("status", "unknown")))
+        return result
+
+    def _run_handler(self, event_type: str, payload: Dict[str, Any]) -> Dict[str, Any]:
         try:
             if event_type == "EmployeeCreated":
                 return self._handle_joiner(payload)
@@ -39,123 +133,121 @@ class JMLEngine:
         3. Provision Downstream Systems
         """
         logger.info("Starting Joiner Flow...")
+        stages = StageTimer(_stage_duration, "joiner")
 
         # 1. Create Identity
         try:
             identity = identity_store.create_identity(data)
-            audit_log_store.log_event("create_identity", identity.email, details=data)
         except ValueError as e:
             logger.error(f"Identity creation failed: {e}")
             return {"status": "error", "message": str(e)}
+        stages.mark("create_identity")
+        audit_log_store.log_event("create_identity", identity.email, details=data)
+        stages.mark("audit")
 
         # 2. Calculate Access
-        entitlements = policy_engine.calculate_birthright_access(identity.department)
+        policy = policy_engine.policy
+        entitlements = list(policy.birthright_access(identity.department))
         logger.info(f"Calculated birthright entitlements: {entitlements}")
+        stages.mark("calculate_access")
 
         # 3. Provision Systems
-        accounts = {}
-
-        # Azure AD
-        azure_user = azure_ad_connector.create_user(
-            {
-                "first_name": identity.first_name,
-                "last_name": identity.last_name,
-                "job_title": identity.job_title,
-                "department": identity.department,
-            }
+        # Account creations and group assignments are recorded in the outbox
+        # and executed (and retried) independently of this HR event; each
+        # assignment waits only for the account it targets.
+        identity = identity_store.update_identity(
+            identity.id, {"entitlements": entitlements}
         )
-        accounts["azure_ad"] = azure_user["userPrincipalName"]
-        audit_log_store.log_event(
-            "provision_account", identity.email, details={"system": "AzureAD"}
-        )
-
-        # Slack (Everyone)
-        slack_user = slack_connector.create_user(
-            {
-                "email": identity.email,
-                "first_name": identity.first_name,
-                "last_name": identity.last_name,
-            }
-        )
-        accounts["slack"] = slack_user["id"]
-        audit_log_store.log_event(
-            "provision_account", identity.email, details={"system": "Slack"}
-        )
-
+        stages.mark("store_update")
+        systems = ["AzureAD", "Slack"]
         # GitHub (Engineering only logic handled by policy,
         # but we need to check if we should provision the user first)
         if any(e.startswith("GitHub:") for e in entitlements):
-            gh_user = github_connector.create_user(
-                {
-                    "first_name": identity.first_name,
-                    "last_name": identity.last_name,
-                    "email": identity.email,
-                }
-            )
-            accounts["github"] = gh_user["username"]
-            audit_log_store.log_event(
-                "provision_account", identity.email, details={"system": "GitHub"}
+            systems.append("GitHub")
+        for system in systems:
+            outbox_engine.submit(
+                "create_account",
+                system,
+                {"identity_id": identity.id, "system": system},
+                idempotency_key=_create_key(identity.id, system),
+                drain=False,
             )
 
         # Assign Entitlements (Groups/Teams)
-        self._provision_entitlements(identity, accounts, entitlements)
-
-        # Update Identity
-        identity_store.update_identity(
-            identity.id, {"accounts": accounts, "entitlements": entitlements}
-        )
+        self._provision_entitlements(identity, entitlements)
+        stages.mark("provision")
 
         logger.info("Joiner Flow Completed Successfully.")
-        return {"status": "success", "identity_id": identity.id}
+        return {
+            "status": "success",
+            "identity_id": identity.id,
+            "policy_version": policy.version,
+        }
 
     def _handle_mover(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Process mover (transfer) event.
 
         Mover Flow:
-        1. Update Identity
-        2. Calculate New Access & Revocation List
-        3. Provision New Access
-        4. Revoke Old Access
+        1. Diff current entitlements against the new birthright access
+        2. Update Identity (attributes and entitlements in one change)
+        3. Provision only the missing access
+        4. Revoke only access the new department does not grant
+
+        Title or manager changes run the same diff, so they also pick up
+        birthright access that is missing.
         """
         logger.info("Starting Mover Flow...")
+        stages = StageTimer(_stage_duration, "mover")
         identity = identity_store.get_identity_by_employee_id(data["employee_id"])
         if not identity:
             return {"status": "error", "message": "Identity not found"}
 
         old_dept = identity.department
         new_dept = data.get("department", old_dept)
-
-        # 1. Update Identity
-        updated_identity = identity_store.update_identity(identity.id, data)
-        audit_log_store.log_event("update_identity", identity.email, details=data)
-
         if old_dept != new_dept:
             logger.info(f"Department change detected: {old_dept} -> {new_dept}")
 
-            # 2. Calculate Access
-            new_entitlements = policy_engine.calculate_birthright_access(new_dept)
-            to_revoke = policy_engine.get_revocation_list(old_dept, new_dept)
-
-            # 3. Provision New Access
-            self._provision_entitlements(
-                updated_identity, updated_identity.accounts, new_entitlements
-            )
-
-            # 4. Revoke Old Access
-            self._revoke_entitlements(
-                updated_identity, updated_identity.accounts, to_revoke
-            )
-
-            # Update Store
-            final_entitlements = list(
-                set(updated_identity.entitlements) - set(to_revoke)
-                | set(new_entitlements)
-            )
-            identity_store.update_identity(
-                identity.id, {"entitlements": final_entitlements}
-            )
-
-        return {"status": "success", "message": "Mover processed"}
+        # 1. Calculate Access
+        policy = policy_engine.policy
+        to_add, to_remove = policy.access_diff(
+            identity.entitlements, old_dept, new_dept
+        )
+        removed = set(to_remove)
+        final_entitlements = [
+            e for e in identity.entitlements if e not in removed
+        ] + to_add
+        stages.mark("calculate_access")
+
+        # 2. Update Identity
+        updated_identity = identity_store.update_identity(
+            identity.id, {**data, "entitlements": final_entitlements}
+        )
+        stages.mark("store_update")
+        audit_log_store.log_event("update_identity", identity.email, details=data)
+        stages.mark("audit")
+
+        # 3. Provision New Access, 4. Revoke Old Access
+        ops = []
+        if to_add:
+            ops += self._provision_entitlements(updated_identity, to_add)
+            stages.mark("provision")
+        if to_remove:
+            ops += self._revoke_entitlements(updated_identity, to_remove)
+            stages.mark("revoke")
+
+        connector_calls: Counter[str] = Counter()
+        for op_id in ops:
+            op = outbox_store.get(op_id)
+            if op is not None:
+                connector_calls[op.connector] += 1
+        return {
+            "status": "success",
+            "message": "Mover processed",
+            "added": to_add,
+            "removed": to_remove,
+            "connector_calls": dict(connector_calls),
+            "policy_version": policy.version,
+        }
 
     def _handle_leaver(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Process leaver (termination) event.
@@ -166,39 +258,24 @@ class JMLEngine:
         3. Update Identity Status
         """
         logger.info("Starting Leaver Flow...")
+        stages = StageTimer(_stage_duration, "leaver")
         identity = identity_store.get_identity_by_employee_id(data["employee_id"])
         if not identity:
             return {"status": "error", "message": "Identity not found"}
 
-        accounts = identity.accounts
-
-        # 1. Disable Azure AD
-        if "azure_ad" in accounts:
-            # We need objectId, but we only stored UPN. In a real app we'd store both.
-            # For simulation, we assume we can find it or the connector handles UPN.
-            # Let's fix the connector usage or store objectId.
-            # Hack for simulation: iterate connector users to find ID.
-            for uid, u in azure_ad_connector.users.items():
-                if u["userPrincipalName"] == accounts["azure_ad"]:
-                    azure_ad_connector.disable_account(uid)
-                    audit_log_store.log_event(
-                        "disable_account", identity.email, details={"system": "AzureAD"}
-                    )
-                    break
-
-        # 2. Suspend GitHub
-        if "github" in accounts:
-            github_connector.remove_user(accounts["github"])
-            audit_log_store.log_event(
-                "disable_account", identity.email, details={"system": "GitHub"}
-            )
-
-        # 3. Deactivate Slack
-        if "slack" in accounts:
-            slack_connector.deactivate_user(identity.email)
-            audit_log_store.log_event(
-                "disable_account", identity.email, details={"system": "Slack"}
+        # 1. Disable Azure AD, 2. Suspend GitHub, 3. Deactivate Slack
+        # Accounts still being created are disabled once they exist.
+        for system, depends_on in self._account_ops(identity).items():
+            outbox_engine.submit(
+                "disable_account",
+                system,
+                {"identity_id": identity.id, "system": system},
+                idempotency_key=f"{identity.id}:disable:{system}",
+                depends_on=depends_on,
+                drain=False,
             )
+        outbox_engine.flush()
+        stages.mark("disable_accounts")
 
         # 4. Update Status
         identity_store.update_identity(
@@ -209,96 +286,322 @@ class JMLEngine:
                 "entitlements": [],  # Clear all
             },
         )
+        stages.mark("store_update")
         audit_log_store.log_event("terminate_identity", identity.email)
+        stages.mark("audit")
 
         return {"status": "success", "message": "Leaver processed"}
 
-    def provision_entitlement(self, identity_id: str, entitlement: str) -> None:
-        """Process leaver (termination) event.
+    def provision_entitlement(
+        self, identity_id: str, entitlement: str, request_id: Optional[str] = None
+    ) -> None:
+        """Grant a single entitlement.
+
+        Used by Access Request Engine. The connector call goes through the
+        outbox; ``request_id`` lets a dead-lettered grant be traced back.
+        """
+        self.provision_entitlements(
+            identity_id, {entitlement: [request_id] if request_id else []}
+        )
+
+    def provision_entitlements(
+        self, identity_id: str, entitlements: Dict[str, List[str]]
+    ) -> None:
+        """Grant several entitlements to one identity.
 
-        Used by Access Request Engine.
+        ``entitlements`` maps each entitlement to the access requests it
+        fulfils, if any. One outbox operation is recorded per connector, the
+        identity is updated once and the audit events are written together.
         """
+        with self.identity_lock(identity_id):
+            self._grant_entitlements(identity_id, entitlements)
+
+    def _grant_entitlements(
+        self, identity_id: str, entitlements: Dict[str, List[str]]
+    ) -> None:
         identity = identity_store.get_identity(identity_id)
         if not identity:
             raise ValueError("Identity not found")
 
         logger.info(
-            f"Provisioning ad-hoc entitlement {entitlement} for {identity.email}"
+            f"Provisioning ad-hoc entitlements {list(entitlements)} for "
+            f"{identity.email}"
+        )
+        self._provision_entitlements(
+            identity, list(entitlements), requests=entitlements
         )
-        self._provision_entitlements(identity, identity.accounts, [entitlement])
 
         # Update Identity Store
-        if entitlement not in identity.entitlements:
-            new_entitlements = identity.entitlements + [entitlement]
+        new_entitlements = [e for e in entitlements if e not in identity.entitlements]
+        if new_entitlements:
             identity_store.update_identity(
-                identity.id, {"entitlements": new_entitlements}
+                identity.id, {"entitlements": identity.entitlements + new_entitlements}
             )
 
-        audit_log_store.log_event(
-            "grant_access",
-            identity.email,
-            details={"entitlement": entitlement, "source": "access_request"},
+        audit_log_store.log_events(
+            {
+                "action": "grant_access",
+                "target": identity.email,
+                "details": {"entitlement": entitlement, "source": "access_request"},
+            }
+            for entitlement in entitlements
         )
 
     def _provision_entitlements(
         self,
         identity: IdentityProfile,
-        accounts: Dict[str, str],
         entitlements: List[str],
-    ) -> None:
-        """Assign groups/teams based on entitlement strings."""
-        for ent in entitlements:
-            system, group = ent.split(":", 1)
+        requests: Optional[Dict[str, List[str]]] = None,
+    ) -> List[str]:
+        """Record one bulk group assignment per connector in the outbox.
 
-            if system == "AzureAD" and "azure_ad" in accounts:
-                # Find ID again (inefficient but works for sim)
-                for uid, u in azure_ad_connector.users.items():
-                    if u["userPrincipalName"] == accounts["azure_ad"]:
-                        azure_ad_connector.add_to_group(uid, group)
-                        break
+        ``requests`` maps entitlements to the access requests they fulfil.
+        Returns the outbox operation ids.
+        """
+        accounts = self._account_ops(identity)
+        ops = []
+        for system, groups in connector_registry.group(entitlements).items():
+            if system not in accounts:
+                continue  # No account in this system
+            payload: Dict[str, Any] = {
+                "identity_id": identity.id,
+                "system": system,
+                "groups": groups,
+            }
+            request_ids = []
+            for group in groups:
+                request_ids += (requests or {}).get(f"{system}:{group}", [])
+            if len(request_ids) == 1:
+                payload["request_id"] = request_ids[0]
+            elif request_ids:
+                payload["request_ids"] = request_ids
+            if requests is not None:
+                # Recorded on the identity before the grant runs, so they
+                # are withdrawn if it is dead-lettered
+                payload["added"] = [
+                    group
+                    for group in groups
+                    if f"{system}:{group}" not in identity.entitlements
+                ]
+            op = outbox_engine.submit(
+                "grant_groups",
+                system,
+                payload,
+                idempotency_key=_operation_key(identity, "grant", system, groups),
+                depends_on=accounts[system],
+                drain=False,
+            )
+            ops.append(op.id)
+        outbox_engine.flush()
+        return ops
 
-            elif system == "GitHub" and "github" in accounts:
-                github_connector.add_to_team(accounts["github"], group)
+    def _revoke_entitlements(
+        self, identity: IdentityProfile, entitlements: List[str]
+    ) -> List[str]:
+        """Record one bulk group removal per connector in the outbox."""
+        accounts = self._account_ops(identity)
+        ops = []
+        for system, groups in connector_registry.group(entitlements).items():
+            if system not in accounts:
+                continue  # No account in this system
+            op = outbox_engine.submit(
+                "revoke_groups",
+                system,
+                {"identity_id": identity.id, "system": system, "groups": groups},
+                idempotency_key=_operation_key(identity, "revoke", system, groups),
+                depends_on=accounts[system],
+                drain=False,
+            )
+            ops.append(op.id)
+        outbox_engine.flush()
+        return ops
+
+    def _account_ops(self, identity: IdentityProfile) -> Dict[str, Optional[str]]:
+        """Systems where the identity has an account or one is on its way.
+
+        Maps each system to the queued ``create_account`` operation that work
+        on the account must wait for, or None once the account exists.
+        Planning from ``identity.accounts`` alone would miss accounts whose
+        creation is still pending or waiting for a retry. Handlers resolve
+        the account itself when they run.
+        """
+        accounts: Dict[str, Optional[str]] = {}
+        for system in connector_registry.systems:
+            create = outbox_store.get_by_key(_create_key(identity.id, system))
+            if create is not None and create.status in ("pending", "in_progress"):
+                accounts[system] = create.id
+            elif (create is not None and create.status == "done") or (
+                _has_account(identity, system)
+            ):
+                accounts[system] = None
+        return accounts
+
+    def _azure_object_id(self, accounts: Dict[str, str]) -> Optional[str]:
+        """Resolve the Azure AD objectId for an identity's accounts.
+
+        Identities provisioned before the objectId was stored only carry the
+        UPN, which is resolved through the connector's index.
+        """
+        object_id = accounts.get("azure_ad_object_id")
+        if object_id is None and "azure_ad" in accounts:
+            object_id = azure_ad_connector.get_object_id(accounts["azure_ad"])
+        return object_id
+
+    # --- Outbox handlers ---
+    # Handlers run on worker threads and may be retried, so each one checks
+    # the identity's current state first. Store updates and audit events
+    # happen in the on_success hooks, which run serially.
+
+    def _create_account(self, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        identity = _require_identity(payload["identity_id"])
+        system = payload["system"]
+        if _ACCOUNT_FIELDS[system] in identity.accounts:
+            return None  # Created by an earlier attempt
+        if identity.status == "terminated":
+            return None  # Left before the account was created
+        profile = {
+            "first_name": identity.first_name,
+            "last_name": identity.last_name,
+            "job_title": identity.job_title,
+            "department": identity.department,
+            "email": identity.email,
+        }
+        if system == "AzureAD":
+            return azure_ad_connector.create_user(profile)
+        if system == "GitHub":
+            return github_connector.create_user(profile)
+        return slack_connector.create_user(profile)
+
+    def _record_account(
+        self, payload: Dict[str, Any], account: Optional[Dict[str, Any]]
+    ) -> None:
+        if account is None:
+            return
+        system = payload["system"]
+        if system == "AzureAD":
+            created = {
+                "azure_ad": account["userPrincipalName"],
+                "azure_ad_object_id": account["objectId"],
+            }
+        elif system == "GitHub":
+            created = {"github": account["username"]}
+        else:
+            created = {"slack": account["id"]}
+        # Hooks don't hold the employee lock (the flow that queued the
+        # account may still hold it), so merge into the current accounts.
+        identity = identity_store.modify_identity(
+            _require_identity(payload["identity_id"]).id,
+            lambda current: {"accounts": {**current.accounts, **created}},
+        )
+        audit_log_store.log_event(
+            "provision_account", identity.email, details={"system": system}
+        )
 
-            elif system == "Slack" and "slack" in accounts:
-                slack_connector.add_to_channel(identity.email, group)
+    def _grant_groups(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if _require_identity(payload["identity_id"]).status == "terminated":
+            return {"status": "skipped", "message": "Identity terminated"}
+        pairs = _memberships(payload)
+        if not pairs:
+            return {"status": "skipped", "message": "No account"}
+        return connector_registry.add(payload["system"], pairs)
+
+    def _revoke_groups(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        pairs = _memberships(payload)
+        if not pairs:
+            return {"status": "skipped", "message": "No account"}
+        return connector_registry.remove(payload["system"], pairs)
+
+    def _record_revocation(
+        self, payload: Dict[str, Any], result: Optional[Dict[str, Any]]
+    ) -> None:
+        if result is None or result.get("status") == "skipped":
+            return
+        identity = _require_identity(payload["identity_id"])
+        for group in payload["groups"]:
+            audit_log_store.log_event(
+                "revoke_access",
+                identity.email,
+                details={"entitlement": f"{payload['system']}:{group}"},
+            )
 
-    def _revoke_entitlements(
-        self,
-        identity: IdentityProfile,
-        accounts: Dict[str, str],
-        entitlements: List[str],
+    def _disable_account(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        identity = _require_identity(payload["identity_id"])
+        system = payload["system"]
+        if system == "AzureAD":
+            object_id = self._azure_object_id(identity.accounts)
+            if object_id is None:
+                return {"status": "skipped", "message": "No account"}
+            return azure_ad_connector.disable_account(object_id)
+        if not _has_account(identity, system):
+            return {"status": "skipped", "message": "No account"}
+        if system == "GitHub":
+            # Already removed accounts report an error; that is the goal state.
+            return github_connector.remove_user(identity.accounts["github"])
+        return slack_connector.deactivate_user(identity.email)
+
+    def _record_disable(
+        self, payload: Dict[str, Any], result: Optional[Dict[str, Any]]
     ) -> None:
-        """Remove groups/teams."""
-        for ent in entitlements:
-            system, group = ent.split(":", 1)
-
-            if system == "AzureAD" and "azure_ad" in accounts:
-                for uid, u in azure_ad_connector.users.items():
-                    if u["userPrincipalName"] == accounts["azure_ad"]:
-                        azure_ad_connector.remove_from_group(uid, group)
-                        audit_log_store.log_event(
-                            "revoke_access",
-                            identity.email,
-                            details={"entitlement": f"AzureAD:{group}"},
-                        )
-                        break
-
-            elif system == "GitHub" and "github" in accounts:
-                github_connector.remove_from_team(accounts["github"], group)
-                audit_log_store.log_event(
-                    "revoke_access",
-                    identity.email,
-                    details={"entitlement": f"GitHub:{group}"},
-                )
-
-            elif system == "Slack" and "slack" in accounts:
-                slack_connector.remove_from_channel(identity.email, group)
-                audit_log_store.log_event(
-                    "revoke_access",
-                    identity.email,
-                    details={"entitlement": f"Slack:{group}"},
-                )
+        if result is not None and result.get("status") == "skipped":
+            return
+        identity = _require_identity(payload["identity_id"])
+        audit_log_store.log_event(
+            "disable_account", identity.email, details={"system": payload["system"]}
+        )
+
+
+# accounts key that marks an account as created, per system
+_ACCOUNT_FIELDS = {"AzureAD": "azure_ad", "GitHub": "github", "Slack": "slack"}
+
+
+def _require_identity(identity_id: str) -> IdentityProfile:
+    identity = identity_store.get_identity(identity_id)
+    if identity is None:
+        raise ValueError(f"Identity {identity_id} not found")
+    return identity
+
+
+def _create_key(identity_id: str, system: str) -> str:
+    """Idempotency key of the operation creating an identity's account."""
+    return f"{identity_id}:create:{system}"
+
+
+def _has_account(identity: IdentityProfile, system: str) -> bool:
+    binding = connector_registry.get(system)
+    return (
+        binding is not None
+        and binding.member_of(identity.accounts, identity.email) is not None
+    )
+
+
+def _memberships(payload: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """Resolve an outbox payload's groups against the identity's accounts."""
+    identity = _require_identity(payload["identity_id"])
+    system = payload["system"]
+    plan = connector_registry.plan(
+        identity.accounts,
+        identity.email,
+        [f"{system}:{group}" for group in payload["groups"]],
+    )
+    return plan.get(system, [])
+
+
+def _operation_key(
+    identity: IdentityProfile, action: str, system: str, groups: List[str]
+) -> str:
+    """Idempotency key: the same change to the same identity version."""
+    digest = hashlib.sha1("\n".join(sorted(groups)).encode()).hexdigest()[:12]
+    return f"{identity.id}:v{identity.version}:{action}:{system}:{digest}"
 
 
 jml_engine = JMLEngine()
+outbox_engine.register_handler(
+    "create_account", jml_engine._create_account, jml_engine._record_account
+)
+outbox_engine.register_handler("grant_groups", jml_engine._grant_groups)
+outbox_engine.register_handler(
+    "revoke_groups", jml_engine._revoke_groups, jml_engine._record_revocation
+)
+outbox_engine.register_handler(
+    "disable_account", jml_engine._disable_account, jml_engine._record_disable
+)
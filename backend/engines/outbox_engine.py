@@ -0,0 +1,266 @@
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional
+
+from backend.config import settings
+from backend.engines.provision_engine import ProvisionTask, provision_engine
+from backend.metrics import metrics
+from backend.stores.outbox_store import OutboxOperation, outbox_store
+
+logger = logging.getLogger("OutboxEngine")
+
+Handler = Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]
+SuccessHook = Callable[[Dict[str, Any], Optional[Dict[str, Any]]], None]
+DeadLetterListener = Callable[[OutboxOperation], None]
+
+_connector_duration = metrics.histogram(
+    "iga_connector_operation_duration_seconds",
+    "Time spent in connector calls, per outbox operation attempt",
+    ("connector", "operation"),
+)
+_connector_attempts = metrics.counter(
+    "iga_connector_operations_total",
+    "Outbox operation attempts by outcome (success, retry, dead_letter)",
+    ("connector", "operation", "outcome"),
+)
+_hook_failures = metrics.counter(
+    "iga_outbox_hook_failures_total",
+    "Success hooks that raised after their connector call succeeded",
+    ("operation",),
+)
+
+
+class OutboxEngine:
+    """Executes outbox operations with retries, backoff and dead-lettering.
+
+    Flows record the connector calls they intend to make with ``submit`` and
+    return. While the background dispatcher is running (``start``), due
+    operations are claimed in batches and executed concurrently through the
+    provisioning engine, so connector concurrency and rate limits apply.
+    Without it, ``submit`` drains the outbox on the caller's thread, which
+    keeps scripts and tests synchronous; failed attempts are still retried
+    later rather than raised.
+
+    Handlers run on pool threads and must be idempotent: an attempt may be
+    repeated after a crash. ``on_success`` hooks (e.g. recording a created
+    account on the identity) run serially on the dispatching thread once the
+    operation is recorded as done; a failing hook is logged and counted but
+    never re-runs the connector call. Done operations are pruned after
+    ``retention``.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 8,
+        backoff_base_ms: int = 500,
+        backoff_max_ms: int = 300000,
+        batch_size: int = 256,
+        retention_seconds: int = 7 * 24 * 3600,
+        prune_interval_seconds: int = 60,
+    ) -> None:
+        self.max_attempts = max_attempts
+        self.backoff_base_ms = backoff_base_ms
+        self.backoff_max_ms = backoff_max_ms
+        self.batch_size = batch_size
+        self.retention = timedelta(seconds=retention_seconds)
+        self.prune_interval = prune_interval_seconds
+        self._next_prune = 0.0
+        self._handlers: Dict[str, Handler] = {}
+        self._success_hooks: Dict[str, SuccessHook] = {}
+        self._dead_letter_listeners: List[DeadLetterListener] = []
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._drain_lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def register_handler(
+        self,
+        operation: str,
+        handler: Handler,
+        on_success: Optional[SuccessHook] = None,
+    ) -> None:
+        self._handlers[operation] = handler
+        if on_success is not None:
+            self._success_hooks[operation] = on_success
+
+    def on_dead_letter(self, listener: DeadLetterListener) -> None:
+        """Call ``listener`` for every operation that is dead-lettered."""
+        self._dead_letter_listeners.append(listener)
+
+    def submit(
+        self,
+        operation: str,
+        connector: str,
+        payload: Dict[str, Any],
+        idempotency_key: str,
+        depends_on: Optional[str] = None,
+        drain: bool = True,
+    ) -> OutboxOperation:
+        """Record an operation; resubmitting a key returns the existing one.
+
+        Pass ``drain=False`` when submitting several related operations and
+        call ``flush`` once afterwards.
+        """
+        if operation not in self._handlers:
+            raise ValueError(f"No handler registered for {operation!r}")
+        op, created = outbox_store.enqueue(
+            operation, connector, payload, idempotency_key, depends_on
+        )
+        if not created:
+            logger.info(f"Duplicate outbox submission {idempotency_key} ignored")
+        if drain:
+            self.flush()
+        return op
+
+    def flush(self) -> None:
+        """Hand pending work to the dispatcher, or run it inline without one."""
+        if self.running:
+            self._wake.set()
+        else:
+            self.drain()
+
+    def drain(self, now: Optional[datetime] = None) -> int:
+        """Execute every operation due at ``now``, including dependents that
+        become runnable along the way. Returns the number of attempts made.
+        """
+        attempts = 0
+        with self._drain_lock:
+            while True:
+                batch = outbox_store.claim_ready(now or datetime.now(), self.batch_size)
+                if not batch:
+                    break
+                attempts += len(batch)
+                self._execute(batch)
+            if time.monotonic() >= self._next_prune:
+                self._next_prune = time.monotonic() + self.prune_interval
+                self.prune(now)
+        return attempts
+
+    def prune(self, now: Optional[datetime] = None) -> int:
+        """Drop done operations older than the retention period."""
+        removed = outbox_store.prune((now or datetime.now()) - self.retention)
+        if removed:
+            logger.info(f"Pruned {removed} done outbox operations")
+        return removed
+
+    def start(self) -> None:
+        """Start the background dispatcher."""
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(
+            target=self._run, name="outbox-dispatcher", daemon=True
+        )
+        self._thread.start()
+        logger.info("Outbox dispatcher started")
+
+    def stop(self) -> None:
+        """Stop the dispatcher after its current batch; pending work stays queued."""
+        if self._thread is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        self._thread.join()
+        self._thread = None
+
+    def backoff(self, attempts: int) -> timedelta:
+        """Exponential backoff with jitter for the given attempt count."""
+        delay_ms = min(self.backoff_max_ms, self.backoff_base_ms * 2 ** (attempts - 1))
+        return timedelta(milliseconds=delay_ms * random.uniform(0.5, 1.0))
+
+    def _run(self) -> None:
+        while not self._stopping:
+            try:
+                self.drain()
+            except Exception as e:  # Keep the dispatcher alive
+                logger.error(f"Outbox dispatch failed: {e}", exc_info=True)
+            due = outbox_store.next_due()
+            timeout = None
+            if due is not None:
+                timeout = max(0.0, (due - datetime.now()).total_seconds())
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+    def _execute(self, batch: List[OutboxOperation]) -> None:
+        tasks = [
+            ProvisionTask(op.id, op.connector, partial(self._call_handler, op))
+            for op in batch
+        ]
+        results, errors = provision_engine.execute(tasks)
+
+        for op in batch:
+            error = errors.get(op.id)
+            if error is None:
+                result = results.get(op.id)
+                # The connector call succeeded: record it before the hook so
+                # a hook failure can never cause the call to be repeated.
+                outbox_store.complete(op.id, result)
+                _connector_attempts.inc(op.connector, op.operation, "success")
+                self._run_hook(op, result)
+                continue
+
+            message = f"{type(error).__name__}: {error}"
+            if op.attempts >= self.max_attempts:
+                logger.error(
+                    f"Outbox operation {op.idempotency_key} dead-lettered after "
+                    f"{op.attempts} attempts: {message}"
+                )
+                dead = outbox_store.fail(op.id, message, retry_at=None)
+                _connector_attempts.inc(op.connector, op.operation, "dead_letter")
+                for dead_op in dead:
+                    self._notify_dead(dead_op)
+            else:
+                retry_at = datetime.now() + self.backoff(op.attempts)
+                logger.warning(
+                    f"Outbox operation {op.idempotency_key} failed "
+                    f"(attempt {op.attempts}), retrying at {retry_at}: {message}"
+                )
+                outbox_store.fail(op.id, message, retry_at=retry_at)
+                _connector_attempts.inc(op.connector, op.operation, "retry")
+
+    def _run_hook(self, op: OutboxOperation, result: Optional[Dict[str, Any]]) -> None:
+        hook = self._success_hooks.get(op.operation)
+        if hook is None:
+            return
+        try:
+            hook(op.payload, result)
+        except Exception as e:
+            _hook_failures.inc(op.operation)
+            logger.error(
+                f"Success hook for outbox operation {op.idempotency_key} failed: {e}",
+                exc_info=True,
+            )
+
+    def _call_handler(self, op: OutboxOperation) -> Optional[Dict[str, Any]]:
+        started = time.perf_counter()
+        try:
+            return self._handlers[op.operation](op.payload)
+        finally:
+            _connector_duration.observe(
+                time.perf_counter() - started, op.connector, op.operation
+            )
+
+    def _notify_dead(self, op: OutboxOperation) -> None:
+        for listener in self._dead_letter_listeners:
+            try:
+                listener(op)
+            except Exception as e:
+                logger.error(f"Dead-letter listener failed: {e}", exc_info=True)
+
+
+outbox_engine = OutboxEngine(
+    max_attempts=settings.OUTBOX_MAX_ATTEMPTS,
+    backoff_base_ms=settings.OUTBOX_BACKOFF_BASE_MS,
+    backoff_max_ms=settings.OUTBOX_BACKOFF_MAX_MS,
+    batch_size=settings.OUTBOX_BATCH_SIZE,
+    retention_seconds=settings.OUTBOX_RETENTION_SECONDS,
+    prune_interval_seconds=settings.OUTBOX_PRUNE_INTERVAL_SECONDS,
+)
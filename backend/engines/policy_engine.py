@@ -1,72 +1,422 @@
-from typing import List
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from types import MappingProxyType
+from typing import (
+    Any,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Set,
+    Tuple,
+)
 
+from backend.config import settings
 
-class PolicyEngine:
-    def __init__(self) -> None:
-        # Define birthright policies: Department -> List of Entitlements
-        # Entitlements format: "System:Group"
-        self.birthright_policies = {
-            "Engineering": [
-                "AzureAD:Engineering",
-                "GitHub:Engineering",
-                "Slack:engineering",
-            ],
-            "Sales": ["AzureAD:Sales", "Slack:sales", "Salesforce:Users"],
-            "Marketing": ["AzureAD:Marketing", "Slack:marketing"],
-            "HR": ["AzureAD:HR", "Slack:general", "Workday:Users"],
+logger = logging.getLogger("PolicyEngine")
+
+# A compiled SoD rule: (conflicting entitlements, original rule)
+CompiledRule = Tuple[FrozenSet[str], Dict[str, Any]]
+
+DEFAULT_POLICY_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "policies",
+    "policy.json",
+)
+
+
+class CompiledPolicy:
+    """An immutable, precompiled birthright and SoD policy.
+
+    Each department's birthright access (base access included) is compiled
+    once into a frozen set and a sorted tuple, and the revocations for every
+    department -> department move are precomputed. SoD rules are indexed
+    under every entitlement they mention (for incremental checks) and under
+    a single anchor entitlement (for full checks), so an evaluation only
+    visits rules that can possibly match.
+
+    Instances are never mutated; the engine swaps in a new one on reload, so
+    a caller holding a policy gets consistent answers and a single version.
+    """
+
+    def __init__(
+        self,
+        version: str,
+        base_access: Iterable[str],
+        birthright: Mapping[str, Iterable[str]],
+        sod_rules: Iterable[Dict[str, Any]],
+    ) -> None:
+        self.version = version
+        self.base_access: FrozenSet[str] = frozenset(base_access)
+        self._base_list = tuple(sorted(self.base_access))
+        access = {
+            department: self.base_access | frozenset(entitlements)
+            for department, entitlements in birthright.items()
+        }
+        self.birthright: Mapping[str, FrozenSet[str]] = MappingProxyType(access)
+        self._access_lists = {
+            department: tuple(sorted(entitlements))
+            for department, entitlements in access.items()
+        }
+        self._revocations = {
+            (old, new): tuple(sorted(old_access - new_access))
+            for old, old_access in access.items()
+            for new, new_access in access.items()
         }
 
-        # SoD Rules: Conflicting Groups
-        self.sod_rules = [
-            {
-                "conflicting_groups": {"AzureAD:Engineering", "AzureAD:HR"},
-                "severity": "high",
-            },
-            {
-                "conflicting_groups": {"AzureAD:Sales", "AzureAD:Finance-Admin"},
-                "severity": "critical",
+        compiled: List[CompiledRule] = []
+        by_entitlement: Dict[str, List[int]] = {}
+        by_anchor: Dict[str, List[int]] = {}
+        for rule in sod_rules:
+            conflict = rule["conflicting_groups"]
+            if isinstance(conflict, str) or not conflict:
+                continue
+            rule_id = len(compiled)
+            compiled.append((frozenset(conflict), rule))
+            for entitlement in compiled[-1][0]:
+                by_entitlement.setdefault(entitlement, []).append(rule_id)
+            by_anchor.setdefault(min(conflict), []).append(rule_id)
+        self.sod_rules = tuple(rule for _, rule in compiled)
+        self.compiled_sod_rules = tuple(compiled)
+        self._rules_by_entitlement = by_entitlement
+        self._rules_by_anchor = by_anchor
+
+    @property
+    def departments(self) -> List[str]:
+        return sorted(self.birthright)
+
+    def with_sod_rules(self, rules: Iterable[Dict[str, Any]]) -> "CompiledPolicy":
+        """Return a copy of this policy with a different SoD rule set."""
+        birthright = {
+            department: entitlements - self.base_access
+            for department, entitlements in self.birthright.items()
+        }
+        return CompiledPolicy(self.version, self.base_access, birthright, rules)
+
+    def birthright_access(self, department: str) -> Tuple[str, ...]:
+        """Sorted birthright entitlements; unknown departments get base access."""
+        return self._access_lists.get(department, self._base_list)
+
+    def birthright_set(self, department: str) -> FrozenSet[str]:
+        return self.birthright.get(department, self.base_access)
+
+    def revocations(self, old_department: str, new_department: str) -> Tuple[str, ...]:
+        """Birthright entitlements of ``old_department`` that ``new_department``
+        does not grant."""
+        revoked = self._revocations.get((old_department, new_department))
+        if revoked is None:
+            revoked = tuple(
+                sorted(
+                    self.birthright_set(old_department)
+                    - self.birthright_set(new_department)
+                )
+            )
+        return revoked
+
+    def access_diff(
+        self, current: Iterable[str], old_department: str, new_department: str
+    ) -> Tuple[List[str], List[str]]:
+        held = set(current)
+        to_add = [e for e in self.birthright_access(new_department) if e not in held]
+        to_remove = [
+            e for e in self.revocations(old_department, new_department) if e in held
+        ]
+        return to_add, to_remove
+
+    def find_sod_conflicts(self, entitlements: Iterable[str]) -> List[int]:
+        user_entitlements = set(entitlements)
+        candidates = [
+            rule_id
+            for entitlement in user_entitlements
+            for rule_id in self._rules_by_anchor.get(entitlement, ())
+        ]
+        return self._matching_rules(sorted(candidates), user_entitlements)
+
+    def find_sod_conflicts_for_addition(
+        self, entitlements: Iterable[str], new_entitlement: str
+    ) -> List[int]:
+        user_entitlements = set(entitlements)
+        if new_entitlement in user_entitlements:
+            return []
+        user_entitlements.add(new_entitlement)
+        candidates = self._rules_by_entitlement.get(new_entitlement, [])
+        return self._matching_rules(candidates, user_entitlements)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The policy as a JSON-serialisable document."""
+        return {
+            "version": self.version,
+            "base_access": list(self._base_list),
+            "birthright": {
+                department: sorted(self.birthright[department] - self.base_access)
+                for department in self.departments
             },
+            "sod_rules": [
+                {**rule, "conflicting_groups": sorted(conflict)}
+                for conflict, rule in self.compiled_sod_rules
+            ],
+        }
+
+    def _matching_rules(
+        self, rule_ids: Iterable[int], user_entitlements: Set[str]
+    ) -> List[int]:
+        return [
+            rule_id
+            for rule_id in rule_ids
+            if self.compiled_sod_rules[rule_id][0].issubset(user_entitlements)
         ]
 
+
+def parse_policy(
+    document: Any, departments: Optional[Iterable[str]] = None
+) -> CompiledPolicy:
+    """Validate a policy document and compile it.
+
+    With ``departments``, only those departments get birthright tables;
+    configured departments the document does not define get base access.
+    Raises ValueError for a malformed document.
+    """
+
+    def entitlement_list(value: Any, where: str) -> List[str]:
+        if not isinstance(value, list) or not all(
+            isinstance(e, str) and ":" in e for e in value
+        ):
+            raise ValueError(f"{where} must be a list of 'System:Group' strings")
+        return value
+
+    if not isinstance(document, dict):
+        raise ValueError("Policy must be a JSON object")
+    version = document.get("version")
+    if not isinstance(version, str) or not version:
+        raise ValueError("Policy version is required")
+    base_access = entitlement_list(document.get("base_access", []), "base_access")
+    birthright = document.get("birthright", {})
+    if not isinstance(birthright, dict):
+        raise ValueError("birthright must map departments to entitlements")
+    tables = {
+        department: entitlement_list(entitlements, f"birthright[{department!r}]")
+        for department, entitlements in birthright.items()
+    }
+    rules = document.get("sod_rules", [])
+    if not isinstance(rules, list):
+        raise ValueError("sod_rules must be a list")
+    sod_rules = []
+    for i, rule in enumerate(rules):
+        if not isinstance(rule, dict) or not isinstance(rule.get("severity"), str):
+            raise ValueError(f"sod_rules[{i}] must have a severity")
+        conflict = entitlement_list(
+            rule.get("conflicting_groups"), f"sod_rules[{i}].conflicting_groups"
+        )
+        if len(set(conflict)) < 2:
+            raise ValueError(f"sod_rules[{i}] needs at least two entitlements")
+        # Rules keep a set, as rules passed to set_sod_rules do
+        sod_rules.append({**rule, "conflicting_groups": set(conflict)})
+
+    if departments is not None:
+        allowed = list(departments)
+        missing = [d for d in allowed if d not in tables]
+        if missing:
+            logger.warning(
+                f"Policy {version} has no birthright for departments {missing}"
+            )
+        ignored = sorted(set(tables) - set(allowed))
+        if ignored:
+            logger.warning(
+                f"Policy {version} departments {ignored} are not configured; "
+                f"ignoring them"
+            )
+        tables = {d: tables[d] for d in allowed if d in tables}
+    return CompiledPolicy(version, base_access, tables, sod_rules)
+
+
+class PolicyEngine:
+    """Birthright and SoD policy, loaded from a versioned JSON file.
+
+    The file is compiled into a ``CompiledPolicy`` that is replaced as a
+    whole on ``reload``, so readers never see a half-loaded policy and need
+    no lock. Results that depend on the policy carry its ``version``.
+    """
+
+    def __init__(
+        self,
+        policy_file: Optional[str] = None,
+        departments: Optional[Iterable[str]] = None,
+    ) -> None:
+        self.policy_file = policy_file or DEFAULT_POLICY_FILE
+        self.departments = list(departments) if departments is not None else None
+        self.loaded_at: Optional[datetime] = None
+        self._mtime: Optional[float] = None
+        self._reload_lock = threading.Lock()
+        self._watch_stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        self._policy = self._load()
+
+    @property
+    def policy(self) -> CompiledPolicy:
+        """The current policy; hold on to it for answers from one version."""
+        return self._policy
+
+    @property
+    def policy_version(self) -> str:
+        return self._policy.version
+
+    @property
+    def birthright_policies(self) -> Mapping[str, FrozenSet[str]]:
+        return self._policy.birthright
+
+    @property
+    def sod_rules(self) -> List[Dict[str, Any]]:
+        return list(self._policy.sod_rules)
+
+    @property
+    def compiled_sod_rules(self) -> List[CompiledRule]:
+        return list(self._policy.compiled_sod_rules)
+
+    def reload(self, policy_file: Optional[str] = None) -> CompiledPolicy:
+        """Load and compile the policy file, then swap it in atomically.
+
+        On a missing or invalid file a ValueError is raised and the current
+        policy stays in force.
+        """
+        with self._reload_lock:
+            if policy_file is not None:
+                self.policy_file = policy_file
+            previous = self._policy.version
+            self._policy = self._load()
+        logger.info(f"Policy reloaded: {previous} -> {self._policy.version}")
+        return self._policy
+
+    def reload_if_changed(self) -> bool:
+        """Reload when the policy file was modified since it was loaded."""
+        try:
+            mtime = os.stat(self.policy_file).st_mtime
+        except OSError:
+            return False
+        if mtime == self._mtime:
+            return False
+        try:
+            self.reload()
+        except ValueError as e:
+            logger.error(f"Policy reload failed, keeping {self.policy_version}: {e}")
+            # Do not retry the same broken file on every check
+            self._mtime = mtime
+            return False
+        return True
+
+    def start_watcher(self, interval_seconds: float) -> None:
+        """Poll the policy file and hot-reload it when it changes."""
+        if self._watcher is not None:
+            return
+        self._watch_stop.clear()
+        self._watcher = threading.Thread(
+            target=self._watch,
+            args=(interval_seconds,),
+            name="policy-watcher",
+            daemon=True,
+        )
+        self._watcher.start()
+
+    def stop_watcher(self) -> None:
+        if self._watcher is None:
+            return
+        self._watch_stop.set()
+        self._watcher.join()
+        self._watcher = None
+
+    def set_sod_rules(self, rules: Iterable[Dict[str, Any]]) -> None:
+        """Replace the SoD rule set, keeping the birthright tables."""
+        self._policy = self._policy.with_sod_rules(rules)
+
     def calculate_birthright_access(self, department: str) -> List[str]:
         """Calculate birthright access based on department."""
-        # Everyone gets basic access
-        base_access = ["AzureAD:All Users", "Slack:general", "Slack:random"]
-        dept_access = self.birthright_policies.get(department, [])
-        return list(set(base_access + dept_access))
+        return list(self._policy.birthright_access(department))
 
     def check_sod_violations(self, entitlements: List[str]) -> List[str]:
         """Check for Separation of Duties violations.
 
         Returns a list of violation messages.
         """
-        violations = []
-        user_entitlements = set(entitlements)
+        policy = self._policy
+        return [
+            self._format_violation(policy.compiled_sod_rules[rule_id][1])
+            for rule_id in policy.find_sod_conflicts(entitlements)
+        ]
 
-        for rule in self.sod_rules:
-            conflict = rule["conflicting_groups"]
-            if isinstance(conflict, set) and conflict.issubset(user_entitlements):
-                violations.append(
-                    f"User has conflicting entitlements: {conflict} "
-                    f"(Severity: {rule['severity']})"
-                )
-        return violations
+    def find_sod_conflicts(self, entitlements: Iterable[str]) -> List[int]:
+        """Return the ids (positions in ``compiled_sod_rules``) of violated rules."""
+        return self._policy.find_sod_conflicts(entitlements)
+
+    def check_sod_for_addition(
+        self, entitlements: List[str], new_entitlement: str
+    ) -> List[str]:
+        """Check only the violations introduced by adding one entitlement.
+
+        Rules that do not mention ``new_entitlement`` are never evaluated.
+        """
+        policy = self._policy
+        return [
+            self._format_violation(policy.compiled_sod_rules[rule_id][1])
+            for rule_id in policy.find_sod_conflicts_for_addition(
+                entitlements, new_entitlement
+            )
+        ]
+
+    @staticmethod
+    def _format_violation(rule: Dict[str, Any]) -> str:
+        return (
+            f"User has conflicting entitlements: "
+            f"{rule['conflicting_groups']} (Severity: {rule['severity']})"
+        )
 
     def get_revocation_list(
         self, old_department: str, new_department: str
     ) -> List[str]:
         """Calculate revocation list.
 
-        Calculates which entitlements should be removed when moving departments.
-        Simple logic: Remove anything in old_dept that is NOT in new_dept.
+        Calculates which entitlements should be removed when moving departments:
+        anything in old_dept that is NOT in new_dept. Base access is in both,
+        so it is never revoked.
         """
-        old_access = set(self.calculate_birthright_access(old_department))
-        new_access = set(self.calculate_birthright_access(new_department))
+        return list(self._policy.revocations(old_department, new_department))
+
+    def compute_access_diff(
+        self, current: List[str], old_department: str, new_department: str
+    ) -> Tuple[List[str], List[str]]:
+        """Exact (to_add, to_remove) to move ``current`` to the new birthright.
+
+        Only birthright entitlements of the old department that the new one
+        does not grant are removed; ad-hoc grants are kept. Birthright
+        entitlements the identity already holds are not re-added, and any
+        that are missing are, even when the department did not change.
+        """
+        return self._policy.access_diff(current, old_department, new_department)
+
+    def _load(self) -> CompiledPolicy:
+        try:
+            mtime = os.stat(self.policy_file).st_mtime
+            with open(self.policy_file, encoding="utf-8") as f:
+                document = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            raise ValueError(f"Cannot read policy file {self.policy_file}: {e}")
+        policy = parse_policy(document, self.departments)
+        self._mtime = mtime
+        self.loaded_at = datetime.now()
+        return policy
 
-        # We only revoke things that are strictly departmental.
-        # Base access (All Users) is in both, so it won't be revoked.
-        to_revoke = list(old_access - new_access)
-        return to_revoke
+    def _watch(self, interval_seconds: float) -> None:
+        while not self._watch_stop.wait(interval_seconds):
+            try:
+                self.reload_if_changed()
+            except Exception as e:  # Keep the watcher alive
+                logger.error(f"Policy watch failed: {e}", exc_info=True)
 
 
-policy_engine = PolicyEngine()
+policy_engine = PolicyEngine(
+    policy_file=settings.POLICY_FILE,
+    departments=settings.BIRTHRIGHT_DEPARTMENTS,
+)
@@ -0,0 +1,193 @@
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional, Sequence, Tuple
+
+from backend.config import settings
+
+logger = logging.getLogger("ProvisionEngine")
+
+
+class RateLimiter:
+    """Token bucket allowing ``rate`` calls per second with bursts of ``burst``."""
+
+    def __init__(self, rate: float, burst: Optional[int] = None) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a call is allowed."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class ProvisionTask:
+    """One connector call. Ordering between calls is left to the outbox."""
+
+    def __init__(self, key: str, connector: str, func: Callable[[], Any]) -> None:
+        self.key = key
+        self.connector = connector
+        self.func = func
+
+
+class ProvisionEngine:
+    """Run connector operations concurrently on a shared thread pool.
+
+    Each connector has a concurrency limit, enforced both per batch (so one
+    batch never parks more pool threads on a connector than it may use) and
+    globally across batches, and an optional rate limit.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 16,
+        default_concurrency: int = 4,
+        concurrency: Optional[Dict[str, int]] = None,
+        rate_limits: Optional[Dict[str, float]] = None,
+    ) -> None:
+        self.max_workers = max_workers
+        self.default_concurrency = default_concurrency
+        self._concurrency: Dict[str, int] = {}
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._rate_limiters: Dict[str, RateLimiter] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        for connector, limit in (concurrency or {}).items():
+            self.configure(connector, max_concurrency=limit)
+        for connector, rate in (rate_limits or {}).items():
+            self.configure(connector, rate_per_second=rate)
+
+    def configure(
+        self,
+        connector: str,
+        max_concurrency: Optional[int] = None,
+        rate_per_second: Optional[float] = None,
+    ) -> None:
+        """Set a connector's concurrency and/or rate limit."""
+        with self._lock:
+            if max_concurrency is not None:
+                if max_concurrency < 1:
+                    raise ValueError("max_concurrency must be at least 1")
+                self._concurrency[connector] = max_concurrency
+                self._semaphores[connector] = threading.BoundedSemaphore(
+                    max_concurrency
+                )
+            if rate_per_second is not None:
+                self._rate_limiters[connector] = RateLimiter(rate_per_second)
+
+    def concurrency_for(self, connector: str) -> int:
+        return self._concurrency.get(connector, self.default_concurrency)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def execute(
+        self, tasks: Sequence[ProvisionTask]
+    ) -> Tuple[Dict[str, Any], Dict[str, BaseException]]:
+        """Run tasks concurrently and return results and errors keyed by task.
+
+        A failing task never stops the others.
+        """
+        by_key: Dict[str, ProvisionTask] = {}
+        ready: Dict[str, Deque[ProvisionTask]] = defaultdict(deque)
+        for task in tasks:
+            if task.key in by_key:
+                raise ValueError(f"Duplicate provisioning task {task.key!r}")
+            ready[task.connector].append(task)
+            by_key[task.key] = task
+
+        if not by_key:
+            return {}, {}
+        results: Dict[str, Any] = {}
+        errors: Dict[str, BaseException] = {}
+        completions: "queue.Queue[Tuple[ProvisionTask, Any, Optional[BaseException]]]"
+        completions = queue.Queue()
+        in_flight: Dict[str, int] = defaultdict(int)
+        remaining = len(by_key)
+        executor = self._get_executor()
+
+        def dispatch() -> None:
+            for connector, pending in ready.items():
+                limit = self.concurrency_for(connector)
+                while pending and in_flight[connector] < limit:
+                    task = pending.popleft()
+                    in_flight[connector] += 1
+                    executor.submit(self._call, task, completions)
+
+        dispatch()
+        while remaining:
+            task, result, error = completions.get()
+            in_flight[task.connector] -= 1
+            remaining -= 1
+            if error is not None:
+                errors[task.key] = error
+            else:
+                results[task.key] = result
+            dispatch()
+
+        return results, errors
+
+    def _call(
+        self,
+        task: ProvisionTask,
+        completions: "queue.Queue[Tuple[ProvisionTask, Any, Optional[BaseException]]]",
+    ) -> None:
+        semaphore = self._semaphore(task.connector)
+        limiter = self._rate_limiters.get(task.connector)
+        try:
+            with semaphore:
+                if limiter is not None:
+                    limiter.acquire()
+                result = task.func()
+        except BaseException as e:
+            # Every task must report back, or execute() waits forever
+            completions.put((task, None, e))
+        else:
+            completions.put((task, result, None))
+
+    def _semaphore(self, connector: str) -> threading.BoundedSemaphore:
+        semaphore = self._semaphores.get(connector)
+        if semaphore is None:
+            with self._lock:
+                semaphore = self._semaphores.setdefault(
+                    connector,
+                    threading.BoundedSemaphore(self.concurrency_for(connector)),
+                )
+        return semaphore
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="provision"
+                )
+            return self._executor
+
+
+provision_engine = ProvisionEngine(
+    max_workers=settings.PROVISION_MAX_WORKERS,
+    default_concurrency=settings.PROVISION_CONNECTOR_CONCURRENCY,
+    concurrency=settings.PROVISION_CONCURRENCY_LIMITS,
+    rate_limits=settings.PROVISION_RATE_LIMITS,
+)
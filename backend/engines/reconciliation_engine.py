@@ -0,0 +1,280 @@
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from backend.engines.outbox_engine import outbox_engine
+from backend.stores.audit_log import audit_log_store
+from backend.stores.identity_store import IdentityProfile, identity_store
+from connectors.registry import ConnectorBinding, connector_registry
+
+logger = logging.getLogger("ReconciliationEngine")
+
+MemberKey = Tuple[str, str]  # (system, member id)
+
+
+class ReconciliationEngine:
+    """Compares connector group memberships with identity entitlements.
+
+    A full comparison touches every identity and every membership, so only
+    the first run (or ``full=True``) does one. Afterwards a run re-diffs
+    only identities whose content hash (status, email, accounts and
+    entitlements) changed since they were last diffed, and identities or
+    unknown members whose connector memberships changed. Findings for
+    everything else are carried over, so each run reports the complete
+    current drift.
+
+    Drift is reported as missing and excess memberships per identity,
+    memberships of members no identity owns, and orphan accounts. With
+    ``remediate``, missing memberships are granted and excess ones revoked
+    through the outbox; orphans are only reported. Operations still queued
+    in the outbox show up as drift until they run.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._dirty_lock = threading.Lock()
+        self._dirty: Dict[str, None] = {}  # identity ids changed since last run
+        self.reset()
+        identity_store.on_change(self._mark_dirty)
+
+    def reset(self) -> None:
+        """Forget all state; the next run is a full one."""
+        with self._lock:
+            self._initialised = False
+            self._hashes: Dict[str, str] = {}  # identity id -> content hash
+            # system -> member id -> owning identity id
+            self._claims: Dict[str, Dict[str, str]] = {}
+            self._members: Dict[str, List[MemberKey]] = {}  # identity -> members
+            self._drift: Dict[str, Dict[str, Any]] = {}  # identity id -> finding
+            self._orphan_memberships: Dict[MemberKey, List[str]] = {}
+            self.last_report: Optional[Dict[str, Any]] = None
+
+    @property
+    def pending_identities(self) -> int:
+        """Identities changed since the last run."""
+        return len(self._dirty)
+
+    def run(self, full: bool = False, remediate: bool = False) -> Dict[str, Any]:
+        """Reconcile what changed since the last run and report all drift."""
+        started = time.monotonic()
+        with self._lock:
+            with self._dirty_lock:
+                dirty, self._dirty = self._dirty, {}
+            systems = connector_registry.systems
+            changed_members = {
+                system: _binding(system).drain_changes() for system in systems
+            }
+            full = full or not self._initialised
+            if full:
+                self._hashes, self._claims, self._members = {}, {}, {}
+                self._drift, self._orphan_memberships = {}, {}
+                candidates: Set[str] = {i.id for i in identity_store.list_identities()}
+                self._initialised = True
+            else:
+                candidates = set()
+                for identity_id in dirty:
+                    identity = identity_store.get_identity(identity_id)
+                    if identity is None:
+                        self._forget(identity_id)
+                    elif self._hashes.get(identity_id) != _content_hash(identity):
+                        candidates.add(identity_id)
+
+            unclaimed: List[MemberKey] = []
+            for system, members in changed_members.items():
+                for member in members:
+                    owner = self._claims.get(system, {}).get(member)
+                    if owner is not None:
+                        candidates.add(owner)
+                    else:
+                        unclaimed.append((system, member))
+
+            for identity_id in candidates:
+                identity = identity_store.get_identity(identity_id)
+                if identity is None:
+                    self._forget(identity_id)
+                else:
+                    self._diff(identity)
+
+            if full:
+                unclaimed = [
+                    (system, member)
+                    for system in systems
+                    for member in _binding(system).account_ids()
+                    | set(changed_members[system])
+                ]
+            # Members may have been claimed by an identity diffed above
+            for key in unclaimed:
+                self._check_orphan_membership(key)
+
+            # One set difference per connector
+            orphan_accounts = [
+                {"system": system, "account": account}
+                for system in systems
+                for account in sorted(
+                    _binding(system).account_ids() - self._claims.get(system, {}).keys()
+                )
+            ]
+
+            drift = [self._drift[i] for i in sorted(self._drift)]
+            remediation_ops: List[str] = []
+            if remediate:
+                remediation_ops = self._remediate(drift)
+
+        duration_ms = (time.monotonic() - started) * 1000
+        mode = "full" if full else "incremental"
+        report: Dict[str, Any] = {
+            "run_id": str(uuid.uuid4()),
+            "mode": mode,
+            "identities_checked": len(candidates),
+            "members_checked": sum(len(m) for m in changed_members.values()),
+            "missing": sum(len(d["missing"]) for d in drift),
+            "excess": sum(len(d["excess"]) for d in drift),
+            "drift": drift,
+            "orphan_memberships": [
+                {"system": system, "member": member, "groups": groups}
+                for (system, member), groups in sorted(self._orphan_memberships.items())
+            ],
+            "orphan_accounts": orphan_accounts,
+            "remediation_ops": len(remediation_ops),
+            "duration_ms": round(duration_ms, 2),
+        }
+        self.last_report = report
+        audit_log_store.log_event(
+            "reconcile",
+            "connectors",
+            details={
+                "mode": mode,
+                "identities_checked": report["identities_checked"],
+                "missing": report["missing"],
+                "excess": report["excess"],
+                "orphan_accounts": len(orphan_accounts),
+                "remediation_ops": len(remediation_ops),
+            },
+        )
+        logger.info(
+            f"{mode.capitalize()} reconciliation checked "
+            f"{len(candidates)} identities: {report['missing']} missing, "
+            f"{report['excess']} excess memberships, {len(orphan_accounts)} "
+            f"orphan accounts in {duration_ms:.0f}ms"
+        )
+        return report
+
+    def _mark_dirty(self, identity: IdentityProfile) -> None:
+        with self._dirty_lock:
+            self._dirty[identity.id] = None
+
+    def _diff(self, identity: IdentityProfile) -> None:
+        previous = self._members.get(identity.id, [])
+        self._release(identity.id)
+        desired = connector_registry.group(identity.entitlements)
+        missing: List[str] = []
+        excess: List[str] = []
+        members: List[MemberKey] = []
+        for system in connector_registry.systems:
+            binding = _binding(system)
+            member = binding.member_of(identity.accounts, identity.email)
+            if member is None:
+                continue
+            key = (system, member)
+            members.append(key)
+            self._claims.setdefault(system, {})[member] = identity.id
+            self._orphan_memberships.pop(key, None)
+            wanted = desired.get(system, [])
+            actual = binding.groups_of(member)
+            held = set(actual)
+            missing += [f"{system}:{group}" for group in wanted if group not in held]
+            wanted_set = set(wanted)
+            excess += [f"{system}:{g}" for g in actual if g not in wanted_set]
+
+        self._members[identity.id] = members
+        for key in previous:
+            if key not in members:  # e.g. the account was replaced
+                self._check_orphan_membership(key)
+        self._hashes[identity.id] = _content_hash(identity)
+        if missing or excess:
+            self._drift[identity.id] = {
+                "identity_id": identity.id,
+                "employee_id": identity.employee_id,
+                "status": identity.status,
+                "missing": missing,
+                "excess": excess,
+            }
+        else:
+            self._drift.pop(identity.id, None)
+
+    def _release(self, identity_id: str) -> None:
+        for system, member in self._members.pop(identity_id, []):
+            claims = self._claims.get(system, {})
+            if claims.get(member) == identity_id:
+                del claims[member]
+
+    def _forget(self, identity_id: str) -> None:
+        members = self._members.get(identity_id, [])
+        self._release(identity_id)
+        for key in members:
+            self._check_orphan_membership(key)
+        self._hashes.pop(identity_id, None)
+        self._drift.pop(identity_id, None)
+
+    def _check_orphan_membership(self, key: MemberKey) -> None:
+        system, member = key
+        groups = []
+        if member not in self._claims.get(system, {}):
+            groups = _binding(system).groups_of(member)
+        if groups:
+            self._orphan_memberships[key] = groups
+        else:
+            self._orphan_memberships.pop(key, None)
+
+    def _remediate(self, drift: List[Dict[str, Any]]) -> List[str]:
+        batch = uuid.uuid4().hex[:12]
+        ops: List[str] = []
+        for finding in drift:
+            for action, entitlements in (
+                ("grant_groups", finding["missing"]),
+                ("revoke_groups", finding["excess"]),
+            ):
+                for system, groups in connector_registry.group(entitlements).items():
+                    op = outbox_engine.submit(
+                        action,
+                        system,
+                        {
+                            "identity_id": finding["identity_id"],
+                            "system": system,
+                            "groups": groups,
+                        },
+                        idempotency_key=(
+                            f"reconcile:{batch}:{finding['identity_id']}:"
+                            f"{action}:{system}"
+                        ),
+                        drain=False,
+                    )
+                    ops.append(op.id)
+        if ops:
+            outbox_engine.flush()
+        return ops
+
+
+def _binding(system: str) -> ConnectorBinding:
+    binding = connector_registry.get(system)
+    if binding is None:
+        raise ValueError(f"No connector registered for {system}")
+    return binding
+
+
+def _content_hash(identity: IdentityProfile) -> str:
+    """Hash of the identity fields that decide its connector memberships."""
+    digest = hashlib.sha1()
+    digest.update(f"{identity.status}\n{identity.email}\n".encode())
+    for key in sorted(identity.accounts):
+        digest.update(f"{key}={identity.accounts[key]}\n".encode())
+    for entitlement in sorted(identity.entitlements):
+        digest.update(f"{entitlement}\n".encode())
+    return digest.hexdigest()
+
+
+# Singleton instance
+reconciliation_engine = ReconciliationEngine()
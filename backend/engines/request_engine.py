@@ -1,9 +1,14 @@
 import logging
+from contextlib import nullcontext
+from typing import Any, ContextManager, Dict, List, Optional, Set, Tuple
 
 from backend.stores.request_store import AccessRequest, request_store
-from backend.stores.identity_store import identity_store
+from backend.stores.identity_store import IdentityProfile, identity_store
+from backend.stores.org_hierarchy import org_hierarchy
 from backend.stores.audit_log import audit_log_store
 from backend.engines.jml_engine import jml_engine
+from backend.engines.outbox_engine import outbox_engine
+from backend.stores.outbox_store import OutboxOperation
 from backend.engines.policy_engine import policy_engine
 
 logger = logging.getLogger("RequestEngine")
@@ -24,8 +29,9 @@ class RequestEngine:
             raise ValueError("Invalid entitlement format. Expected System:Group")
 
         # Check for SoD Violations (Pre-check)
-        potential_entitlements = identity.entitlements + [entitlement]
-        violations = policy_engine.check_sod_violations(potential_entitlements)
+        violations = policy_engine.check_sod_for_addition(
+            identity.entitlements, entitlement
+        )
 
         if violations:
             logger.warning(f"SoD Violation detected for request: {violations}")
@@ -38,6 +44,7 @@ class RequestEngine:
                 "entitlement": entitlement,
                 "justification": justification,
                 "status": "pending",
+                "assigned_approver_id": self.route(requester_id),
             }
         )
 
@@ -51,84 +58,346 @@ class RequestEngine:
 
     def approve_request(self, request_id: str, approver_id: str) -> AccessRequest:
         """Approve a request and triggers provisioning."""
-        request = request_store.get_request(request_id)
-        if not request:
-            raise ValueError("Request not found")
+        with self._request_lock(request_id):
+            request = request_store.get_request(request_id)
+            if not request:
+                raise ValueError("Request not found")
 
-        if request.status != "pending":
-            raise ValueError(f"Request is in {request.status} state, cannot approve.")
+            if request.status != "pending":
+                raise ValueError(
+                    f"Request is in {request.status} state, cannot approve."
+                )
 
-        # Validate Approver
-        approver = identity_store.get_identity(approver_id)
-        if not approver:
-            raise ValueError("Approver identity not found")
+            # Validate Approver
+            approver = identity_store.get_identity(approver_id)
+            if not approver:
+                raise ValueError("Approver identity not found")
 
-        # Prevent Self-Approval
-        if request.requester_id == approver_id:
-            raise ValueError("Self-approval is not allowed.")
+            # Prevent Self-Approval
+            if request.requester_id == approver_id:
+                raise ValueError("Self-approval is not allowed.")
+            self._check_approver(request, approver_id)
 
-        logger.info(f"Approving request {request_id} by {approver.email}")
+            logger.info(f"Approving request {request_id} by {approver.email}")
 
-        # Provision Access
-        try:
-            jml_engine.provision_entitlement(
-                request.target_identity_id, request.entitlement
+            # Provision Access
+            try:
+                jml_engine.provision_entitlement(
+                    request.target_identity_id,
+                    request.entitlement,
+                    request_id=request_id,
+                )
+                status = "approved"
+                comments = "Approved via Access Request Workflow"
+            except Exception as e:
+                logger.error(f"Provisioning failed for request {request_id}: {e}")
+                status = "failed"
+                comments = f"Provisioning failed: {e}"
+                # In a real system, we might keep it approved but flag
+                # provisioning error. Here we fail the request for clarity.
+            status, comments = self._settled(request_id, status, comments)
+
+            updated_req = request_store.update_request(
+                request_id,
+                {
+                    "status": status,
+                    "approver_id": approver_id,
+                    "comments": comments,
+                },
             )
-            status = "approved"
-            comments = "Approved via Access Request Workflow"
-        except Exception as e:
-            logger.error(f"Provisioning failed for request {request_id}: {e}")
-            status = "failed"
-            comments = f"Provisioning failed: {e}"
-            # In a real system, we might keep it approved but flag provisioning error.
-            # Here we fail the request for clarity.
-
-        updated_req = request_store.update_request(
-            request_id,
-            {
-                "status": status,
-                "approver_id": approver_id,
-                "comments": comments,
-            },
-        )
-        if updated_req is None:
-            raise ValueError("Failed to update request")
+            if updated_req is None:
+                raise ValueError("Failed to update request")
 
-        audit_log_store.log_event(
-            "approve_request",
-            request.target_identity_id,
-            actor=approver.email,
-            details={"request_id": request_id, "status": status},
-        )
+            audit_log_store.log_event(
+                "approve_request",
+                request.target_identity_id,
+                actor=approver.email,
+                details={"request_id": request_id, "status": status},
+            )
 
-        return updated_req
+            return updated_req
 
     def reject_request(
         self, request_id: str, approver_id: str, reason: str
     ) -> AccessRequest:
         """Reject a request."""
+        with self._request_lock(request_id):
+            request = request_store.get_request(request_id)
+            if not request:
+                raise ValueError("Request not found")
+            if request.status != "pending":
+                raise ValueError(
+                    f"Request is in {request.status} state, cannot reject."
+                )
+            self._check_approver(request, approver_id)
+
+            updated_req = request_store.update_request(
+                request_id,
+                {"status": "rejected", "approver_id": approver_id, "comments": reason},
+            )
+            if updated_req is None:
+                raise ValueError("Failed to update request")
+
+            approver = identity_store.get_identity(approver_id)
+            approver_email = approver.email if approver else "unknown"
+
+            audit_log_store.log_event(
+                "reject_request",
+                request.target_identity_id,
+                actor=approver_email,
+                details={"request_id": request_id, "reason": reason},
+            )
+
+            return updated_req
+
+    def decide_requests(
+        self, approver_id: str, decisions: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Approve or reject many requests in one call.
+
+        Every item (``request_id``, ``decision`` of "approve" or "reject",
+        optional ``reason``) is validated before anything changes; invalid
+        items are reported and skipped. Approved entitlements are provisioned
+        per target identity with one outbox operation per connector. Returns
+        one outcome per item, in order.
+        """
+        approver = identity_store.get_identity(approver_id)
+        if not approver:
+            raise ValueError("Approver identity not found")
+
+        outcomes: List[Dict[str, Any]] = []
+        valid: List[Dict[str, Any]] = []
+        seen: Set[str] = set()
+        for item in decisions:
+            request_id = item.get("request_id", "")
+            outcome: Dict[str, Any] = {"request_id": request_id}
+            outcomes.append(outcome)
+            try:
+                request = self._validate_decision(item, approver_id, seen)
+            except ValueError as e:
+                outcome.update(status="error", message=str(e))
+                continue
+            seen.add(request.id)
+            valid.append({**item, "request": request, "outcome": outcome})
+
+        # Decide per target identity, under its lock, so a grant cannot race
+        # a mover or another approval for the same identity.
+        by_target: Dict[str, List[Dict[str, Any]]] = {}
+        for item in valid:
+            by_target.setdefault(item["request"].target_identity_id, []).append(item)
+        audit_events: List[Dict[str, Any]] = []
+        for identity_id, items in by_target.items():
+            with jml_engine.identity_lock(identity_id):
+                audit_events += self._decide_for_identity(
+                    identity_id, items, approver_id, approver.email
+                )
+        audit_log_store.log_events(audit_events)
+        decided = sum(1 for outcome in outcomes if outcome["status"] != "error")
+        logger.info(
+            f"Bulk decision by {approver.email}: {decided} of "
+            f"{len(decisions)} requests decided"
+        )
+        return outcomes
+
+    def _decide_for_identity(
+        self,
+        identity_id: str,
+        items: List[Dict[str, Any]],
+        approver_id: str,
+        approver_email: str,
+    ) -> List[Dict[str, Any]]:
+        """Apply validated decisions for requests targeting one identity.
+
+        Approved entitlements are provisioned together. Returns the audit
+        events to write.
+        """
+        pending = []
+        for item in items:
+            request = request_store.get_request(item["request"].id)
+            if request is None or request.status != "pending":
+                # Decided by someone else since validation
+                state = request.status if request is not None else "unknown"
+                item["outcome"].update(
+                    status="error", message=f"Request is in {state} state"
+                )
+                continue
+            pending.append({**item, "request": request})
+
+        # Several approved requests may ask for the same entitlement; every
+        # one of them is traced so a dead letter fails them all.
+        grants: Dict[str, List[str]] = {}
+        for item in pending:
+            if item["decision"] == "approve":
+                request = item["request"]
+                grants.setdefault(request.entitlement, []).append(request.id)
+        error = None
+        if grants:
+            try:
+                jml_engine.provision_entitlements(identity_id, grants)
+            except Exception as e:
+                logger.error(f"Provisioning failed for identity {identity_id}: {e}")
+                error = f"Provisioning failed: {e}"
+
+        audit_events = []
+        for item in pending:
+            request = item["request"]
+            if item["decision"] == "reject":
+                status = "rejected"
+                comments = item.get("reason") or "No reason provided"
+                action = "reject_request"
+                details = {"request_id": request.id, "reason": comments}
+            else:
+                status, comments = self._settled(
+                    request.id,
+                    "failed" if error else "approved",
+                    error or "Approved via Access Request Workflow",
+                )
+                action = "approve_request"
+                details = {"request_id": request.id, "status": status}
+            request_store.update_request(
+                request.id,
+                {"status": status, "approver_id": approver_id, "comments": comments},
+            )
+            item["outcome"]["status"] = status
+            audit_events.append(
+                {
+                    "action": action,
+                    "target": request.target_identity_id,
+                    "actor": approver_email,
+                    "details": details,
+                }
+            )
+        return audit_events
+
+    @staticmethod
+    def _settled(request_id: str, status: str, comments: str) -> Tuple[str, str]:
+        """The outcome to record for an approval once provisioning returns.
+
+        Without a running dispatcher the outbox drains inline, so a grant
+        may already have been dead-lettered and its request failed.
+        """
+        current = request_store.get_request(request_id)
+        if current is not None and current.status == "failed":
+            return "failed", current.comments or comments
+        return status, comments
+
+    def _request_lock(self, request_id: str) -> ContextManager[object]:
+        """The identity lock of the request's target."""
         request = request_store.get_request(request_id)
+        if request is None:
+            return nullcontext()
+        return jml_engine.identity_lock(request.target_identity_id)
+
+    def _validate_decision(
+        self, item: Dict[str, Any], approver_id: str, seen: Set[str]
+    ) -> AccessRequest:
+        if item.get("decision") not in ("approve", "reject"):
+            raise ValueError("Decision must be 'approve' or 'reject'")
+        request = request_store.get_request(item.get("request_id", ""))
         if not request:
             raise ValueError("Request not found")
+        if request.id in seen:
+            raise ValueError("Duplicate decision for this request")
+        if request.status != "pending":
+            raise ValueError(f"Request is in {request.status} state")
+        if request.requester_id == approver_id:
+            raise ValueError("Self-approval is not allowed.")
+        self._check_approver(request, approver_id)
+        return request
 
-        updated_req = request_store.update_request(
-            request_id,
-            {"status": "rejected", "approver_id": approver_id, "comments": reason},
-        )
-        if updated_req is None:
-            raise ValueError("Failed to update request")
+    def route(self, identity_id: str) -> Optional[str]:
+        """The approver for requests targeting ``identity_id``: the nearest
+        manager in their chain who has not left, or None without one."""
+        for manager_id in org_hierarchy.management_chain(identity_id):
+            manager = identity_store.get_identity(manager_id)
+            if manager is not None and manager.status != "terminated":
+                return manager_id
+        return None
 
-        approver = identity_store.get_identity(approver_id)
-        approver_email = approver.email if approver else "unknown"
+    def inbox(self, approver_id: str) -> List[AccessRequest]:
+        """Pending requests routed to ``approver_id``."""
+        return request_store.pending_for_approver(approver_id)
 
-        audit_log_store.log_event(
-            "reject_request",
-            request.target_identity_id,
-            actor=approver_email,
-            details={"request_id": request_id, "reason": reason},
-        )
+    @staticmethod
+    def _check_approver(request: AccessRequest, approver_id: str) -> None:
+        # Routed requests may be decided by anyone above the target
+        if request.assigned_approver_id is None:
+            return
+        if not org_hierarchy.is_in_chain(request.target_identity_id, approver_id):
+            raise ValueError("Approver is not in the requester's management chain.")
+
+    def _reroute(
+        self, identity_id: str, old_manager: Optional[str], new_manager: Optional[str]
+    ) -> None:
+        """Send an identity's pending requests to its new manager."""
+        pending = request_store.list_requests("pending", target_identity_id=identity_id)
+        if not pending:
+            return
+        approver_id = self.route(identity_id)
+        for request in pending:
+            request_store.update_request(
+                request.id, {"assigned_approver_id": approver_id}
+            )
 
-        return updated_req
+    def _release_approvals(self, identity: IdentityProfile) -> None:
+        """Send a terminated approver's pending requests up their chains."""
+        if identity.status != "terminated" or identity_store.replaying:
+            return
+        if not request_store.count_pending_for_approver(identity.id):
+            return
+        for request in request_store.pending_for_approver(identity.id):
+            request_store.update_request(
+                request.id,
+                {"assigned_approver_id": self.route(request.target_identity_id)},
+            )
+
+    def _handle_dead_letter(self, op: OutboxOperation) -> None:
+        """Mark a request failed once its provisioning is dead-lettered."""
+        request_ids = op.payload.get("request_ids") or []
+        if op.payload.get("request_id") is not None:
+            request_ids = [op.payload["request_id"]]
+        for request_id in request_ids:
+            if request_store.get_request(request_id) is None:
+                continue
+            request_store.update_request(
+                request_id,
+                {
+                    "status": "failed",
+                    "comments": f"Provisioning failed: {op.last_error}",
+                },
+            )
+            audit_log_store.log_event(
+                "provisioning_failed",
+                op.payload["identity_id"],
+                details={"request_id": request_id, "operation": op.id},
+                status="failure",
+            )
+        if op.payload.get("added"):
+            self._withdraw(op)
+
+    @staticmethod
+    def _withdraw(op: OutboxOperation) -> None:
+        """Drop the entitlements a dead-lettered grant recorded up front."""
+        system = op.payload["system"]
+        withdrawn = {f"{system}:{group}" for group in op.payload["added"]}
+        identity_id = op.payload["identity_id"]
+        if identity_store.get_identity(identity_id) is None:
+            return
+        # Dead letters may be raised while another flow holds the identity
+        # lock, so the change is applied atomically instead.
+        identity = identity_store.modify_identity(
+            identity_id,
+            lambda current: {
+                "entitlements": [e for e in current.entitlements if e not in withdrawn]
+            },
+        )
+        logger.warning(
+            f"Withdrew {sorted(withdrawn)} from {identity.email}: grant "
+            f"{op.id} was dead-lettered"
+        )
 
 
 request_engine = RequestEngine()
+outbox_engine.on_dead_letter(request_engine._handle_dead_letter)
+org_hierarchy.on_manager_change(request_engine._reroute)
+identity_store.on_change(request_engine._release_approvals)
@@ -1,19 +1,78 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Any, Dict, List, Optional
-
+from typing import Any, AsyncIterator, Dict
+
+from backend.api.access import router as access_router
+from backend.api.audit import router as audit_router
+from backend.api.certifications import router as certifications_router
+from backend.api.identities import router as identities_router
+from backend.api.jml import router as jml_router
+from backend.api.metrics import router as metrics_router
+from backend.api.outbox import router as outbox_router
+from backend.api.policy import router as policy_router
+from backend.api.reconciliation import router as reconciliation_router
 from backend.config import settings
-from backend.stores.audit_log import AuditEvent, audit_log_store
-from backend.stores.identity_store import IdentityProfile, identity_store
-from backend.engines.jml_engine import jml_engine
+from backend.stores.audit_log import audit_log_store
+from backend.stores.audit_sink import AuditSink
+from backend.stores.identity_store import identity_store
+from backend.stores.event_cache import hr_event_cache
+from backend.stores.outbox_store import outbox_store
+from backend.stores.persistence import StoreJournal
+from backend.engines.outbox_engine import outbox_engine
+from backend.engines.policy_engine import policy_engine
+from backend.engines.provision_engine import provision_engine
 from connectors.azuread_connector import azure_ad_connector
 from connectors.github_connector import github_connector
 from connectors.slack_connector import slack_connector
-from backend.stores.request_store import AccessRequest, request_store
-from backend.engines.request_engine import request_engine
-
-app = FastAPI(title=settings.APP_NAME, version=settings.VERSION)
+from backend.stores.request_store import request_store
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    journal = None
+    if settings.PERSISTENCE_DIR:
+        journal = StoreJournal(
+            settings.PERSISTENCE_DIR,
+            fsync_every=settings.PERSISTENCE_FSYNC_EVERY,
+            fsync_interval_ms=settings.PERSISTENCE_FSYNC_INTERVAL_MS,
+            snapshot_every=settings.PERSISTENCE_SNAPSHOT_EVERY,
+        )
+        journal.register("identity", identity_store)
+        journal.register("request", request_store)
+        journal.register("outbox", outbox_store)
+        journal.register("hr_events", hr_event_cache)
+        journal.open()
+
+    sink = None
+    if settings.AUDIT_LOG_DIR:
+        sink = AuditSink(
+            settings.AUDIT_LOG_DIR,
+            segment_max_bytes=settings.AUDIT_SEGMENT_MAX_BYTES,
+            fsync_every=settings.AUDIT_FSYNC_EVERY,
+            fsync_interval_ms=settings.AUDIT_FSYNC_INTERVAL_MS,
+            queue_size=settings.AUDIT_QUEUE_SIZE,
+        )
+        sink.start()
+        audit_log_store.attach_sink(sink)
+    if settings.OUTBOX_BACKGROUND:
+        # Also resumes operations restored from the journal.
+        outbox_engine.start()
+    if settings.POLICY_RELOAD_INTERVAL_SECONDS > 0:
+        policy_engine.start_watcher(settings.POLICY_RELOAD_INTERVAL_SECONDS)
+    yield
+    policy_engine.stop_watcher()
+    outbox_engine.stop()
+    if sink is not None:
+        # Flush every queued audit event before the process exits.
+        audit_log_store.attach_sink(None)
+        sink.close(timeout=settings.AUDIT_CLOSE_TIMEOUT_SECONDS)
+    provision_engine.shutdown()
+    if journal is not None:
+        journal.close(checkpoint=True)
+
+
+app = FastAPI(title=settings.APP_NAME, version=settings.VERSION, lifespan=lifespan)
 
 # CORS
 app.add_middleware(
@@ -22,18 +81,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Paginated listings return their cursor and cache validator in headers
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
-
-class HRFeedEvent(BaseModel):
-    event_type: str
-    employee_id: str
-    first_name: Optional[str] = None
-    last_name: Optional[str] = None
-    email: Optional[str] = None
-    department: Optional[str] = None
-    job_title: Optional[str] = None
-    location: Optional[str] = None
+# Routers
+app.include_router(jml_router)
+app.include_router(audit_router)
+app.include_router(policy_router)
+app.include_router(certifications_router)
+app.include_router(outbox_router)
+app.include_router(identities_router)
+app.include_router(reconciliation_router)
+app.include_router(access_router)
+app.include_router(metrics_router)
 
 
 @app.get("/")
@@ -41,79 +102,6 @@ def read_root() -> Dict[str, str]:
     return {"status": "IGA Platform Running", "version": settings.VERSION}
 
 
-@app.post("/api/hr/event")
-def trigger_hr_event(event: HRFeedEvent) -> Dict[str, Any]:
-    """Simulate an event coming from the HR system (Workday/BambooHR)."""
-    payload = event.dict(exclude_none=True)
-    result = jml_engine.process_event(event.event_type, payload)
-    return result
-
-
-@app.get("/api/identities", response_model=List[IdentityProfile])
-def list_identities() -> List[IdentityProfile]:
-    return identity_store.list_identities()
-
-
-@app.get("/api/identities/{identity_id}")
-def get_identity(identity_id: str) -> IdentityProfile:
-    identity = identity_store.get_identity(identity_id)
-    if not identity:
-        raise HTTPException(status_code=404, detail="Identity not found")
-    return identity
-
-
-@app.get("/api/audit/logs", response_model=List[AuditEvent])
-def list_audit_logs() -> List[AuditEvent]:
-    return audit_log_store.get_logs()
-
-
-# --- Access Request Endpoints ---
-
-
-class AccessRequestCreate(BaseModel):
-    requester_id: str
-    entitlement: str
-    justification: str
-
-
-class AccessRequestAction(BaseModel):
-    approver_id: str
-    reason: Optional[str] = None
-
-
-@app.post("/api/requests")
-def submit_request(req: AccessRequestCreate) -> AccessRequest:
-    try:
-        return request_engine.submit_request(
-            req.requester_id, req.entitlement, req.justification
-        )
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-
-
-@app.get("/api/requests")
-def list_requests(status: Optional[str] = None) -> List[AccessRequest]:
-    return request_store.list_requests(status)
-
-
-@app.post("/api/requests/{request_id}/approve")
-def approve_request(request_id: str, action: AccessRequestAction) -> AccessRequest:
-    try:
-        return request_engine.approve_request(request_id, action.approver_id)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-
-
-@app.post("/api/requests/{request_id}/reject")
-def reject_request(request_id: str, action: AccessRequestAction) -> AccessRequest:
-    try:
-        return request_engine.reject_request(
-            request_id, action.approver_id, action.reason or "No reason provided"
-        )
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-
-
 # --- Connector Debug Endpoints ---
 @app.get("/api/connectors/azuread/users")
 def list_azure_users() -> Dict[str, Any]:
@@ -1,8 +1,25 @@
+import bisect
+import logging
+import threading
 import uuid
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+)
 from pydantic import BaseModel, Field
 
+if TYPE_CHECKING:
+    from backend.stores.audit_sink import AuditSink
+
+logger = logging.getLogger("AuditLogStore")
+
 
 class AuditEvent(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -14,9 +31,33 @@ class AuditEvent(BaseModel):
     status: str = "success"  # success, failure
 
 
+_INDEXED_FIELDS = ("target", "actor", "action")
+
+
 class AuditLogStore:
     def __init__(self) -> None:
-        self._logs: List[AuditEvent] = []
+        self._lock = threading.RLock()
+        self._sink: Optional["AuditSink"] = None
+        self.reset()
+
+    def attach_sink(self, sink: Optional["AuditSink"]) -> None:
+        """Forward every new event to a background sink (None to detach)."""
+        self._sink = sink
+
+    @property
+    def sink(self) -> Optional["AuditSink"]:
+        return self._sink
+
+    def reset(self) -> None:
+        """Drop all events and indexes."""
+        with self._lock:
+            # Events are stored in append order, which is also timestamp order.
+            self._logs: List[AuditEvent] = []
+            self._timestamps: List[datetime] = []
+            # field -> value -> positions in self._logs, ascending
+            self._indexes: Dict[str, Dict[str, List[int]]] = {
+                field: {} for field in _INDEXED_FIELDS
+            }
 
     def log_event(
         self,
@@ -26,18 +67,180 @@ class AuditLogStore:
         details: Optional[Dict[str, Any]] = None,
         status: str = "success",
     ) -> None:
-        event = AuditEvent(
-            action=action, target=target, actor=actor, details=details, status=status
-        )
-        self._logs.append(event)
-        # In a real system, this would write to a database or SIEM
-        print(f"[AUDIT] {event.timestamp} - {action} on {target} by {actor}: {status}")
+        # Appends are serialised so positions and timestamps stay in order;
+        # readers don't lock because entries are never changed or removed.
+        with self._lock:
+            timestamp = datetime.now()
+            if self._timestamps and timestamp < self._timestamps[-1]:
+                # Keep the log sorted if the wall clock steps backwards.
+                timestamp = self._timestamps[-1]
+            # Arguments are already typed; skip validation on the hot path.
+            # Details are copied so later changes by the caller cannot alter
+            # an event that is already stored or queued for the sink.
+            event = AuditEvent.model_construct(
+                id=str(uuid.uuid4()),
+                timestamp=timestamp,
+                action=action,
+                target=target,
+                actor=actor,
+                details=_copy(details) if details else details,
+                status=status,
+            )
+
+            position = len(self._logs)
+            self._timestamps.append(timestamp)
+            self._logs.append(event)
+            for field in _INDEXED_FIELDS:
+                index = self._indexes[field]
+                index.setdefault(getattr(event, field), []).append(position)
+            # Durable storage (file/SIEM) happens off the request path in the
+            # sink.
+            if self._sink is not None:
+                self._sink.submit(event)
+        logger.debug("%s on %s by %s: %s", action, target, actor, status)
+
+    def log_events(self, entries: Iterable[Dict[str, Any]]) -> None:
+        """Record several events; each entry holds ``log_event`` arguments."""
+        with self._lock:
+            for entry in entries:
+                self.log_event(**entry)
 
     def get_logs(self, limit: int = 100) -> List[AuditEvent]:
-        return sorted(self._logs, key=lambda x: x.timestamp, reverse=True)[:limit]
+        return self.query_logs(limit=limit)
 
     def get_logs_by_target(self, target: str) -> List[AuditEvent]:
-        return [log for log in self._logs if log.target == target]
+        return [self._logs[i] for i in self._indexes["target"].get(target, [])]
+
+    def count(self) -> int:
+        return len(self._logs)
+
+    def query_logs(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        target: Optional[str] = None,
+        actor: Optional[str] = None,
+        action: Optional[str] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+    ) -> List[AuditEvent]:
+        """Query events newest first within ``[start, end)``.
+
+        Pass the cursor of the last event of a page (see ``cursor_for``) to
+        fetch the next, older page.
+        """
+        before = len(self._logs)
+        if cursor is not None:
+            try:
+                before = min(int(cursor), before)
+            except ValueError:
+                raise ValueError("Invalid cursor")
+
+        results: List[AuditEvent] = []
+        for position in self._scan(
+            start, end, target, actor, action, before, newest_first=True
+        ):
+            if len(results) >= limit:
+                break
+            event = self._logs[position]
+            if self._matches(event, target, actor, action):
+                results.append(event)
+        return results
+
+    def iter_logs(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        target: Optional[str] = None,
+        actor: Optional[str] = None,
+        action: Optional[str] = None,
+    ) -> Iterator[AuditEvent]:
+        """Lazily yield matching events oldest first, e.g. for exports.
+
+        The result set is fixed when iteration starts; events logged while
+        the export is running are not included.
+        """
+        for position in self._scan(
+            start, end, target, actor, action, len(self._logs), newest_first=False
+        ):
+            event = self._logs[position]
+            if self._matches(event, target, actor, action):
+                yield event
+
+    def cursor_for(self, event: AuditEvent) -> str:
+        """Opaque cursor that resumes a newest-first listing after ``event``."""
+        position = bisect.bisect_left(self._timestamps, event.timestamp)
+        while self._logs[position].id != event.id:
+            position += 1
+        return str(position)
+
+    def _scan(
+        self,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        target: Optional[str],
+        actor: Optional[str],
+        action: Optional[str],
+        before: int,
+        newest_first: bool,
+    ) -> Iterator[int]:
+        """Yield candidate positions in the time range.
+
+        Positions come from the most selective index among the filters, or
+        straight from the log when no filter is given; nothing is copied.
+        """
+        lo = 0 if start is None else bisect.bisect_left(self._timestamps, _local(start))
+        hi = before
+        if end is not None:
+            hi = min(hi, bisect.bisect_left(self._timestamps, _local(end)))
+        if lo >= hi:
+            return
+
+        filters = {"target": target, "actor": actor, "action": action}
+        indexed = [
+            self._indexes[field].get(value, [])
+            for field, value in filters.items()
+            if value is not None
+        ]
+        if not indexed:
+            positions: Sequence[int] = range(lo, hi)
+            window = range(len(positions))
+        else:
+            positions = min(indexed, key=len)
+            window = range(
+                bisect.bisect_left(positions, lo), bisect.bisect_left(positions, hi)
+            )
+        for i in reversed(window) if newest_first else window:
+            yield positions[i]
+
+    @staticmethod
+    def _matches(
+        event: AuditEvent,
+        target: Optional[str],
+        actor: Optional[str],
+        action: Optional[str],
+    ) -> bool:
+        return (
+            (target is None or event.target == target)
+            and (actor is None or event.actor == actor)
+            and (action is None or event.action == action)
+        )
+
+
+def _copy(value: Any) -> Any:
+    """Copy the dicts and lists of event details, sharing immutable leaves."""
+    if isinstance(value, dict):
+        return {key: _copy(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    return value
+
+
+def _local(value: datetime) -> datetime:
+    """Bring a query bound to the naive local time events are stamped with."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone().replace(tzinfo=None)
 
 
 # Singleton
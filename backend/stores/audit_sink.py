@@ -0,0 +1,291 @@
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from typing import IO, List, Optional, Union
+
+from backend.stores.audit_log import AuditEvent
+
+logger = logging.getLogger("AuditSink")
+
+_SEGMENT_PATTERN = re.compile(r"^audit-(\d{8})\.jsonl$")
+
+
+class _Marker:
+    """Control item placed on the queue behind pending events."""
+
+    def __init__(self, stop: bool = False) -> None:
+        self.stop = stop
+        self.ok = False  # every event queued ahead of it was made durable
+        self.done = threading.Event()
+
+
+class AuditSink:
+    """Background writer appending audit events to rotating JSONL segments.
+
+    Events are taken from a bounded queue, written in batches and made
+    durable with group commit: one fsync covers every event written since
+    the previous one, issued after ``fsync_every`` events or
+    ``fsync_interval_ms`` milliseconds, whichever comes first. A full queue
+    blocks the producer rather than dropping audit events.
+
+    I/O errors never stop the writer. Unwritten events are kept and retried
+    every ``fsync_interval_ms`` on a fresh segment (a torn write may leave a
+    partial last line, and a retried event can appear twice with the same
+    id). While ``queue_size`` events are held back the writer stops taking
+    new ones, so producers block until the disk recovers. ``flush`` and
+    ``close`` report whether everything queued before them is durable.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_max_bytes: int = 64 * 1024 * 1024,
+        fsync_every: int = 256,
+        fsync_interval_ms: int = 100,
+        queue_size: int = 10000,
+        max_batch: int = 1024,
+    ) -> None:
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval_ms / 1000
+        self.max_batch = max_batch
+        self.max_pending = queue_size
+        self._queue: "queue.Queue[Union[AuditEvent, _Marker]]" = queue.Queue(
+            maxsize=queue_size
+        )
+        self._thread: Optional[threading.Thread] = None
+        self._file: Optional[IO[bytes]] = None
+        self._segment = 0
+        self._pending: List[bytes] = []  # serialised, not yet written
+        self._unsynced = 0
+        self._last_sync = time.monotonic()  # last fsync or retry attempt
+        # Set on any I/O failure; the next marker reports it and clears it.
+        self._failed_since_marker = False
+        self.events_written = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def pending(self) -> int:
+        """Events taken off the queue but not yet written."""
+        return len(self._pending)
+
+    @property
+    def segment_path(self) -> str:
+        return os.path.join(self.directory, f"audit-{self._segment:08d}.jsonl")
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        existing = [
+            int(match.group(1))
+            for match in map(_SEGMENT_PATTERN.match, os.listdir(self.directory))
+            if match
+        ]
+        # Never append to a segment written by a previous process.
+        self._segment = max(existing, default=0) + 1
+        self._file = open(self.segment_path, "ab")
+        self._thread = threading.Thread(
+            target=self._run, name="audit-sink", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Audit sink writing to {self.segment_path}")
+
+    def submit(self, event: AuditEvent) -> None:
+        """Queue an event for writing. Blocks while the queue is full."""
+        self._queue.put(event)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every event submitted so far is written and fsynced.
+
+        Returns False on timeout or if any of them could not be made durable.
+        """
+        return self._send_marker(_Marker(), timeout)
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """Flush pending events and stop the writer thread.
+
+        Returns False if the flush timed out or failed; events still
+        unwritten at that point are lost.
+        """
+        if self._thread is None:
+            return True
+        ok = self._send_marker(_Marker(stop=True), timeout)
+        self._thread.join(timeout)
+        self._thread = None
+        if not ok:
+            logger.error("Audit sink closed before every event was made durable")
+        return ok
+
+    def _send_marker(self, marker: _Marker, timeout: Optional[float]) -> bool:
+        if self._thread is None:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            self._queue.put(marker, timeout=timeout)
+        except queue.Full:
+            return False
+        if deadline is not None:
+            timeout = max(0.0, deadline - time.monotonic())
+        return marker.done.wait(timeout) and marker.ok
+
+    def _run(self) -> None:
+        while True:
+            if len(self._pending) >= self.max_pending:
+                # Writes are failing: leave new events on the queue so the
+                # producers block instead of growing memory.
+                time.sleep(self.fsync_interval)
+                self._retry()
+                continue
+            try:
+                item = self._queue.get(timeout=self._time_to_sync())
+            except queue.Empty:
+                self._retry()
+                continue
+
+            batch: List[Union[AuditEvent, _Marker]] = [item]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                stopped = self._write_batch(batch)
+            except Exception:
+                # Never let the writer die: producers would block forever.
+                logger.exception("Audit sink failed to process a batch")
+                self._failed_since_marker = True
+                stopped = self._release_markers(batch)
+            if stopped:
+                return
+
+    def _write_batch(self, batch: List[Union[AuditEvent, _Marker]]) -> bool:
+        """Write a batch; returns True once a stop marker has been handled."""
+        for item in batch:
+            if isinstance(item, AuditEvent):
+                self._pending.append(item.model_dump_json().encode() + b"\n")
+                continue
+
+            # Everything queued ahead of a marker must be durable first.
+            self._retry()
+            item.ok = not (self._pending or self._unsynced or self._failed_since_marker)
+            self._failed_since_marker = False
+            if item.stop:
+                if self._pending:
+                    logger.error(
+                        f"Audit sink stopping with {len(self._pending)} "
+                        "unwritten events"
+                    )
+                self._close_file()
+                item.done.set()
+                return True
+            item.done.set()
+
+        self._write_pending()
+        if (
+            self._unsynced >= self.fsync_every
+            or time.monotonic() - self._last_sync >= self.fsync_interval
+        ):
+            self._sync()
+        return False
+
+    def _release_markers(self, batch: List[Union[AuditEvent, _Marker]]) -> bool:
+        """Fail the markers of a batch that could not be processed."""
+        stopped = False
+        for item in batch:
+            if isinstance(item, _Marker) and not item.done.is_set():
+                if item.stop:
+                    self._close_file()
+                    stopped = True
+                item.done.set()
+        return stopped
+
+    def _retry(self) -> None:
+        """Write held-back events and fsync; no-op when all is durable."""
+        if self._write_pending():
+            self._sync()
+
+    def _write_pending(self) -> bool:
+        if not self._pending:
+            return True
+        try:
+            if self._file is None:
+                self._file = open(self.segment_path, "ab")
+            self._file.write(b"".join(self._pending))
+        except OSError as e:
+            self._failed(f"write {len(self._pending)} audit events", e)
+            # Retry on a fresh segment rather than after a torn line.
+            self._close_file()
+            self._segment += 1
+            self._last_sync = time.monotonic()
+            return False
+        self._unsynced += len(self._pending)
+        self.events_written += len(self._pending)
+        self._pending = []
+        self._recovered()
+        if self._file.tell() >= self.segment_max_bytes:
+            self._rotate()
+        return True
+
+    def _rotate(self) -> None:
+        if not self._sync():
+            return  # Stay on this segment until it is durable
+        self._close_file()
+        self._segment += 1
+        try:
+            self._file = open(self.segment_path, "ab")
+        except OSError as e:
+            self._failed("open audit segment", e)  # Reopened on the next write
+
+    def _sync(self) -> bool:
+        ok = True
+        if self._file is not None and self._unsynced:
+            try:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            except OSError as e:
+                self._failed("fsync audit segment", e)
+                ok = False
+            else:
+                self._unsynced = 0
+                self._recovered()
+        self._last_sync = time.monotonic()
+        return ok
+
+    def _close_file(self) -> None:
+        if self._file is None:
+            return
+        try:
+            self._file.close()
+        except OSError as e:
+            self._failed("close audit segment", e)
+        self._file = None
+        if self._unsynced:
+            # Closed without a successful fsync: durability is unknown.
+            self._failed_since_marker = True
+            self._unsynced = 0
+
+    def _failed(self, what: str, error: OSError) -> None:
+        self._failed_since_marker = True
+        if self.last_error is None:
+            logger.error(f"Audit sink failed to {what}: {error}; retrying")
+        self.last_error = f"{what}: {error}"
+
+    def _recovered(self) -> None:
+        if self.last_error is not None:
+            logger.info("Audit sink recovered")
+            self.last_error = None
+
+    def _time_to_sync(self) -> Optional[float]:
+        if not self._unsynced and not self._pending:
+            return None
+        return max(0.0, self._last_sync + self.fsync_interval - time.monotonic())
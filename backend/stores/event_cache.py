@@ -0,0 +1,105 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from pydantic import BaseModel
+
+from backend.config import settings
+
+if TYPE_CHECKING:
+    from backend.stores.persistence import StoreJournal
+
+
+class ProcessedEvent(BaseModel):
+    event_id: str
+    result: Dict[str, Any]
+    processed_at: datetime
+
+
+class EventDedupeCache:
+    """Bounded LRU + TTL cache of processed HR event ids and their results.
+
+    Lookups and inserts are O(1). Entries expire ``ttl_seconds`` after the
+    event was processed, and the least recently used entry is evicted once
+    ``max_entries`` is exceeded. With a journal attached, entries survive a
+    restart, so replayed feeds are still recognised.
+    """
+
+    def __init__(self, max_entries: int = 100000, ttl_seconds: int = 604800) -> None:
+        self.max_entries = max_entries
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self._journal: Optional["StoreJournal"] = None
+        self._journal_name = "hr_events"
+        self._lock = threading.Lock()
+        self.reset()
+
+    def attach_journal(self, journal: Optional["StoreJournal"], name: str) -> None:
+        """Journal every insert to a write-ahead log (None to detach)."""
+        self._journal = journal
+        self._journal_name = name
+
+    def snapshot_records(self) -> List[ProcessedEvent]:
+        with self._lock:
+            self._expire(datetime.now())
+            return list(self._entries.values())
+
+    def load_record(self, data: str) -> None:
+        """Insert an entry from its JSON form (journal replay)."""
+        entry = ProcessedEvent.model_validate_json(data)
+        with self._lock:
+            self._store(entry)
+
+    def reset(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            # Least recently used first
+            self._entries: "OrderedDict[str, ProcessedEvent]" = OrderedDict()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, event_id: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result of an already processed event, if any."""
+        with self._lock:
+            entry = self._entries.get(event_id)
+            if entry is None or datetime.now() - entry.processed_at > self.ttl:
+                if entry is not None:
+                    del self._entries[event_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(event_id)
+            self.hits += 1
+            return entry.result
+
+    def put(self, event_id: str, result: Dict[str, Any]) -> None:
+        entry = ProcessedEvent(
+            event_id=event_id, result=result, processed_at=datetime.now()
+        )
+        with self._lock:
+            self._store(entry)
+        if self._journal is not None:
+            self._journal.append(self._journal_name, entry)
+
+    def _store(self, entry: ProcessedEvent) -> None:
+        self._entries[entry.event_id] = entry
+        self._entries.move_to_end(entry.event_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _expire(self, now: datetime) -> None:
+        # Recency order is close to insertion order; drop expired entries
+        # from the old end and let lookups catch any stragglers.
+        while self._entries:
+            oldest = next(iter(self._entries.values()))
+            if now - oldest.processed_at <= self.ttl:
+                break
+            self._entries.popitem(last=False)
+
+
+# Singleton instance
+hr_event_cache = EventDedupeCache(
+    max_entries=settings.EVENT_DEDUPE_MAX_ENTRIES,
+    ttl_seconds=settings.EVENT_DEDUPE_TTL_SECONDS,
+)
@@ -1,7 +1,16 @@
+import base64
+import json
+import threading
 import uuid
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
 from pydantic import BaseModel, Field
+from sortedcontainers import SortedList
+
+from backend.stores.patching import apply_patch
+
+if TYPE_CHECKING:
+    from backend.stores.persistence import StoreJournal
 
 
 class IdentityProfile(BaseModel):
@@ -18,30 +27,126 @@ class IdentityProfile(BaseModel):
     risk_score: str = "low"  # low, medium, high, critical
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
+    version: int = 1  # Incremented on every change
     entitlements: List[str] = []
-    accounts: Dict[
-        str, str
-    ] = {}  # e.g. {"azure_ad": "user_principal_name", "github": "username"}
+    # e.g. {"azure_ad": "user_principal_name", "azure_ad_object_id": "object_id",
+    #       "github": "username"}
+    accounts: Dict[str, str] = {}
+
+
+# Fields with a secondary index (value -> ids in insertion order)
+INDEXED_FIELDS = ("department", "status", "lifecycle_state", "manager_id", "email")
+# Fields accepted by ``query_identities`` as filters and as sort keys
+FILTER_FIELDS = (
+    "department",
+    "status",
+    "lifecycle_state",
+    "manager_id",
+    "risk_score",
+    "email",
+)
+SORT_FIELDS = (
+    "created_at",
+    "updated_at",
+    "employee_id",
+    "email",
+    "first_name",
+    "last_name",
+    "department",
+    "job_title",
+    "status",
+    "lifecycle_state",
+    "risk_score",
+)
 
 
 class IdentityStore:
+    """Identity profiles with secondary indexes and maintained sort orders.
+
+    Writes hold the store lock, so the read-modify-write in
+    ``update_identity`` and ``modify_identity`` cannot lose a concurrent
+    change, and listeners are notified in the order changes were made.
+    Records are replaced, never mutated, so single-record reads don't lock.
+    """
+
     def __init__(self) -> None:
-        self._identities: Dict[str, IdentityProfile] = {}
-        self._employee_id_map: Dict[str, str] = {}  # employee_id -> id
+        self._lock = threading.RLock()
+        self._journal: Optional["StoreJournal"] = None
+        self._journal_name = "identity"
+        self._listeners: List[Callable[[IdentityProfile], None]] = []
+        # True while a journal record is being loaded
+        self.replaying = False
+        self.reset()
 
-    def create_identity(self, profile_data: Dict[str, Any]) -> IdentityProfile:
-        # Check uniqueness
-        if profile_data.get("employee_id") in self._employee_id_map:
-            raise ValueError(
-                f"Identity with employee_id {profile_data['employee_id']} "
-                "already exists."
-            )
+    def on_change(self, listener: Callable[[IdentityProfile], None]) -> None:
+        """Call ``listener`` with every created, updated or replayed identity.
+
+        Replayed identities rebuild derived indexes only; listeners that act
+        on a change (rerouting requests, say) must skip them while
+        ``replaying`` is set, as the journal already holds their effects.
+        """
+        self._listeners.append(listener)
 
+    def reset(self) -> None:
+        """Drop all identities."""
+        with self._lock:
+            self._identities: Dict[str, IdentityProfile] = {}
+            self._employee_id_map: Dict[str, str] = {}  # employee_id -> id
+            self._indexes: Dict[str, Dict[Any, Dict[str, None]]] = {
+                field: {} for field in INDEXED_FIELDS
+            }
+            # Sort field -> sorted (value, id) keys, built on first use and
+            # then maintained on every change in O(log n)
+            self._sorted: Dict[str, SortedList] = {}
+
+    def attach_journal(self, journal: Optional["StoreJournal"], name: str) -> None:
+        """Journal every mutation to a write-ahead log (None to detach)."""
+        self._journal = journal
+        self._journal_name = name
+
+    def snapshot_records(self) -> List[IdentityProfile]:
+        return self.list_identities()
+
+    def load_record(self, data: str) -> None:
+        """Insert or replace an identity from its JSON form (journal replay)."""
+        profile = IdentityProfile.model_validate_json(data)
+        with self._lock:
+            self._reindex(self._identities.get(profile.id), profile)
+            self._identities[profile.id] = profile
+            self._employee_id_map[profile.employee_id] = profile.id
+            self.replaying = True
+            try:
+                self._notify(profile)
+            finally:
+                self.replaying = False
+
+    def create_identity(self, profile_data: Dict[str, Any]) -> IdentityProfile:
         profile = IdentityProfile(**profile_data)
-        self._identities[profile.id] = profile
-        self._employee_id_map[profile.employee_id] = profile.id
+        with self._lock:
+            # Check uniqueness
+            if profile.employee_id in self._employee_id_map:
+                raise ValueError(
+                    f"Identity with employee_id {profile.employee_id} "
+                    "already exists."
+                )
+            self._reindex(None, profile)
+            self._identities[profile.id] = profile
+            self._employee_id_map[profile.employee_id] = profile.id
+            if self._journal is not None:
+                self._journal.append(self._journal_name, profile)
+            self._notify(profile)
         return profile
 
+    def count(self, status: Optional[str] = None) -> int:
+        if status is None:
+            return len(self._identities)
+        return len(self._indexes["status"].get(status, {}))
+
+    def status_counts(self) -> Dict[str, int]:
+        """Number of identities per status."""
+        with self._lock:
+            return {status: len(ids) for status, ids in self._indexes["status"].items()}
+
     def get_identity(self, identity_id: str) -> Optional[IdentityProfile]:
         return self._identities.get(identity_id)
 
@@ -53,23 +158,216 @@ class IdentityStore:
             return self._identities.get(identity_id)
         return None
 
+    def get_identity_by_email(self, email: str) -> Optional[IdentityProfile]:
+        with self._lock:
+            matches = self._indexes["email"].get(email)
+            return self._identities[next(iter(matches))] if matches else None
+
+    def find_identities(
+        self,
+        department: Optional[str] = None,
+        status: Optional[str] = None,
+        lifecycle_state: Optional[str] = None,
+        manager_id: Optional[str] = None,
+        email: Optional[str] = None,
+    ) -> List[IdentityProfile]:
+        """Identities matching every given attribute, from the secondary indexes.
+
+        The smallest matching index bucket is probed against the others, so
+        the cost grows with that bucket rather than with the store.
+        """
+        with self._lock:
+            ids = self._match(
+                {
+                    "department": department,
+                    "status": status,
+                    "lifecycle_state": lifecycle_state,
+                    "manager_id": manager_id,
+                    "email": email,
+                }
+            )
+            if ids is None:
+                return self.list_identities()
+            return [self._identities[identity_id] for identity_id in ids]
+
     def update_identity(
         self, identity_id: str, updates: Dict[str, Any]
     ) -> IdentityProfile:
-        if identity_id not in self._identities:
-            raise ValueError("Identity not found")
+        return self.modify_identity(identity_id, lambda identity: updates)
 
-        identity = self._identities[identity_id]
-        updated_data = identity.dict()
-        updated_data.update(updates)
-        updated_data["updated_at"] = datetime.now()
+    def modify_identity(
+        self,
+        identity_id: str,
+        change: Callable[[IdentityProfile], Dict[str, Any]],
+    ) -> IdentityProfile:
+        """Apply the updates ``change`` derives from the current identity.
 
-        new_identity = IdentityProfile(**updated_data)
-        self._identities[identity_id] = new_identity
-        return new_identity
+        ``change`` runs under the store lock, so updates computed from the
+        current value (e.g. adding to ``accounts``) are never based on a
+        stale copy. It must be quick: other writers wait while it runs.
+        """
+        with self._lock:
+            identity = self._identities.get(identity_id)
+            if identity is None:
+                raise ValueError("Identity not found")
+            new_identity = apply_patch(identity, change(identity))
+            if new_identity is None:
+                return identity  # No-op update, keep the current version
+            new_identity.updated_at = datetime.now()
+            new_identity.version = identity.version + 1
+
+            self._reindex(identity, new_identity)
+            self._identities[identity_id] = new_identity
+            if self._journal is not None:
+                self._journal.append(self._journal_name, new_identity)
+            self._notify(new_identity)
+            return new_identity
 
     def list_identities(self) -> List[IdentityProfile]:
-        return list(self._identities.values())
+        with self._lock:
+            return list(self._identities.values())
+
+    def query_identities(
+        self,
+        filters: Optional[Dict[str, Any]] = None,
+        sort: str = "created_at",
+        descending: bool = False,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> List[IdentityProfile]:
+        """List identities matching every filter, ordered by ``sort`` (ties
+        broken by id).
+
+        Pass the cursor of the last identity of a page (see ``cursor_for``)
+        to fetch the next one. Pages are read from a maintained sort order,
+        so a page costs roughly its size divided by the filters' selectivity
+        rather than a sort of the whole store.
+        """
+        active = {name: value for name, value in (filters or {}).items() if value}
+        unknown = sorted(set(active) - set(FILTER_FIELDS))
+        if unknown:
+            raise ValueError(f"Cannot filter on {', '.join(unknown)}")
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"Cannot sort by {sort}")
+        anchor = None if cursor is None else self._decode_cursor(cursor, sort)
+        with self._lock:
+            return self._query(active, sort, descending, limit, anchor)
+
+    def _query(
+        self,
+        active: Dict[str, Any],
+        sort: str,
+        descending: bool,
+        limit: Optional[int],
+        anchor: Optional[Tuple[Any, str]],
+    ) -> List[IdentityProfile]:
+        candidates = self._match(active)
+        if candidates is not None and (
+            limit is None or len(candidates) * 8 <= len(self._identities)
+        ):
+            # Sorting a selective index match beats walking the full order
+            keys = SortedList(
+                (getattr(self._identities[identity_id], sort), identity_id)
+                for identity_id in candidates
+            )
+            active = {n: v for n, v in active.items() if n not in INDEXED_FIELDS}
+        else:
+            keys = self._sort_keys(sort)
+
+        if anchor is None:
+            position = len(keys) if descending else 0
+        elif descending:
+            position = keys.bisect_left(anchor)
+        else:
+            position = keys.bisect_right(anchor)
+        ordered = (
+            keys.islice(0, position, reverse=True)
+            if descending
+            else keys.islice(position)
+        )
+
+        results: List[IdentityProfile] = []
+        for _, identity_id in ordered:
+            if limit is not None and len(results) >= limit:
+                break
+            identity = self._identities[identity_id]
+            if all(getattr(identity, name) == value for name, value in active.items()):
+                results.append(identity)
+        return results
+
+    def cursor_for(self, identity: IdentityProfile, sort: str = "created_at") -> str:
+        """Opaque cursor that resumes a ``sort`` ordered listing after
+        ``identity``."""
+        value = getattr(identity, sort)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        raw = json.dumps([sort, value, identity.id]).encode()
+        return base64.urlsafe_b64encode(raw).decode()
+
+    def _decode_cursor(self, cursor: str, sort: str) -> Tuple[Any, str]:
+        try:
+            field, value, identity_id = json.loads(base64.urlsafe_b64decode(cursor))
+            if field != sort:
+                raise ValueError("Cursor belongs to a different sort order")
+            if sort in ("created_at", "updated_at"):
+                value = datetime.fromisoformat(value)
+            return value, str(identity_id)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid cursor: {e}")
+
+    def _match(self, criteria: Dict[str, Any]) -> Optional[List[str]]:
+        """Ids matching every indexed criterion; None if none is indexed."""
+        buckets = sorted(
+            (
+                self._indexes[field].get(value, {})
+                for field, value in criteria.items()
+                if field in INDEXED_FIELDS and value is not None
+            ),
+            key=len,
+        )
+        if not buckets:
+            return None
+        smallest, others = buckets[0], buckets[1:]
+        return [
+            identity_id
+            for identity_id in smallest
+            if all(identity_id in bucket for bucket in others)
+        ]
+
+    def _sort_keys(self, sort: str) -> SortedList:
+        keys = self._sorted.get(sort)
+        if keys is None:
+            keys = SortedList(
+                (getattr(identity, sort), identity.id)
+                for identity in self._identities.values()
+            )
+            self._sorted[sort] = keys
+        return keys
+
+    def _notify(self, identity: IdentityProfile) -> None:
+        for listener in self._listeners:
+            listener(identity)
+
+    def _reindex(self, old: Optional[IdentityProfile], new: IdentityProfile) -> None:
+        for field, index in self._indexes.items():
+            value = getattr(new, field)
+            if old is not None:
+                old_value = getattr(old, field)
+                if old_value == value:
+                    continue
+                bucket = index[old_value]
+                del bucket[old.id]
+                if not bucket:
+                    del index[old_value]
+            index.setdefault(value, {})[new.id] = None
+        for field, keys in self._sorted.items():
+            new_key = (getattr(new, field), new.id)
+            if old is not None:
+                old_key = (getattr(old, field), old.id)
+                if old_key == new_key:
+                    continue
+                keys.remove(old_key)
+            keys.add(new_key)
 
 
 # Singleton instance
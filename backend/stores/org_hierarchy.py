@@ -0,0 +1,123 @@
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from backend.stores.identity_store import IdentityProfile, identity_store
+
+logger = logging.getLogger("OrgHierarchy")
+
+ManagerChangeListener = Callable[[str, Optional[str], Optional[str]], None]
+
+
+class OrgHierarchy:
+    """Reporting lines built from ``IdentityProfile.manager_id``.
+
+    Kept up to date from identity store change notifications. Each
+    identity's management chain (manager, skip-level, ... up to the top) is
+    computed once, reusing its manager's cached chain, and cached until a
+    manager change above it. A manager change invalidates only the moved
+    identity's own subtree, found through the direct-reports index.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._listeners: List[ManagerChangeListener] = []
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget every reporting line."""
+        with self._lock:
+            self._managers: Dict[str, Optional[str]] = {}  # id -> manager id
+            self._reports: Dict[str, Dict[str, None]] = {}  # manager -> reports
+            self._chains: Dict[str, Tuple[str, ...]] = {}
+
+    def on_manager_change(self, listener: ManagerChangeListener) -> None:
+        """Call ``listener(identity_id, old_manager, new_manager)`` on moves."""
+        self._listeners.append(listener)
+
+    def track(self, identity: IdentityProfile) -> None:
+        """Record an identity's current manager (identity store listener)."""
+        with self._lock:
+            known = identity.id in self._managers
+            old = self._managers.get(identity.id)
+            new = identity.manager_id
+            if known and old == new:
+                return
+            if old is not None:
+                reports = self._reports[old]
+                del reports[identity.id]
+                if not reports:
+                    del self._reports[old]
+            if new is not None:
+                self._reports.setdefault(new, {})[identity.id] = None
+            self._managers[identity.id] = new
+            self._invalidate(identity.id)
+        # Replayed moves were acted on before the restart
+        if known and not identity_store.replaying:
+            for listener in self._listeners:
+                listener(identity.id, old, new)
+
+    def manager_of(self, identity_id: str) -> Optional[str]:
+        return self._managers.get(identity_id)
+
+    def direct_reports(self, manager_id: str) -> List[str]:
+        return list(self._reports.get(manager_id, {}))
+
+    def management_chain(self, identity_id: str) -> List[str]:
+        """Ids of the identity's manager, their manager and so on, nearest
+        first. A reporting cycle ends the chain where it repeats."""
+        return list(self._chain(identity_id))
+
+    def is_in_chain(self, identity_id: str, manager_id: str) -> bool:
+        return manager_id in self._chain(identity_id)
+
+    def _chain(self, identity_id: str) -> Tuple[str, ...]:
+        chain = self._chains.get(identity_id)
+        if chain is not None:
+            return chain
+        with self._lock:
+            # Walk up to the first identity with a cached chain, then fill the
+            # cache back down so every identity on the path is computed once.
+            path: List[str] = []
+            seen = {identity_id}
+            current = self._managers.get(identity_id)
+            tail: Tuple[str, ...] = ()
+            cyclic = False
+            while current is not None:
+                cached = self._chains.get(current)
+                if cached is not None:
+                    tail = (current,) + cached
+                    break
+                if current in seen:
+                    cyclic = True
+                    break
+                seen.add(current)
+                path.append(current)
+                current = self._managers.get(current)
+            if identity_id in tail:
+                cyclic = True
+                tail = tail[: tail.index(identity_id)]
+            chain = tuple(path) + tail
+            self._chains[identity_id] = chain
+            if cyclic:
+                logger.warning(f"Reporting cycle above {identity_id}")
+            else:
+                for i, manager_id in enumerate(path):
+                    self._chains[manager_id] = chain[i + 1 :]
+            return chain
+
+    def _invalidate(self, identity_id: str) -> None:
+        stack = [identity_id]
+        visited = set()
+        while stack:
+            current = stack.pop()
+            if current in visited:
+                continue
+            visited.add(current)
+            self._chains.pop(current, None)
+            stack.extend(self._reports.get(current, ()))
+
+
+# Singleton instance
+org_hierarchy = OrgHierarchy()
+identity_store.on_change(org_hierarchy.track)
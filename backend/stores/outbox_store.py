@@ -0,0 +1,308 @@
+import heapq
+import itertools
+import threading
+import uuid
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+from pydantic import BaseModel, Field
+
+if TYPE_CHECKING:
+    from backend.stores.persistence import StoreJournal
+
+
+class OutboxOperation(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    # Enqueuing the same key twice returns the existing operation
+    idempotency_key: str
+    operation: str  # handler name, e.g. "grant_groups"
+    connector: str  # e.g. "AzureAD"; used for concurrency/rate limits
+    payload: Dict[str, Any] = {}
+    depends_on: Optional[str] = None  # id of an operation that must succeed first
+    status: str = "pending"  # pending, in_progress, done, dead
+    attempts: int = 0
+    next_attempt_at: datetime = Field(default_factory=datetime.now)
+    last_error: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    created_at: datetime = Field(default_factory=datetime.now)
+    updated_at: datetime = Field(default_factory=datetime.now)
+
+
+class OutboxStore:
+    """Connector operations waiting to be executed, with their outcomes.
+
+    Pending operations whose dependency has succeeded sit in a heap ordered
+    by ``next_attempt_at``; operations still waiting on a dependency are
+    parked under it and released when it completes (or dead-lettered with
+    it). Records are replaced, never mutated, so they can be journaled.
+    Done operations are kept in completion order until ``prune`` drops them.
+    All methods are safe to call from several threads.
+    """
+
+    def __init__(self) -> None:
+        self._journal: Optional["StoreJournal"] = None
+        self._journal_name = "outbox"
+        self._lock = threading.RLock()
+        self.reset()
+
+    def attach_journal(self, journal: Optional["StoreJournal"], name: str) -> None:
+        """Journal every mutation to a write-ahead log (None to detach)."""
+        self._journal = journal
+        self._journal_name = name
+
+    def snapshot_records(self) -> List[OutboxOperation]:
+        with self._lock:
+            return list(self._ops.values())
+
+    def load_record(self, data: str) -> None:
+        """Insert or replace an operation from its JSON form (journal replay)."""
+        op = OutboxOperation.model_validate_json(data)
+        if op.status == "in_progress":
+            # The process stopped mid-attempt; the handler must run again.
+            op = op.model_copy(update={"status": "pending"})
+        with self._lock:
+            self._set(op)
+            self._keys[op.idempotency_key] = op.id
+            self._stale = True
+
+    def reset(self) -> None:
+        """Drop all operations."""
+        with self._lock:
+            self._ops: Dict[str, OutboxOperation] = {}
+            self._keys: Dict[str, str] = {}  # idempotency key -> id
+            self._ready: List[Tuple[float, int, str]] = []  # (due, seq, id)
+            self._scheduled: Dict[str, int] = {}  # id -> seq of its live entry
+            self._waiting: Dict[str, List[str]] = {}  # dependency id -> ids
+            self._done: List[Tuple[float, str]] = []  # heap of (completed, id)
+            self._seq = itertools.count()
+            self._stale = False
+            self._status_counts: Dict[str, int] = {}
+
+    def enqueue(
+        self,
+        operation: str,
+        connector: str,
+        payload: Dict[str, Any],
+        idempotency_key: str,
+        depends_on: Optional[str] = None,
+    ) -> Tuple[OutboxOperation, bool]:
+        """Record an operation. Returns it and whether it was newly created."""
+        with self._lock:
+            self._refresh()
+            existing = self._keys.get(idempotency_key)
+            if existing is not None:
+                return self._ops[existing], False
+            if depends_on is not None and depends_on not in self._ops:
+                raise ValueError(f"Unknown dependency {depends_on}")
+            op = OutboxOperation(
+                idempotency_key=idempotency_key,
+                operation=operation,
+                connector=connector,
+                payload=payload,
+                depends_on=depends_on,
+            )
+            self._set(op)
+            self._keys[idempotency_key] = op.id
+            self._persist(op)
+            self._schedule(op)
+            return self._ops[op.id], True
+
+    def get(self, op_id: str) -> Optional[OutboxOperation]:
+        return self._ops.get(op_id)
+
+    def get_by_key(self, idempotency_key: str) -> Optional[OutboxOperation]:
+        op_id = self._keys.get(idempotency_key)
+        return self._ops.get(op_id) if op_id is not None else None
+
+    def list_operations(self, status: Optional[str] = None) -> List[OutboxOperation]:
+        with self._lock:
+            return [
+                op for op in self._ops.values() if status is None or op.status == status
+            ]
+
+    def count(self, status: Optional[str] = None) -> int:
+        if status is None:
+            return len(self._ops)
+        return self._status_counts.get(status, 0)
+
+    def status_counts(self) -> Dict[str, int]:
+        """Number of operations per status."""
+        with self._lock:
+            return dict(self._status_counts)
+
+    def queue_depths(self) -> Dict[str, int]:
+        """Operations scheduled to run and operations parked on a dependency."""
+        with self._lock:
+            self._refresh()
+            return {
+                "scheduled": len(self._scheduled),
+                "waiting": sum(len(ids) for ids in self._waiting.values()),
+            }
+
+    def next_due(self) -> Optional[datetime]:
+        """When the earliest runnable operation becomes due, if any."""
+        with self._lock:
+            self._refresh()
+            while self._ready:
+                due, seq, op_id = self._ready[0]
+                if self._scheduled.get(op_id) == seq:
+                    return datetime.fromtimestamp(due)
+                heapq.heappop(self._ready)
+            return None
+
+    def claim_ready(self, now: datetime, limit: int) -> List[OutboxOperation]:
+        """Mark up to ``limit`` due operations in progress and return them."""
+        claimed: List[OutboxOperation] = []
+        with self._lock:
+            self._refresh()
+            deadline = now.timestamp()
+            while self._ready and len(claimed) < limit:
+                due, seq, op_id = self._ready[0]
+                if due > deadline:
+                    break
+                heapq.heappop(self._ready)
+                if self._scheduled.get(op_id) != seq:
+                    continue  # superseded entry
+                del self._scheduled[op_id]
+                claimed.append(
+                    self._replace(
+                        self._ops[op_id],
+                        status="in_progress",
+                        attempts=self._ops[op_id].attempts + 1,
+                    )
+                )
+        return claimed
+
+    def complete(self, op_id: str, result: Optional[Dict[str, Any]]) -> None:
+        """Record success and release operations that depended on it."""
+        with self._lock:
+            self._replace(self._ops[op_id], status="done", result=result)
+            for child_id in self._waiting.pop(op_id, []):
+                self._schedule(self._ops[child_id])
+
+    def fail(
+        self, op_id: str, error: str, retry_at: Optional[datetime]
+    ) -> List[OutboxOperation]:
+        """Record a failed attempt, to be retried at ``retry_at``.
+
+        Without ``retry_at`` the operation is dead-lettered together with
+        everything depending on it; the dead operations are returned.
+        """
+        with self._lock:
+            op = self._ops[op_id]
+            if retry_at is not None:
+                op = self._replace(
+                    op, status="pending", last_error=error, next_attempt_at=retry_at
+                )
+                self._schedule(op)
+                return []
+            return self._kill(op, error)
+
+    def retry_dead(self, op_id: str) -> OutboxOperation:
+        """Put a dead-lettered operation (and its dependents) back in the queue."""
+        with self._lock:
+            op = self._ops.get(op_id)
+            if op is None:
+                raise ValueError("Operation not found")
+            if op.status != "dead":
+                raise ValueError(f"Operation is {op.status}, not dead")
+            revived = [op]
+            dependents = [o for o in self._ops.values() if o.depends_on == op_id]
+            while dependents:
+                child = dependents.pop()
+                if child.status == "dead":
+                    revived.append(child)
+                    dependents.extend(
+                        o for o in self._ops.values() if o.depends_on == child.id
+                    )
+            for dead in revived:
+                self._replace(
+                    dead, status="pending", attempts=0, next_attempt_at=datetime.now()
+                )
+            for dead in revived:
+                self._schedule(self._ops[dead.id])
+            return self._ops[op_id]
+
+    def prune(self, before: datetime) -> int:
+        """Forget done operations completed before ``before``.
+
+        Their idempotency keys are released as well. Returns the number of
+        operations removed.
+        """
+        cutoff = before.timestamp()
+        removed = 0
+        with self._lock:
+            while self._done and self._done[0][0] < cutoff:
+                completed, op_id = heapq.heappop(self._done)
+                op = self._ops.get(op_id)
+                if (
+                    op is None
+                    or op.status != "done"
+                    or op.updated_at.timestamp() != completed
+                ):
+                    continue  # superseded entry
+                del self._ops[op_id]
+                self._status_counts["done"] -= 1
+                if self._keys.get(op.idempotency_key) == op_id:
+                    del self._keys[op.idempotency_key]
+                removed += 1
+        return removed
+
+    def _kill(self, op: OutboxOperation, error: str) -> List[OutboxOperation]:
+        dead = [self._replace(op, status="dead", last_error=error)]
+        self._scheduled.pop(op.id, None)
+        for child_id in self._waiting.pop(op.id, []):
+            child = self._ops[child_id]
+            dead.extend(self._kill(child, f"Dependency {op.id} failed"))
+        return dead
+
+    def _schedule(self, op: OutboxOperation) -> None:
+        if op.status != "pending":
+            return
+        if op.depends_on is not None:
+            parent = self._ops.get(op.depends_on)
+            if parent is not None and parent.status == "dead":
+                self._kill(op, f"Dependency {parent.id} failed")
+                return
+            if parent is not None and parent.status != "done":
+                waiting = self._waiting.setdefault(parent.id, [])
+                if op.id not in waiting:
+                    waiting.append(op.id)
+                return
+        seq = next(self._seq)
+        self._scheduled[op.id] = seq
+        heapq.heappush(self._ready, (op.next_attempt_at.timestamp(), seq, op.id))
+
+    def _refresh(self) -> None:
+        """Rebuild the scheduling structures after a journal replay."""
+        if not self._stale:
+            return
+        self._stale = False
+        self._ready = []
+        self._scheduled = {}
+        self._waiting = {}
+        for op in list(self._ops.values()):
+            self._schedule(op)
+
+    def _replace(self, op: OutboxOperation, **changes: Any) -> OutboxOperation:
+        changes["updated_at"] = datetime.now()
+        new_op = op.model_copy(update=changes)
+        self._set(new_op)
+        self._persist(new_op)
+        return new_op
+
+    def _set(self, op: OutboxOperation) -> None:
+        old = self._ops.get(op.id)
+        if old is not None:
+            self._status_counts[old.status] -= 1
+        self._status_counts[op.status] = self._status_counts.get(op.status, 0) + 1
+        self._ops[op.id] = op
+        if op.status == "done":
+            heapq.heappush(self._done, (op.updated_at.timestamp(), op.id))
+
+    def _persist(self, op: OutboxOperation) -> None:
+        if self._journal is not None:
+            self._journal.append(self._journal_name, op)
+
+
+# Singleton instance
+outbox_store = OutboxStore()
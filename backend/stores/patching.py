@@ -0,0 +1,29 @@
+from typing import Any, Dict, Optional, TypeVar
+
+from pydantic import BaseModel
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+def apply_patch(model: ModelT, updates: Dict[str, Any]) -> Optional[ModelT]:
+    """Return a patched copy of ``model``, or None if nothing changed.
+
+    Only the fields whose values actually change are validated. The copy is
+    shallow, so untouched lists and dicts are shared with the original rather
+    than rebuilt; the original instance is left unmodified. Keys that are not
+    model fields are ignored, as they would be by full model validation.
+    """
+    fields = type(model).model_fields
+    validator = type(model).__pydantic_validator__
+    patched: Optional[ModelT] = None
+
+    for name, value in updates.items():
+        if name not in fields:
+            continue
+        current = getattr(model, name)
+        if current is value or current == value:
+            continue
+        if patched is None:
+            patched = model.model_copy()
+        validator.validate_assignment(patched, name, value)
+    return patched
@@ -0,0 +1,300 @@
+import gc
+import logging
+import os
+import re
+import threading
+import time
+from typing import IO, Dict, List, Optional, Protocol, Sequence, Tuple
+
+from pydantic import BaseModel
+
+logger = logging.getLogger("StoreJournal")
+
+_WAL_PATTERN = re.compile(r"^wal-(\d{12})\.log$")
+_SNAPSHOT_PATTERN = re.compile(r"^snapshot-(\d{12})\.log$")
+
+
+class JournaledStore(Protocol):
+    """What a store must provide to be persisted by ``StoreJournal``."""
+
+    def attach_journal(self, journal: Optional["StoreJournal"], name: str) -> None:
+        """Start (or with None, stop) journaling mutations under ``name``."""
+        ...
+
+    def snapshot_records(self) -> Sequence[BaseModel]:
+        """Return the current records; must be a cheap copy of references."""
+        ...
+
+    def load_record(self, data: str) -> None:
+        """Insert or replace a record from its JSON form."""
+        ...
+
+
+class StoreJournal:
+    """Write-ahead log with group commit and periodic snapshots.
+
+    Stores are upsert-only, so every mutation is journaled as the full new
+    record. WAL lines are ``<lsn>\\t<store>\\t<json>`` and snapshot lines are
+    ``<store>\\t<json>``; replaying a record twice is harmless.
+
+    Writes are appended to the OS buffer on the caller's thread. A background
+    thread fsyncs every ``fsync_every`` records or ``fsync_interval_ms``
+    milliseconds (group commit) and writes a compact snapshot once
+    ``snapshot_every`` records have been logged, after which older WAL
+    segments are deleted. Startup loads the latest snapshot and replays only
+    the WAL records written after it.
+
+    A failed background fsync is logged and retried; the thread keeps
+    running. Records it covered may not be on disk until a later snapshot
+    includes them, which ``close`` reports.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        fsync_every: int = 256,
+        fsync_interval_ms: int = 100,
+        snapshot_every: int = 100000,
+    ) -> None:
+        self.directory = directory
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval_ms / 1000
+        self.snapshot_every = snapshot_every
+        self._stores: Dict[str, JournaledStore] = {}
+        self._lock = threading.Lock()
+        self._checkpoint_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._wal: Optional[IO[str]] = None
+        self._lsn = 0  # last assigned log sequence number
+        self._snapshot_lsn = 0  # lsn covered by the latest snapshot
+        self._unsynced = 0
+        # Highest lsn whose fsync failed and no snapshot has covered since
+        self._at_risk_lsn: Optional[int] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def lsn(self) -> int:
+        return self._lsn
+
+    def register(self, name: str, store: JournaledStore) -> None:
+        self._stores[name] = store
+
+    def open(self) -> Dict[str, int]:
+        """Restore registered stores from disk and start journaling.
+
+        Returns the number of records loaded per source.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        started = time.monotonic()
+        stats = {"snapshot": 0, "wal": 0}
+
+        # Restore only allocates long-lived records; cyclic GC passes over the
+        # growing heap would dominate load time.
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            snapshots = self._list(_SNAPSHOT_PATTERN)
+            if snapshots:
+                self._snapshot_lsn, path = snapshots[-1]
+                stats["snapshot"] = self._load_snapshot(path)
+            self._lsn = self._snapshot_lsn
+
+            for first_lsn, path in self._list(_WAL_PATTERN):
+                stats["wal"] += self._replay_wal(path)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+        self._open_wal()
+        for name, store in self._stores.items():
+            store.attach_journal(self, name)
+        self._thread = threading.Thread(
+            target=self._run, name="store-journal", daemon=True
+        )
+        self._thread.start()
+        logger.info(
+            f"Restored {stats['snapshot']} snapshot and {stats['wal']} WAL records "
+            f"in {time.monotonic() - started:.2f}s (lsn={self._lsn})"
+        )
+        return stats
+
+    def append(self, store: str, record: BaseModel) -> None:
+        """Journal the new state of a record."""
+        data = record.model_dump_json()
+        with self._lock:
+            if self._wal is None:
+                return
+            self._lsn += 1
+            self._wal.write(f"{self._lsn}\t{store}\t{data}\n")
+            self._unsynced += 1
+            wake = self._unsynced >= self.fsync_every or self._snapshot_due()
+        if wake:
+            self._wake.set()
+
+    def sync(self) -> None:
+        """Force everything journaled so far to disk."""
+        with self._lock:
+            self._sync_locked()
+
+    def checkpoint(self) -> int:
+        """Write a snapshot of every registered store and drop older WAL.
+
+        Returns the lsn the snapshot covers.
+        """
+        with self._checkpoint_lock:
+            with self._lock:
+                try:
+                    self._sync_locked()
+                except OSError:
+                    pass  # The snapshot covers these records
+                lsn = self._lsn
+                # Later mutations go to a fresh segment replayed on top.
+                self._open_wal()
+                records = {
+                    name: store.snapshot_records()
+                    for name, store in self._stores.items()
+                }
+
+            path = os.path.join(self.directory, f"snapshot-{lsn:012d}.log")
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for name, models in records.items():
+                    for model in models:
+                        f.write(f"{name}\t{model.model_dump_json()}\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+            self._snapshot_lsn = lsn
+            with self._lock:
+                if self._at_risk_lsn is not None and self._at_risk_lsn <= lsn:
+                    self._at_risk_lsn = None
+
+            for snapshot_lsn, old in self._list(_SNAPSHOT_PATTERN):
+                if snapshot_lsn < lsn:
+                    os.remove(old)
+            for first_lsn, old in self._list(_WAL_PATTERN):
+                if first_lsn <= lsn:
+                    os.remove(old)
+            logger.info(f"Wrote snapshot at lsn={lsn}")
+            return lsn
+
+    def close(self, checkpoint: bool = True) -> bool:
+        """Stop journaling, optionally writing a final snapshot.
+
+        Returns False if some journaled records may not be on disk: an fsync
+        failed and no snapshot written since covers them.
+        """
+        if self._thread is None:
+            return True
+        self._stopping = True
+        self._wake.set()
+        self._thread.join()
+        self._thread = None
+        try:
+            if checkpoint:
+                try:
+                    self.checkpoint()
+                except OSError as e:
+                    logger.error(f"Final snapshot failed: {e}")
+            with self._lock:
+                try:
+                    self._sync_locked()
+                    if self._wal is not None:
+                        self._wal.close()
+                except OSError as e:
+                    self._at_risk_lsn = self._lsn
+                    logger.error(f"Final WAL sync failed: {e}")
+                self._wal = None
+        finally:
+            for name, store in self._stores.items():
+                store.attach_journal(None, name)
+        if self._at_risk_lsn is not None:
+            logger.error(
+                f"Journal closed with records up to lsn={self._at_risk_lsn} "
+                "possibly not on disk"
+            )
+            return False
+        return True
+
+    def _run(self) -> None:
+        while not self._stopping:
+            self._wake.wait(self.fsync_interval)
+            self._wake.clear()
+            try:
+                self.sync()
+            except Exception as e:
+                # Keep flushing: a later sync or snapshot may succeed.
+                if self.last_error is None:
+                    logger.error(f"WAL fsync failed: {e}; retrying")
+                self.last_error = str(e)
+            else:
+                if self.last_error is not None:
+                    logger.info("WAL fsync recovered")
+                    self.last_error = None
+            if self._snapshot_due():
+                try:
+                    self.checkpoint()
+                except Exception as e:
+                    logger.error(f"Snapshot failed: {e}")
+
+    def _snapshot_due(self) -> bool:
+        return self._lsn - self._snapshot_lsn >= self.snapshot_every
+
+    def _sync_locked(self) -> None:
+        if self._wal is not None and self._unsynced:
+            try:
+                self._wal.flush()
+                os.fsync(self._wal.fileno())
+            except OSError:
+                # A retried fsync can succeed without the lost pages, so
+                # only a snapshot makes these records safe again.
+                self._at_risk_lsn = self._lsn
+                raise
+        self._unsynced = 0
+
+    def _open_wal(self) -> None:
+        # Segments are named after the first lsn they may contain. The new
+        # segment is opened first so a failure keeps the current one.
+        path = os.path.join(self.directory, f"wal-{self._lsn + 1:012d}.log")
+        previous, self._wal = self._wal, open(path, "a", encoding="utf-8")
+        if previous is not None:
+            try:
+                previous.close()
+            except OSError as e:
+                self._at_risk_lsn = self._lsn
+                logger.error(f"Closing WAL segment failed: {e}")
+
+    def _list(self, pattern: "re.Pattern[str]") -> List[Tuple[int, str]]:
+        found = []
+        for name in os.listdir(self.directory):
+            match = pattern.match(name)
+            if match:
+                found.append((int(match.group(1)), os.path.join(self.directory, name)))
+        return sorted(found)
+
+    def _load_snapshot(self, path: str) -> int:
+        count = 0
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                name, data = line.rstrip("\n").split("\t", 1)
+                self._stores[name].load_record(data)
+                count += 1
+        return count
+
+    def _replay_wal(self, path: str) -> int:
+        count = 0
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    logger.warning(f"Ignoring torn record at end of {path}")
+                    break
+                lsn_text, name, data = line.rstrip("\n").split("\t", 2)
+                lsn = int(lsn_text)
+                if lsn <= self._snapshot_lsn:
+                    continue
+                self._stores[name].load_record(data)
+                self._lsn = lsn
+                count += 1
+        return count
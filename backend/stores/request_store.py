@@ -1,7 +1,14 @@
+import threading
 import uuid
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 from pydantic import BaseModel, Field
+from sortedcontainers import SortedList
+
+from backend.stores.patching import apply_patch
+
+if TYPE_CHECKING:
+    from backend.stores.persistence import StoreJournal
 
 
 class AccessRequest(BaseModel):
@@ -13,46 +20,201 @@ class AccessRequest(BaseModel):
     justification: str
     status: str = "pending"  # pending, approved, rejected, failed
     approver_id: Optional[str] = None
+    # Who the request is routed to (the target's nearest active manager)
+    assigned_approver_id: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
     comments: Optional[str] = None
 
 
+# Index entries sort by creation time, then by insertion sequence, and carry
+# the request id: (created_at, seq, id).
+_SortKey = Tuple[datetime, int, str]
+
+# Secondary indexes: index name -> request field it is keyed on.
+_INDEXED_FIELDS = {
+    "status": "status",
+    "requester": "requester_id",
+    "target": "target_identity_id",
+}
+
+
 class RequestStore:
     def __init__(self) -> None:
-        self._requests: List[AccessRequest] = []
+        self._lock = threading.RLock()
+        self._journal: Optional["StoreJournal"] = None
+        self._journal_name = "request"
+        self.reset()
+
+    def attach_journal(self, journal: Optional["StoreJournal"], name: str) -> None:
+        """Journal every mutation to a write-ahead log (None to detach)."""
+        self._journal = journal
+        self._journal_name = name
+
+    def snapshot_records(self) -> List[AccessRequest]:
+        with self._lock:
+            return list(self._requests.values())
+
+    def load_record(self, data: str) -> None:
+        """Insert or replace a request from its JSON form (journal replay)."""
+        req = AccessRequest.model_validate_json(data)
+        with self._lock:
+            old = self._requests.get(req.id)
+            if old is None:
+                self._insert(req)
+            else:
+                self._requests[req.id] = req
+                self._reindex(old, req)
+
+    def reset(self) -> None:
+        """Drop all requests and indexes."""
+        with self._lock:
+            self._requests: Dict[str, AccessRequest] = {}  # id -> request
+            self._keys: Dict[str, _SortKey] = {}  # id -> sort key
+            self._ordered = SortedList()  # every request's sort key
+            # index name -> field value -> sort keys; O(log n) to maintain
+            self._indexes: Dict[str, Dict[str, SortedList]] = {
+                name: {} for name in _INDEXED_FIELDS
+            }
+            # assigned approver -> ids of their pending requests, oldest first
+            self._inboxes: Dict[str, Dict[str, None]] = {}
 
     def create_request(self, request_data: Dict[str, Any]) -> AccessRequest:
         req = AccessRequest(**request_data)
-        self._requests.append(req)
+        with self._lock:
+            self._insert(req)
+            if self._journal is not None:
+                self._journal.append(self._journal_name, req)
         return req
 
+    def _insert(self, req: AccessRequest) -> None:
+        self._requests[req.id] = req
+        key = (req.created_at, len(self._keys), req.id)
+        self._keys[req.id] = key
+        self._ordered.add(key)
+        for name, field in _INDEXED_FIELDS.items():
+            self._index(name, getattr(req, field)).add(key)
+        self._add_to_inbox(req)
+
+    def _index(self, name: str, value: str) -> SortedList:
+        index = self._indexes[name]
+        keys = index.get(value)
+        if keys is None:
+            keys = index[value] = SortedList()
+        return keys
+
     def get_request(self, request_id: str) -> Optional[AccessRequest]:
-        for req in self._requests:
-            if req.id == request_id:
-                return req
-        return None
+        return self._requests.get(request_id)
+
+    def pending_for_approver(self, approver_id: str) -> List[AccessRequest]:
+        """Pending requests routed to ``approver_id``, in routing order."""
+        with self._lock:
+            return [self._requests[i] for i in self._inboxes.get(approver_id, {})]
 
-    def list_requests(self, status: Optional[str] = None) -> List[AccessRequest]:
-        if status:
-            return [r for r in self._requests if r.status == status]
-        return sorted(self._requests, key=lambda x: x.created_at, reverse=True)
+    def count_pending_for_approver(self, approver_id: str) -> int:
+        return len(self._inboxes.get(approver_id, {}))
+
+    def count(self, status: Optional[str] = None) -> int:
+        if status is None:
+            return len(self._requests)
+        return len(self._indexes["status"].get(status, []))
+
+    def list_requests(
+        self,
+        status: Optional[str] = None,
+        requester_id: Optional[str] = None,
+        target_identity_id: Optional[str] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> List[AccessRequest]:
+        """List requests newest first.
+
+        Filters are served from the smallest matching secondary index. Pass the
+        id of the last request of a page as ``cursor`` to fetch the next one.
+        """
+        filters = {
+            "status": status,
+            "requester": requester_id,
+            "target": target_identity_id,
+        }
+        active = {name: value for name, value in filters.items() if value}
+        with self._lock:
+            return self._list(active, limit, cursor)
+
+    def _list(
+        self, active: Dict[str, str], limit: Optional[int], cursor: Optional[str]
+    ) -> List[AccessRequest]:
+        candidates = min(
+            (
+                self._indexes[name].get(value, SortedList())
+                for name, value in active.items()
+            ),
+            key=len,
+            default=self._ordered,
+        )
+
+        end = len(candidates)
+        if cursor is not None:
+            anchor = self._keys.get(cursor)
+            if anchor is None:
+                raise ValueError("Invalid cursor")
+            end = candidates.bisect_left(anchor)
+
+        results: List[AccessRequest] = []
+        for _, _, request_id in candidates.islice(0, end, reverse=True):
+            if limit is not None and len(results) >= limit:
+                break
+            req = self._requests[request_id]
+            if all(
+                getattr(req, _INDEXED_FIELDS[name]) == value
+                for name, value in active.items()
+            ):
+                results.append(req)
+        return results
 
     def update_request(
         self, request_id: str, updates: Dict[str, Any]
     ) -> Optional[AccessRequest]:
-        req = self.get_request(request_id)
-        if not req:
-            return None
-
-        updated_data = req.dict()
-        updated_data.update(updates)
-        updated_data["updated_at"] = datetime.now()
-
-        new_req = AccessRequest(**updated_data)
-        # Replace in list
-        self._requests = [r if r.id != request_id else new_req for r in self._requests]
-        return new_req
+        with self._lock:
+            req = self.get_request(request_id)
+            if not req:
+                return None
+
+            new_req = apply_patch(req, updates)
+            if new_req is None:
+                return req
+            new_req.updated_at = datetime.now()
+
+            self._requests[request_id] = new_req
+            self._reindex(req, new_req)
+            if self._journal is not None:
+                self._journal.append(self._journal_name, new_req)
+            return new_req
+
+    def _add_to_inbox(self, req: AccessRequest) -> None:
+        if req.status == "pending" and req.assigned_approver_id is not None:
+            self._inboxes.setdefault(req.assigned_approver_id, {})[req.id] = None
+
+    def _remove_from_inbox(self, req: AccessRequest) -> None:
+        inbox = self._inboxes.get(req.assigned_approver_id or "")
+        if inbox is not None and req.id in inbox:
+            del inbox[req.id]
+            if not inbox:
+                del self._inboxes[req.assigned_approver_id or ""]
+
+    def _reindex(self, old: AccessRequest, new: AccessRequest) -> None:
+        self._remove_from_inbox(old)
+        self._add_to_inbox(new)
+        key = self._keys[old.id]
+        for name, field in _INDEXED_FIELDS.items():
+            old_value, new_value = getattr(old, field), getattr(new, field)
+            if old_value == new_value:
+                continue
+            index = self._indexes[name]
+            index[old_value].discard(key)
+            if not index[old_value]:
+                del index[old_value]
+            self._index(name, new_value).add(key)
 
 
 # Singleton
@@ -0,0 +1,40 @@
+import threading
+from contextlib import nullcontext
+from typing import ContextManager, List, Optional
+
+from backend.config import settings
+
+
+class StripedLock:
+    """A fixed pool of re-entrant locks shared out by key hash.
+
+    ``hold(key)`` serialises work on one key (e.g. an employee) while work on
+    keys in other stripes runs in parallel. Memory stays bounded however
+    many keys there are; two keys sharing a stripe only wait for each other.
+
+    Hold one key at a time: taking a second stripe while holding one can
+    deadlock against a thread taking them the other way round. Re-entering
+    the stripe already held is fine.
+    """
+
+    def __init__(self, stripes: int = 256) -> None:
+        if stripes < 1:
+            raise ValueError("stripes must be at least 1")
+        self._locks: List[threading.RLock] = [threading.RLock() for _ in range(stripes)]
+
+    @property
+    def stripes(self) -> int:
+        return len(self._locks)
+
+    def lock_for(self, key: str) -> threading.RLock:
+        return self._locks[hash(key) % len(self._locks)]
+
+    def hold(self, key: Optional[str]) -> ContextManager[object]:
+        """Context manager holding ``key``'s stripe (nothing for None)."""
+        if key is None:
+            return nullcontext()
+        return self.lock_for(key)
+
+
+# Singleton instance: serialises lifecycle changes per employee id
+employee_locks = StripedLock(settings.EMPLOYEE_LOCK_STRIPES)
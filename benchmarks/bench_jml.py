@@ -0,0 +1,342 @@
+"""End-to-end JML throughput benchmark on a synthetic workforce.
+
+Run with ``python -m benchmarks.bench_jml`` (``--sizes 1000`` for a quick
+run). Each size onboards a seeded workforce, replays a joiner/mover/leaver
+churn feed, submits and approves access requests, then runs a risk scan and
+a full reconciliation. Reported per size: HR events/sec, p50/p99 latency per
+flow and peak memory (process RSS high-water mark; ``--trace-memory`` adds
+the exact peak of Python allocations, at a large cost in speed).
+
+Results are written as JSON and compared with the baseline file; a metric
+more than ``--tolerance`` worse than its baseline is reported as a
+regression and the exit status is 1. ``--update-baseline`` records the run
+as the new baseline. Baselines are only comparable on the same machine.
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, TypeVar
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None  # type: ignore[assignment]
+
+from backend.engines.jml_engine import jml_engine
+from backend.engines.reconciliation_engine import reconciliation_engine
+from backend.engines.request_engine import request_engine
+from backend.engines.risk_engine import risk_engine
+from backend.stores.audit_log import audit_log_store
+from backend.stores.event_cache import hr_event_cache
+from backend.stores.identity_store import identity_store
+from backend.stores.org_hierarchy import org_hierarchy
+from backend.stores.outbox_store import outbox_store
+from backend.stores.request_store import request_store
+from benchmarks.workforce import HREvent, WorkforceGenerator
+from connectors.azuread_connector import azure_ad_connector
+from connectors.github_connector import github_connector
+from connectors.slack_connector import slack_connector
+
+SIZES = (1000, 10000, 100000)
+CHURN_RATIO = 0.1  # churn events per onboarded employee
+REQUEST_RATIO = 0.05  # access requests per onboarded employee
+REQUESTED_ENTITLEMENT = "GitHub:Admin"
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, "results", "bench_jml.json")
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baselines", "bench_jml.json")
+DEFAULT_TOLERANCE = 0.25
+
+FLOW_NAMES = {
+    "EmployeeCreated": "joiner",
+    "EmployeeUpdated": "mover",
+    "EmployeeTerminated": "leaver",
+}
+
+T = TypeVar("T")
+
+
+def reset_state() -> None:
+    """Empty every store and connector the flows touch."""
+    identity_store.reset()
+    org_hierarchy.reset()
+    request_store.reset()
+    audit_log_store.reset()
+    hr_event_cache.reset()
+    outbox_store.reset()
+    reconciliation_engine.reset()
+    azure_ad_connector.reset()
+    github_connector.reset()
+    slack_connector.reset()
+
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of ``samples``."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def summarise(samples: Sequence[float]) -> Dict[str, Any]:
+    """Latency summary in milliseconds for one flow."""
+    total = sum(samples)
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 4),
+        "p99_ms": round(percentile(samples, 99) * 1000, 4),
+        "mean_ms": round(total / len(samples) * 1000, 4) if samples else 0.0,
+        "ops_per_sec": round(len(samples) / total, 1) if total else 0.0,
+    }
+
+
+class _Recorder:
+    def __init__(self) -> None:
+        self.samples: Dict[str, List[float]] = {}
+
+    def time(self, flow: str, fn: Callable[[], T]) -> T:
+        started = time.perf_counter()
+        result = fn()
+        self.samples.setdefault(flow, []).append(time.perf_counter() - started)
+        return result
+
+
+def _resolve_manager(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Map the feed's manager employee id to an identity id."""
+    if "manager_employee_id" not in payload:
+        return payload
+    data = dict(payload)
+    manager_employee_id = data.pop("manager_employee_id")
+    manager = None
+    if manager_employee_id is not None:
+        manager = identity_store.get_identity_by_employee_id(manager_employee_id)
+    data["manager_id"] = manager.id if manager is not None else None
+    return data
+
+
+def _replay(recorder: _Recorder, events: Sequence[HREvent]) -> float:
+    started = time.perf_counter()
+    for event_type, payload in events:
+        data = _resolve_manager(payload)
+        result = recorder.time(
+            FLOW_NAMES[event_type],
+            lambda: jml_engine.process_event(event_type, data),
+        )
+        if result.get("status") != "success":
+            raise RuntimeError(f"{event_type} failed: {result}")
+    return time.perf_counter() - started
+
+
+def peak_rss_mb() -> Optional[float]:
+    """High-water mark of the process resident set size."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    divisor = 2**20 if sys.platform == "darwin" else 2**10
+    return round(peak / divisor, 2)
+
+
+def run_size(size: int, seed: int = 0, trace_memory: bool = False) -> Dict[str, Any]:
+    """Benchmark one workforce size and return its metrics."""
+    reset_state()
+    gc.collect()
+    generator = WorkforceGenerator(seed=seed)
+    # Feeds are generated up front so generation is not timed
+    onboarding = list(generator.onboarding(size))
+    churn = list(generator.churn(max(1, int(size * CHURN_RATIO))))
+    recorder = _Recorder()
+    if trace_memory:
+        tracemalloc.start()
+
+    hr_seconds = _replay(recorder, onboarding) + _replay(recorder, churn)
+
+    # Access requests from a spread of employees, approved by their manager
+    active = identity_store.find_identities(status="active")
+    step = max(1, len(active) // max(1, int(size * REQUEST_RATIO)))
+    for requester in active[step::step]:
+        request = recorder.time(
+            "request_submit",
+            lambda: request_engine.submit_request(
+                requester.id, REQUESTED_ENTITLEMENT, "Benchmark"
+            ),
+        )
+        approver_id = request.assigned_approver_id
+        if approver_id is not None:
+            recorder.time(
+                "request_approve",
+                lambda: request_engine.approve_request(request.id, approver_id),
+            )
+
+    recorder.time("risk_scan", lambda: risk_engine.scan_population())
+    recorder.time("reconciliation", lambda: reconciliation_engine.run(full=True))
+
+    peak_traced_mb = None
+    if trace_memory:
+        peak_traced_mb = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+        tracemalloc.stop()
+
+    hr_events = len(onboarding) + len(churn)
+    return {
+        "size": size,
+        "hr_events": hr_events,
+        "events_per_sec": round(hr_events / hr_seconds, 1),
+        "identities": len(identity_store.list_identities()),
+        # Sizes run in ascending order, so the process peak is this size's
+        "peak_rss_mb": peak_rss_mb(),
+        "peak_traced_mb": peak_traced_mb,
+        "flows": {
+            flow: summarise(samples)
+            for flow, samples in sorted(recorder.samples.items())
+        },
+    }
+
+
+def run(
+    sizes: Sequence[int], seed: int = 0, trace_memory: bool = False
+) -> Dict[str, Any]:
+    """Benchmark every size and return the full result document."""
+    return {
+        "benchmark": "jml",
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "sizes": {
+            str(size): run_size(size, seed=seed, trace_memory=trace_memory)
+            for size in sorted(sizes)
+        },
+    }
+
+
+def compare(
+    results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float
+) -> List[str]:
+    """Regressions of ``results`` against ``baseline`` beyond ``tolerance``.
+
+    Throughput regresses when it drops, latency and memory when they grow.
+    Sizes and flows missing from either side are skipped.
+    """
+    regressions = []
+
+    def check(label: str, current: Any, previous: Any, higher_is_better: bool) -> None:
+        if not current or not previous:
+            return
+        change = (current - previous) / previous
+        if (-change if higher_is_better else change) > tolerance:
+            regressions.append(f"{label}: {previous} -> {current} ({change:+.0%})")
+
+    for size, current in results.get("sizes", {}).items():
+        previous = baseline.get("sizes", {}).get(size)
+        if previous is None:
+            continue
+        check(
+            f"{size} events_per_sec",
+            current["events_per_sec"],
+            previous["events_per_sec"],
+            higher_is_better=True,
+        )
+        for metric in ("peak_rss_mb", "peak_traced_mb"):
+            check(
+                f"{size} {metric}",
+                current.get(metric),
+                previous.get(metric),
+                higher_is_better=False,
+            )
+        for flow, stats in current["flows"].items():
+            old = previous["flows"].get(flow)
+            if old is None:
+                continue
+            for metric in ("p50_ms", "p99_ms"):
+                check(
+                    f"{size} {flow} {metric}",
+                    stats[metric],
+                    old[metric],
+                    higher_is_better=False,
+                )
+    return regressions
+
+
+def _print_results(results: Dict[str, Any]) -> None:
+    for size, metrics in results["sizes"].items():
+        memory = [
+            f"{label} {metrics[key]} MB"
+            for label, key in (("RSS", "peak_rss_mb"), ("traced", "peak_traced_mb"))
+            if metrics[key] is not None
+        ]
+        print(
+            f"size {size}: {metrics['events_per_sec']:.0f} HR events/sec, "
+            f"peak memory {', '.join(memory) or 'n/a'}"
+        )
+        for flow, stats in metrics["flows"].items():
+            print(
+                f"  {flow:<16} n={stats['count']:<7} "
+                f"p50 {stats['p50_ms']:9.3f} ms  p99 {stats['p99_ms']:9.3f} ms"
+            )
+
+
+def _write_json(path: str, document: Dict[str, Any]) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(s) for s in SIZES),
+        help="comma-separated workforce sizes",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="record this run as the baseline",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="also trace Python allocations (flows run several times slower)",
+    )
+    args = parser.parse_args(argv)
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+
+    # Per-event INFO logging would dominate the measurements
+    logging.disable(logging.INFO)
+    results = run(sizes, seed=args.seed, trace_memory=args.trace_memory)
+    _print_results(results)
+    _write_json(args.output, results)
+    print(f"Results written to {args.output}")
+
+    if args.update_baseline:
+        _write_json(args.baseline, results)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare against (use --update-baseline)")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if not regressions:
+        print(f"No regressions beyond {args.tolerance:.0%} of {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""Benchmark IdentityStore/RequestStore updates against full re-validation.
+
+Run with ``python -m benchmarks.bench_store_updates``.
+"""
+
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict
+
+from backend.stores.identity_store import IdentityProfile, IdentityStore
+from backend.stores.request_store import AccessRequest, RequestStore
+
+ITERATIONS = 20000
+
+
+def _legacy_update_identity(
+    store: IdentityStore, identity_id: str, updates: Dict[str, Any]
+) -> IdentityProfile:
+    """The pre-patching implementation: dump, merge and re-validate."""
+    identity = store._identities[identity_id]
+    updated_data = identity.dict()
+    updated_data.update(updates)
+    updated_data["updated_at"] = datetime.now()
+    new_identity = IdentityProfile(**updated_data)
+    store._identities[identity_id] = new_identity
+    store._reindex(identity, new_identity)
+    return new_identity
+
+
+def _legacy_update_request(
+    store: RequestStore, request_id: str, updates: Dict[str, Any]
+) -> AccessRequest:
+    req = store._requests[request_id]
+    updated_data = req.dict()
+    updated_data.update(updates)
+    updated_data["updated_at"] = datetime.now()
+    new_req = AccessRequest(**updated_data)
+    store._requests[request_id] = new_req
+    store._reindex(req, new_req)
+    return new_req
+
+
+def _time(label: str, fn: Callable[[int], Any]) -> float:
+    started = time.perf_counter()
+    for i in range(ITERATIONS):
+        fn(i)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<40} {elapsed / ITERATIONS * 1e6:8.2f} us/op")
+    return elapsed
+
+
+def main() -> None:
+    identities = IdentityStore()
+    identity = identities.create_identity(
+        {
+            "employee_id": "BENCH001",
+            "first_name": "Bench",
+            "last_name": "Mark",
+            "email": "bench.mark@example.com",
+            "department": "Engineering",
+            "job_title": "Engineer",
+            "entitlements": [f"AzureAD:Group{i}" for i in range(50)],
+            "accounts": {"azure_ad": "bench.mark@example.com", "github": "bench"},
+        }
+    )
+    departments = ["Engineering", "Sales"]
+
+    def mover_update(i: int) -> Dict[str, Any]:
+        return {"department": departments[i % 2], "job_title": "Engineer"}
+
+    legacy = _time(
+        "IdentityStore legacy re-validation",
+        lambda i: _legacy_update_identity(identities, identity.id, mover_update(i)),
+    )
+    patched = _time(
+        "IdentityStore field patch",
+        lambda i: identities.update_identity(identity.id, mover_update(i)),
+    )
+    print(f"{'speedup':<40} {legacy / patched:8.2f}x")
+
+    requests = RequestStore()
+    req = requests.create_request(
+        {
+            "requester_id": identity.id,
+            "target_identity_id": identity.id,
+            "entitlement": "GitHub:Admin",
+            "justification": "Benchmark",
+        }
+    )
+    statuses = ["approved", "pending"]
+    legacy = _time(
+        "RequestStore legacy re-validation",
+        lambda i: _legacy_update_request(
+            requests, req.id, {"status": statuses[i % 2], "approver_id": "x"}
+        ),
+    )
+    patched = _time(
+        "RequestStore field patch",
+        lambda i: requests.update_request(
+            req.id, {"status": statuses[i % 2], "approver_id": "x"}
+        ),
+    )
+    print(f"{'speedup':<40} {legacy / patched:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Seeded synthetic workforce and HR event feed for the JML benchmarks.
+
+The same seed always yields the same feed, so benchmark runs are comparable.
+"""
+
+import random
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from backend.config import settings
+
+HREvent = Tuple[str, Dict[str, Any]]
+
+# Relative department headcounts; departments without birthright access
+# exercise the base-access-only path.
+DEPARTMENT_WEIGHTS = {"Engineering": 40, "Sales": 25, "Marketing": 15, "HR": 10}
+JOB_TITLES = {
+    "Engineering": ("Software Engineer", "Senior Engineer", "Staff Engineer"),
+    "Sales": ("Account Executive", "Sales Manager"),
+    "Marketing": ("Marketing Specialist", "Content Lead"),
+    "HR": ("HR Partner", "Recruiter"),
+}
+FIRST_NAMES = ("Alex", "Sam", "Jordan", "Taylor", "Morgan", "Casey", "Riley")
+LAST_NAMES = ("Smith", "Chen", "Garcia", "Okafor", "Novak", "Tanaka", "Silva")
+# Churn mix as (joiners, movers, leavers) weights
+DEFAULT_CHURN = (30, 50, 20)
+
+
+class WorkforceGenerator:
+    """Builds a workforce and a stream of joiner, mover and leaver events.
+
+    ``onboarding(size)`` hires ``size`` employees into a reporting tree with
+    ``span_of_control`` reports per manager, so a manager is always hired
+    before their reports. ``churn(count)`` then mixes new hires, department
+    and manager moves, and terminations of the current workforce.
+
+    Managers are referenced by employee id in ``manager_employee_id``, as an
+    HR feed would; callers map it to an identity id before processing.
+    """
+
+    def __init__(
+        self,
+        seed: int = 0,
+        span_of_control: int = 8,
+        churn_mix: Sequence[int] = DEFAULT_CHURN,
+        departments: Optional[Sequence[str]] = None,
+    ) -> None:
+        if span_of_control < 1:
+            raise ValueError("span_of_control must be at least 1")
+        if len(churn_mix) != 3 or sum(churn_mix) <= 0:
+            raise ValueError("churn_mix needs three non-negative weights")
+        self._rng = random.Random(seed)
+        self.span_of_control = span_of_control
+        self.churn_mix = tuple(churn_mix)
+        self.departments = list(departments or settings.BIRTHRIGHT_DEPARTMENTS)
+        self._weights = [DEPARTMENT_WEIGHTS.get(d, 10) for d in self.departments]
+        self._hired = 0
+        self._event_seq = 0
+        # Active employees by hire number; a list plus positions gives O(1)
+        # random choice and removal.
+        self._active: List[int] = []
+        self._positions: Dict[int, int] = {}
+        self._departments: Dict[int, str] = {}
+
+    @property
+    def headcount(self) -> int:
+        return len(self._active)
+
+    def onboarding(self, size: int) -> Iterator[HREvent]:
+        """Joiner events for ``size`` employees in a balanced reporting tree."""
+        first = self._hired
+        for n in range(first, first + size):
+            manager = None
+            if n > first:
+                manager = first + (n - first - 1) // self.span_of_control
+            yield self._joiner(manager)
+
+    def churn(self, count: int) -> Iterator[HREvent]:
+        """``count`` events drawn from the churn mix."""
+        for _ in range(count):
+            kind = self._rng.choices(("joiner", "mover", "leaver"), self.churn_mix)[0]
+            # The first employee heads the organisation and never leaves
+            if kind != "joiner" and len(self._active) < 2:
+                kind = "joiner"
+            if kind == "joiner":
+                yield self._joiner(self._pick_manager(self._hired))
+            elif kind == "mover":
+                yield self._mover()
+            else:
+                yield self._leaver()
+
+    def _joiner(self, manager: Optional[int]) -> HREvent:
+        n = self._hired
+        self._hired += 1
+        if manager is not None and self._rng.random() < 0.8:
+            department = self._departments[manager]
+        else:
+            department = self._department()
+        self._departments[n] = department
+        self._positions[n] = len(self._active)
+        self._active.append(n)
+        first_name = self._rng.choice(FIRST_NAMES)
+        last_name = self._rng.choice(LAST_NAMES)
+        return "EmployeeCreated", self._event(
+            {
+                "employee_id": _employee_id(n),
+                "first_name": first_name,
+                "last_name": last_name,
+                "email": f"{first_name}.{last_name}.{n}@example.com".lower(),
+                "department": department,
+                "job_title": self._rng.choice(JOB_TITLES.get(department, ("Staff",))),
+                "manager_employee_id": _employee_id(manager),
+            }
+        )
+
+    def _mover(self) -> HREvent:
+        n = self._active[self._rng.randrange(1, len(self._active))]
+        payload: Dict[str, Any] = {"employee_id": _employee_id(n)}
+        if self._rng.random() < 0.7:
+            current = self._departments[n]
+            choices = [d for d in self.departments if d != current] or [current]
+            department = self._rng.choice(choices)
+            self._departments[n] = department
+            payload["department"] = department
+            payload["job_title"] = self._rng.choice(
+                JOB_TITLES.get(department, ("Staff",))
+            )
+        else:
+            payload["manager_employee_id"] = _employee_id(self._pick_manager(n))
+        return "EmployeeUpdated", self._event(payload)
+
+    def _leaver(self) -> HREvent:
+        n = self._active[self._rng.randrange(1, len(self._active))]
+        # Swap-remove keeps removal O(1)
+        position = self._positions.pop(n)
+        last = self._active.pop()
+        if last != n:
+            self._active[position] = last
+            self._positions[last] = position
+        return "EmployeeTerminated", self._event({"employee_id": _employee_id(n)})
+
+    def _pick_manager(self, n: int) -> Optional[int]:
+        """An active employee hired before ``n``, so moves never form cycles."""
+        for _ in range(8):
+            candidate = self._rng.choice(self._active) if self._active else None
+            if candidate is None or candidate < n:
+                return candidate
+        return self._active[0] if self._active and self._active[0] < n else None
+
+    def _department(self) -> str:
+        return self._rng.choices(self.departments, self._weights)[0]
+
+    def _event(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        self._event_seq += 1
+        return {"event_id": f"synthetic-{self._event_seq}", **payload}
+
+
+def _employee_id(n: Optional[int]) -> Optional[str]:
+    return None if n is None else f"SYN{n:07d}"
@@ -1,6 +1,9 @@
 import logging
+import threading
 import uuid
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from connectors.membership import MembershipIndex
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -9,14 +12,26 @@ logger = logging.getLogger("AzureADConnector")
 
 class AzureADConnector:
     def __init__(self) -> None:
+        # Connector calls run on the provisioning pool; writes to the user
+        # tables are serialised (memberships lock themselves).
+        self._lock = threading.Lock()
         self.users: Dict[str, Dict[str, Any]] = {}  # objectId -> user_data
-        self.groups: Dict[str, List[str]] = {
-            "Engineering": [],
-            "Sales": [],
-            "Marketing": [],
-            "HR": [],
-            "Finance-Admin": [],
-        }
+        self._upn_index: Dict[str, str] = {}  # userPrincipalName -> objectId
+        self._membership = MembershipIndex(
+            ["Engineering", "Sales", "Marketing", "HR", "Finance-Admin"]
+        )
+
+    @property
+    def groups(self) -> Dict[str, Dict[str, None]]:
+        """Group name -> insertion-ordered set of member objectIds."""
+        return self._membership.members
+
+    def reset(self) -> None:
+        """Clear all users and group memberships."""
+        with self._lock:
+            self.users = {}
+            self._upn_index = {}
+        self._membership.reset()
 
     def create_user(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
         """Simulate creating a user in Azure AD."""
@@ -34,38 +49,70 @@ class AzureADConnector:
             "jobTitle": user_data.get("job_title"),
             "accountEnabled": True,
         }
-        self.users[object_id] = user
+        with self._lock:
+            self.users[object_id] = user
+            self._upn_index[upn] = object_id
         logger.info(f"[AzureAD] Created user: {upn} ({object_id})")
         return user
 
     def get_user(self, email: str) -> Optional[Dict[str, Any]]:
-        for user in self.users.values():
-            if user["userPrincipalName"] == email:
-                return user
-        return None
+        object_id = self.get_object_id(email)
+        if object_id is None:
+            return None
+        return self.users[object_id]
 
-    def add_to_group(self, user_id: str, group_name: str) -> Dict[str, Any]:
-        if group_name not in self.groups:
-            self.groups[group_name] = []
+    def get_object_id(self, upn: str) -> Optional[str]:
+        """Resolve a userPrincipalName to its objectId in O(1)."""
+        object_id = self._upn_index.get(upn)
+        if object_id is None or object_id not in self.users:
+            return None
+        return object_id
 
-        if user_id not in self.groups[group_name]:
-            self.groups[group_name].append(user_id)
+    def get_user_groups(self, user_id: str) -> List[str]:
+        return self._membership.groups_of(user_id)
+
+    def add_to_group(self, user_id: str, group_name: str) -> Dict[str, Any]:
+        if self._membership.add(group_name, user_id):
             logger.info(f"[AzureAD] Added user {user_id} to group {group_name}")
 
         return {"status": "success", "group": group_name, "member": user_id}
 
     def remove_from_group(self, user_id: str, group_name: str) -> Dict[str, Any]:
-        if group_name in self.groups and user_id in self.groups[group_name]:
-            self.groups[group_name].remove(user_id)
+        if self._membership.remove(group_name, user_id):
             logger.info(f"[AzureAD] Removed user {user_id} from group {group_name}")
         return {"status": "success", "group": group_name, "member": user_id}
 
+    def add_to_groups(self, memberships: Iterable[Tuple[str, str]]) -> Dict[str, Any]:
+        """Add many (member, group) pairs in one call."""
+        pairs = list(memberships)
+        added = self._membership.add_many(pairs)
+        logger.info(f"[AzureAD] Added {added} of {len(pairs)} group memberships")
+        return {"status": "success", "requested": len(pairs), "changed": added}
+
+    def remove_from_groups(
+        self, memberships: Iterable[Tuple[str, str]]
+    ) -> Dict[str, Any]:
+        """Remove many (member, group) pairs in one call."""
+        pairs = list(memberships)
+        removed = self._membership.remove_many(pairs)
+        logger.info(f"[AzureAD] Removed {removed} of {len(pairs)} group memberships")
+        return {"status": "success", "requested": len(pairs), "changed": removed}
+
+    def drain_membership_changes(self) -> List[str]:
+        """Members whose groups changed since the last call (for reconciliation)."""
+        return self._membership.drain_changes()
+
     def disable_account(self, user_id: str) -> Dict[str, Any]:
-        if user_id in self.users:
-            self.users[user_id]["accountEnabled"] = False
-            logger.info(f"[AzureAD] Disabled user {user_id}")
-            return {"status": "success", "objectId": user_id}
-        return {"status": "error", "message": "User not found"}
+        with self._lock:
+            user = self.users.get(user_id)
+            if user is None:
+                return {"status": "error", "message": "User not found"}
+            user["accountEnabled"] = False
+            # Disabled accounts keep their UPN until another account claims it,
+            # so revocations issued after a leaver still resolve.
+            self._upn_index.setdefault(user["userPrincipalName"], user_id)
+        logger.info(f"[AzureAD] Disabled user {user_id}")
+        return {"status": "success", "objectId": user_id}
 
 
 # Singleton
@@ -1,54 +1,80 @@
 import logging
-from typing import Any, Dict, List
+import threading
+from typing import Any, Dict, Iterable, List, Tuple
+
+from connectors.membership import MembershipIndex
 
 logger = logging.getLogger("GitHubConnector")
 
 
 class GitHubConnector:
     def __init__(self) -> None:
+        self._lock = threading.Lock()
         self.users: Dict[str, Dict[str, Any]] = {}  # username -> user_data
-        self.teams: Dict[str, List[str]] = {
-            "Engineering": [],
-            "DevOps": [],
-            "Frontend": [],
-            "Backend": [],
-        }
+        self._membership = MembershipIndex(
+            ["Engineering", "DevOps", "Frontend", "Backend"]
+        )
+
+    @property
+    def teams(self) -> Dict[str, Dict[str, None]]:
+        """Team name -> insertion-ordered set of member usernames."""
+        return self._membership.members
+
+    def reset(self) -> None:
+        """Clear all users and team memberships."""
+        with self._lock:
+            self.users = {}
+        self._membership.reset()
 
     def create_user(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
-        username = (
-            f"{user_data['first_name'].lower()}{user_data['last_name'].lower()}"
-        )
+        username = f"{user_data['first_name'].lower()}{user_data['last_name'].lower()}"
         user = {
             "username": username,
             "email": user_data["email"],
             "name": f"{user_data['first_name']} {user_data['last_name']}",
         }
-        self.users[username] = user
+        with self._lock:
+            self.users[username] = user
         return user
 
-    def add_to_team(self, username: str, team_name: str) -> Dict[str, Any]:
-        if team_name not in self.teams:
-            self.teams[team_name] = []
-
-        if username not in self.teams[team_name]:
-            self.teams[team_name].append(username)
+    def get_user_teams(self, username: str) -> List[str]:
+        return self._membership.groups_of(username)
 
+    def add_to_team(self, username: str, team_name: str) -> Dict[str, Any]:
+        self._membership.add(team_name, username)
         return {"status": "success", "team": team_name, "member": username}
 
     def remove_from_team(self, username: str, team_name: str) -> Dict[str, Any]:
-        if team_name in self.teams and username in self.teams[team_name]:
-            self.teams[team_name].remove(username)
+        self._membership.remove(team_name, username)
         return {"status": "success", "team": team_name, "member": username}
 
+    def add_to_teams(self, memberships: Iterable[Tuple[str, str]]) -> Dict[str, Any]:
+        """Add many (member, team) pairs in one call."""
+        pairs = list(memberships)
+        added = self._membership.add_many(pairs)
+        logger.info(f"[GitHub] Added {added} of {len(pairs)} team memberships")
+        return {"status": "success", "requested": len(pairs), "changed": added}
+
+    def remove_from_teams(
+        self, memberships: Iterable[Tuple[str, str]]
+    ) -> Dict[str, Any]:
+        """Remove many (member, team) pairs in one call."""
+        pairs = list(memberships)
+        removed = self._membership.remove_many(pairs)
+        logger.info(f"[GitHub] Removed {removed} of {len(pairs)} team memberships")
+        return {"status": "success", "requested": len(pairs), "changed": removed}
+
+    def drain_membership_changes(self) -> List[str]:
+        """Members whose groups changed since the last call (for reconciliation)."""
+        return self._membership.drain_changes()
+
     def remove_user(self, username: str) -> Dict[str, Any]:
-        if username in self.users:
-            del self.users[username]
-            # Also remove from all teams
-            for team in self.teams.values():
-                if username in team:
-                    team.remove(username)
-            return {"status": "success", "username": username}
-        return {"status": "error", "message": "User not found"}
+        with self._lock:
+            if self.users.pop(username, None) is None:
+                return {"status": "error", "message": "User not found"}
+            # Also remove from all of the user's teams
+            self._membership.remove_member(username)
+        return {"status": "success", "username": username}
 
 
 github_connector = GitHubConnector()
@@ -0,0 +1,91 @@
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+
+class MembershipIndex:
+    """Group membership with a member -> groups reverse index.
+
+    Both directions are insertion-ordered sets (dicts with ``None`` values), so
+    adds, removes and membership checks are O(1), and listing or removing
+    everything a member belongs to costs O(memberships). Members whose groups
+    change are recorded until ``drain_changes`` is called. Changes hold a
+    lock, so connector calls running on several threads keep both
+    directions consistent.
+    """
+
+    def __init__(self, groups: Iterable[str] = ()) -> None:
+        self._default_groups = tuple(groups)
+        self._lock = threading.RLock()
+        self.members: Dict[str, Dict[str, None]] = {}  # group -> members
+        self.memberships: Dict[str, Dict[str, None]] = {}  # member -> groups
+        self._changed: Dict[str, None] = {}
+        self.reset()
+
+    def reset(self) -> None:
+        """Drop all memberships, keeping only the default (empty) groups."""
+        with self._lock:
+            self._changed.update(dict.fromkeys(self.memberships))
+            self.members = {group: {} for group in self._default_groups}
+            self.memberships = {}
+
+    def add(self, group: str, member: str) -> bool:
+        """Add a member to a group. Returns False if already a member."""
+        with self._lock:
+            members = self.members.setdefault(group, {})
+            if member in members:
+                return False
+            members[member] = None
+            self.memberships.setdefault(member, {})[group] = None
+            self._changed[member] = None
+            return True
+
+    def remove(self, group: str, member: str) -> bool:
+        """Remove a member from a group. Returns False if not a member."""
+        with self._lock:
+            members = self.members.get(group)
+            if members is None or member not in members:
+                return False
+            del members[member]
+            groups = self.memberships[member]
+            del groups[group]
+            if not groups:
+                del self.memberships[member]
+            self._changed[member] = None
+            return True
+
+    def add_many(self, memberships: Iterable[Tuple[str, str]]) -> int:
+        """Add (member, group) pairs; returns how many were new."""
+        with self._lock:
+            return sum(self.add(group, member) for member, group in memberships)
+
+    def remove_many(self, memberships: Iterable[Tuple[str, str]]) -> int:
+        """Remove (member, group) pairs; returns how many were present."""
+        with self._lock:
+            return sum(self.remove(group, member) for member, group in memberships)
+
+    def remove_member(self, member: str) -> List[str]:
+        """Remove a member from every group and return the groups it left."""
+        with self._lock:
+            groups = self.memberships.pop(member, {})
+            for group in groups:
+                del self.members[group][member]
+            if groups:
+                self._changed[member] = None
+            return list(groups)
+
+    def is_member(self, group: str, member: str) -> bool:
+        return member in self.members.get(group, {})
+
+    def members_of(self, group: str) -> List[str]:
+        with self._lock:
+            return list(self.members.get(group, {}))
+
+    def groups_of(self, member: str) -> List[str]:
+        with self._lock:
+            return list(self.memberships.get(member, {}))
+
+    def drain_changes(self) -> List[str]:
+        """Members whose groups changed since the last call."""
+        with self._lock:
+            changed, self._changed = self._changed, {}
+        return list(changed)
@@ -0,0 +1,143 @@
+from typing import (
+    AbstractSet,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+)
+
+from connectors.azuread_connector import azure_ad_connector
+from connectors.github_connector import github_connector
+from connectors.slack_connector import slack_connector
+
+Membership = Tuple[str, str]  # (member, group)
+BulkCall = Callable[[Iterable[Membership]], Dict[str, Any]]
+
+
+class ConnectorBinding:
+    """How entitlements of one system map onto a connector's bulk methods."""
+
+    def __init__(
+        self,
+        system: str,
+        add: BulkCall,
+        remove: BulkCall,
+        member_of: Callable[[Dict[str, str], str], Optional[str]],
+        account_member: Callable[[Dict[str, Any]], str],
+        groups_of: Callable[[str], List[str]],
+        account_ids: Callable[[], AbstractSet[str]],
+        drain_changes: Callable[[], List[str]],
+    ) -> None:
+        self.system = system
+        self.add = add
+        self.remove = remove
+        # (identity accounts, email) -> member id, or None without an account
+        self.member_of = member_of
+        # connector create_user result -> member id
+        self.account_member = account_member
+        # Read side, used by reconciliation: member id -> current groups,
+        # the ids of every account, and members changed since the last drain
+        self.groups_of = groups_of
+        self.account_ids = account_ids
+        self.drain_changes = drain_changes
+
+
+class ConnectorRegistry:
+    """Groups ``System:Group`` entitlements by connector for batched calls.
+
+    A provisioning plan maps each system to its (member, group) pairs, so a
+    joiner or mover issues one bulk call per connector instead of one call
+    per entitlement. Entitlements of unregistered systems are ignored.
+    """
+
+    def __init__(self) -> None:
+        self._bindings: Dict[str, ConnectorBinding] = {}
+
+    def register(self, binding: ConnectorBinding) -> None:
+        self._bindings[binding.system] = binding
+
+    def get(self, system: str) -> Optional[ConnectorBinding]:
+        return self._bindings.get(system)
+
+    @property
+    def systems(self) -> List[str]:
+        return list(self._bindings)
+
+    def group(self, entitlements: Iterable[str]) -> Dict[str, List[str]]:
+        """Split entitlements into group names per registered system."""
+        groups: Dict[str, Dict[str, None]] = {}
+        for entitlement in entitlements:
+            system, group = entitlement.split(":", 1)
+            if system in self._bindings:
+                groups.setdefault(system, {})[group] = None
+        return {system: list(names) for system, names in groups.items()}
+
+    def plan(
+        self, accounts: Dict[str, str], email: str, entitlements: Iterable[str]
+    ) -> Dict[str, List[Membership]]:
+        """Resolve an identity's entitlements to (member, group) pairs.
+
+        Systems where the identity has no account are left out.
+        """
+        plan: Dict[str, List[Membership]] = {}
+        for system, groups in self.group(entitlements).items():
+            member = self._bindings[system].member_of(accounts, email)
+            if member is not None:
+                plan[system] = [(member, group) for group in groups]
+        return plan
+
+    def add(self, system: str, memberships: Iterable[Membership]) -> Dict[str, Any]:
+        return self._bindings[system].add(memberships)
+
+    def remove(self, system: str, memberships: Iterable[Membership]) -> Dict[str, Any]:
+        return self._bindings[system].remove(memberships)
+
+
+def _azure_member(accounts: Dict[str, str], email: str) -> Optional[str]:
+    # Identities provisioned before the objectId was stored only carry the UPN.
+    object_id = accounts.get("azure_ad_object_id")
+    if object_id is None and "azure_ad" in accounts:
+        object_id = azure_ad_connector.get_object_id(accounts["azure_ad"])
+    return object_id
+
+
+connector_registry = ConnectorRegistry()
+connector_registry.register(
+    ConnectorBinding(
+        "AzureAD",
+        azure_ad_connector.add_to_groups,
+        azure_ad_connector.remove_from_groups,
+        _azure_member,
+        lambda account: str(account["objectId"]),
+        azure_ad_connector.get_user_groups,
+        lambda: azure_ad_connector.users.keys(),
+        azure_ad_connector.drain_membership_changes,
+    )
+)
+connector_registry.register(
+    ConnectorBinding(
+        "GitHub",
+        github_connector.add_to_teams,
+        github_connector.remove_from_teams,
+        lambda accounts, email: accounts.get("github"),
+        lambda account: str(account["username"]),
+        github_connector.get_user_teams,
+        lambda: github_connector.users.keys(),
+        github_connector.drain_membership_changes,
+    )
+)
+connector_registry.register(
+    ConnectorBinding(
+        "Slack",
+        slack_connector.add_to_channels,
+        slack_connector.remove_from_channels,
+        lambda accounts, email: email if "slack" in accounts else None,
+        lambda account: str(account["email"]),
+        slack_connector.get_user_channels,
+        lambda: slack_connector.users.keys(),
+        slack_connector.drain_membership_changes,
+    )
+)
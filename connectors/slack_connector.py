@@ -1,50 +1,83 @@
 import logging
-from typing import Any, Dict, List
+import threading
+from typing import Any, Dict, Iterable, List, Tuple
+
+from connectors.membership import MembershipIndex
 
 logger = logging.getLogger("SlackConnector")
 
 
 class SlackConnector:
     def __init__(self) -> None:
+        self._lock = threading.Lock()
         self.users: Dict[str, Dict[str, Any]] = {}  # email -> user_data
-        self.channels: Dict[str, List[str]] = {
-            "general": [],
-            "random": [],
-            "engineering": [],
-            "sales": [],
-            "marketing": [],
-        }
+        self._membership = MembershipIndex(
+            ["general", "random", "engineering", "sales", "marketing"]
+        )
+
+    @property
+    def channels(self) -> Dict[str, Dict[str, None]]:
+        """Channel name -> insertion-ordered set of member emails."""
+        return self._membership.members
+
+    def reset(self) -> None:
+        """Clear all users and channel memberships."""
+        with self._lock:
+            self.users = {}
+        self._membership.reset()
 
     def create_user(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
-        user_id = f"U{len(self.users) + 1000}"
-        user = {
-            "id": user_id,
-            "email": user_data["email"],
-            "real_name": f"{user_data['first_name']} {user_data['last_name']}",
-            "deleted": False,
-        }
-        self.users[user_data["email"]] = user
+        # Ids are allocated from the user count, so allocation and insert
+        # must not interleave with another call.
+        with self._lock:
+            user_id = f"U{len(self.users) + 1000}"
+            user = {
+                "id": user_id,
+                "email": user_data["email"],
+                "real_name": f"{user_data['first_name']} {user_data['last_name']}",
+                "deleted": False,
+            }
+            self.users[user_data["email"]] = user
         return user
 
-    def add_to_channel(self, email: str, channel_name: str) -> Dict[str, Any]:
-        if channel_name not in self.channels:
-            self.channels[channel_name] = []
-
-        if email not in self.channels[channel_name]:
-            self.channels[channel_name].append(email)
+    def get_user_channels(self, email: str) -> List[str]:
+        return self._membership.groups_of(email)
 
+    def add_to_channel(self, email: str, channel_name: str) -> Dict[str, Any]:
+        self._membership.add(channel_name, email)
         return {"status": "success", "channel": channel_name, "member": email}
 
     def remove_from_channel(self, email: str, channel_name: str) -> Dict[str, Any]:
-        if channel_name in self.channels and email in self.channels[channel_name]:
-            self.channels[channel_name].remove(email)
+        self._membership.remove(channel_name, email)
         return {"status": "success", "channel": channel_name, "member": email}
 
+    def add_to_channels(self, memberships: Iterable[Tuple[str, str]]) -> Dict[str, Any]:
+        """Add many (member, channel) pairs in one call."""
+        pairs = list(memberships)
+        added = self._membership.add_many(pairs)
+        logger.info(f"[Slack] Added {added} of {len(pairs)} channel memberships")
+        return {"status": "success", "requested": len(pairs), "changed": added}
+
+    def remove_from_channels(
+        self, memberships: Iterable[Tuple[str, str]]
+    ) -> Dict[str, Any]:
+        """Remove many (member, channel) pairs in one call."""
+        pairs = list(memberships)
+        removed = self._membership.remove_many(pairs)
+        logger.info(f"[Slack] Removed {removed} of {len(pairs)} channel memberships")
+        return {"status": "success", "requested": len(pairs), "changed": removed}
+
+    def drain_membership_changes(self) -> List[str]:
+        """Members whose groups changed since the last call (for reconciliation)."""
+        return self._membership.drain_changes()
+
     def deactivate_user(self, email: str) -> Dict[str, Any]:
-        if email in self.users:
-            self.users[email]["deleted"] = True
-            return {"status": "success", "email": email}
-        return {"status": "error", "message": "User not found"}
+        with self._lock:
+            user = self.users.get(email)
+            if user is None:
+                return {"status": "error", "message": "User not found"}
+            user["deleted"] = True
+        return {"status": "success", "email": email}
 
 
 slack_connector = SlackConnector()
@@ -1,17 +1,26 @@
-from typing import Generator
+from datetime import datetime, timedelta
+from typing import Any, Dict, Generator, Optional
 import pytest
+from fastapi.testclient import TestClient
+from backend.engines.outbox_engine import outbox_engine
 from backend.engines.request_engine import request_engine
+from backend.main import app
+from backend.stores.org_hierarchy import org_hierarchy
+from backend.stores.outbox_store import outbox_store
 from backend.stores.request_store import request_store
 from backend.stores.identity_store import identity_store
 from backend.stores.audit_log import audit_log_store
+from connectors.github_connector import github_connector
+from connectors.registry import connector_registry
 
 
 @pytest.fixture(autouse=True)
 def run_around_tests() -> Generator[None, None, None]:
     # Setup
-    identity_store._identities = {}
-    request_store._requests = []
-    audit_log_store._logs = []
+    identity_store.reset()
+    org_hierarchy.reset()
+    request_store.reset()
+    audit_log_store.reset()
     yield
     # Teardown
 
@@ -100,3 +109,227 @@ def test_sod_warning() -> None:
     # Currently we just log it, but the request should still be created
     assert req.status == "pending"
     # In a real system, this might auto-reject or require 2-step approval.
+
+
+def test_request_store_indexes_and_pagination() -> None:
+    for i in range(5):
+        request_store.create_request(
+            {
+                "requester_id": "alice" if i % 2 == 0 else "bob",
+                "target_identity_id": "alice" if i % 2 == 0 else "bob",
+                "entitlement": f"GitHub:Team{i}",
+                "justification": "Needed",
+            }
+        )
+    all_requests = request_store.list_requests()
+    assert [r.entitlement for r in all_requests] == [
+        f"GitHub:Team{i}" for i in range(4, -1, -1)
+    ]
+
+    # Move one request out of the pending index
+    request_store.update_request(all_requests[0].id, {"status": "approved"})
+    pending = request_store.list_requests(status="pending")
+    assert [r.entitlement for r in pending] == [
+        f"GitHub:Team{i}" for i in range(3, -1, -1)
+    ]
+    assert request_store.count("approved") == 1
+
+    alice_pending = request_store.list_requests(status="pending", requester_id="alice")
+    assert [r.entitlement for r in alice_pending] == ["GitHub:Team2", "GitHub:Team0"]
+
+    # Cursor pagination walks the same ordering page by page
+    first_page = request_store.list_requests(limit=2)
+    second_page = request_store.list_requests(limit=2, cursor=first_page[-1].id)
+    assert [r.id for r in first_page + second_page] == [
+        r.id for r in request_store.list_requests()[:4]
+    ]
+
+
+def _person(employee_id: str, manager_id: Optional[str] = None) -> str:
+    return identity_store.create_identity(
+        {
+            "employee_id": employee_id,
+            "first_name": employee_id,
+            "last_name": "Org",
+            "email": f"{employee_id.lower()}@example.com",
+            "department": "Engineering",
+            "job_title": "Engineer",
+            "manager_id": manager_id,
+        }
+    ).id
+
+
+def test_management_chain_is_cached_and_invalidated_on_moves() -> None:
+    ceo = _person("CEO")
+    vp = _person("VP", ceo)
+    director = _person("DIR", vp)
+    engineer = _person("ENG", director)
+    other_vp = _person("VP2", ceo)
+
+    assert org_hierarchy.management_chain(engineer) == [director, vp, ceo]
+    # The walk cached every chain on the way up
+    assert org_hierarchy._chains[director] == (vp, ceo)
+
+    # Moving the director invalidates the director's subtree only
+    identity_store.update_identity(director, {"manager_id": other_vp})
+    assert engineer not in org_hierarchy._chains
+    assert org_hierarchy._chains[vp] == (ceo,)
+    assert org_hierarchy.management_chain(engineer) == [director, other_vp, ceo]
+    assert org_hierarchy.direct_reports(other_vp) == [director]
+    assert org_hierarchy.direct_reports(vp) == []
+
+    # A reporting cycle ends the chain instead of looping
+    identity_store.update_identity(ceo, {"manager_id": engineer})
+    assert org_hierarchy.management_chain(engineer) == [director, other_vp, ceo]
+
+
+def test_requests_are_routed_to_the_manager_inbox() -> None:
+    skip = _person("SKIP")
+    manager = _person("MGR", skip)
+    new_manager = _person("NEW", skip)
+    requester = _person("REQ", manager)
+    outsider = _person("OUT")
+
+    req = request_engine.submit_request(requester, "GitHub:DevOps", "On call")
+    assert req.assigned_approver_id == manager
+    assert [r.id for r in request_engine.inbox(manager)] == [req.id]
+    assert request_store.count_pending_for_approver(manager) == 1
+
+    with pytest.raises(ValueError, match="management chain"):
+        request_engine.approve_request(req.id, outsider)
+
+    # A mover re-routes pending requests to the new manager
+    identity_store.update_identity(requester, {"manager_id": new_manager})
+    assert request_engine.inbox(manager) == []
+    [routed] = request_engine.inbox(new_manager)
+    assert routed.id == req.id
+
+    # Managers who left are skipped, and their pending requests move up
+    identity_store.update_identity(new_manager, {"status": "terminated"})
+    assert request_engine.inbox(new_manager) == []
+    second = request_engine.submit_request(requester, "Slack:sales", "Deal")
+    assert second.assigned_approver_id == skip
+
+    client = TestClient(app)
+    response = client.get(f"/api/approvers/{skip}/inbox")
+    assert [r["id"] for r in response.json()] == [req.id, second.id]
+    chain = client.get(f"/api/identities/{requester}/management-chain").json()
+    assert chain == [new_manager, skip]
+
+    # Skip-level managers may decide; decided requests leave the inbox
+    request_engine.reject_request(req.id, skip, "Not needed")
+    assert [r.id for r in request_engine.inbox(skip)] == [second.id]
+
+
+def test_bulk_decision_groups_provisioning_per_identity() -> None:
+    manager = _person("BULKMGR")
+    alice = _person("BULKA", manager)
+    bob = _person("BULKB", manager)
+    identity_store.update_identity(alice, {"accounts": {"github": "bulka"}})
+    identity_store.update_identity(
+        bob, {"accounts": {"github": "bulkb", "slack": "U1"}}
+    )
+    requests = [
+        request_engine.submit_request(alice, "GitHub:DevOps", "On call"),
+        request_engine.submit_request(alice, "GitHub:Frontend", "UI work"),
+        request_engine.submit_request(bob, "GitHub:DevOps", "On call"),
+        request_engine.submit_request(bob, "Slack:sales", "Deal room"),
+        request_engine.submit_request(bob, "GitHub:Backend", "Nope"),
+    ]
+    ids = [r.id for r in requests]
+    outbox_before = outbox_store.count()
+
+    client = TestClient(app)
+    response = client.post(
+        "/api/requests:bulk-decision",
+        json={
+            "approver_id": manager,
+            "decisions": [
+                {"request_id": ids[0], "decision": "approve"},
+                {"request_id": ids[1], "decision": "approve"},
+                {"request_id": ids[2], "decision": "approve"},
+                {"request_id": ids[3], "decision": "approve"},
+                {"request_id": ids[4], "decision": "reject", "reason": "No"},
+                {"request_id": ids[0], "decision": "approve"},
+                {"request_id": "missing", "decision": "approve"},
+                {"request_id": ids[1], "decision": "maybe"},
+            ],
+        },
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert [r["status"] for r in body["results"]] == [
+        "approved",
+        "approved",
+        "approved",
+        "approved",
+        "rejected",
+        "error",
+        "error",
+        "error",
+    ]
+    assert body["results"][5]["message"] == "Duplicate decision for this request"
+    assert body["decided"] == 5 and body["errors"] == 3
+
+    # One grant per identity and connector
+    grants = outbox_store.list_operations()[outbox_before:]
+    assert sorted((op.payload["identity_id"], op.connector) for op in grants) == (
+        sorted([(alice, "GitHub"), (bob, "GitHub"), (bob, "Slack")])
+    )
+    [alice_grant] = [op for op in grants if op.payload["identity_id"] == alice]
+    assert alice_grant.payload["request_ids"] == ids[:2]
+    assert {"bulka", "bulkb"} <= set(github_connector.teams["DevOps"])
+    assert "bulka" in github_connector.teams["Frontend"]
+
+    alice_profile = identity_store.get_identity(alice)
+    assert alice_profile is not None
+    assert alice_profile.entitlements == ["GitHub:DevOps", "GitHub:Frontend"]
+    assert request_engine.inbox(manager) == []
+    rejected = request_store.get_request(ids[4])
+    assert rejected is not None and rejected.comments == "No"
+
+    outsider = _person("BULKOUT")
+    denied = client.post(
+        "/api/requests:bulk-decision",
+        json={"approver_id": "nobody", "decisions": []},
+    )
+    assert denied.status_code == 400
+    late = request_engine.submit_request(alice, "Slack:sales", "Late")
+    [result] = request_engine.decide_requests(
+        outsider, [{"request_id": late.id, "decision": "approve"}]
+    )
+    assert result["status"] == "error" and "management chain" in result["message"]
+
+
+def test_bulk_approvals_of_one_entitlement_all_fail_on_dead_letter(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    manager = _person("DUPMGR")
+    alice = _person("DUPA", manager)
+    identity_store.update_identity(
+        alice, {"accounts": {"github": "dupa"}, "entitlements": ["GitHub:Admin"]}
+    )
+    ids = [
+        request_engine.submit_request(alice, entitlement, "On call").id
+        for entitlement in ("GitHub:DevOps", "GitHub:DevOps", "GitHub:Admin")
+    ]
+
+    def broken(memberships: Any) -> Dict[str, Any]:
+        raise RuntimeError("GitHub API error")
+
+    monkeypatch.setattr(connector_registry.get("GitHub"), "add", broken)
+    monkeypatch.setattr(outbox_engine, "max_attempts", 2)
+    outcomes = request_engine.decide_requests(
+        manager, [{"request_id": i, "decision": "approve"} for i in ids]
+    )
+    assert [o["status"] for o in outcomes] == ["approved"] * 3
+    outbox_engine.drain(now=datetime.now() + timedelta(hours=1))
+
+    [dead] = outbox_store.list_operations("dead")
+    assert dead.payload["request_ids"] == ids
+    for request_id in ids:
+        request = request_store.get_request(request_id)
+        assert request is not None and request.status == "failed"
+    # Only the access the grant recorded is withdrawn
+    identity = identity_store.get_identity(alice)
+    assert identity is not None and identity.entitlements == ["GitHub:Admin"]
@@ -0,0 +1,176 @@
+import json
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Generator, List
+import pytest
+from backend.stores.audit_log import AuditEvent, audit_log_store
+from backend.stores.audit_sink import AuditSink
+
+
+@pytest.fixture(autouse=True)
+def run_around_tests() -> Generator[None, None, None]:
+    # Setup
+    audit_log_store.reset()
+    yield
+    # Teardown
+    audit_log_store.attach_sink(None)
+
+
+def test_audit_log_queries_and_export() -> None:
+    from fastapi.testclient import TestClient
+    from backend.main import app
+
+    for i in range(5):
+        audit_log_store.log_event("grant_access", f"user{i % 2}@example.com")
+    audit_log_store.log_event("revoke_access", "user0@example.com", actor="admin")
+
+    newest = audit_log_store.get_logs(limit=2)
+    assert [e.action for e in newest] == ["revoke_access", "grant_access"]
+
+    page = audit_log_store.query_logs(target="user0@example.com", limit=2)
+    rest = audit_log_store.query_logs(
+        target="user0@example.com", cursor=audit_log_store.cursor_for(page[-1])
+    )
+    assert len(page) == 2 and len(rest) == 2
+    assert [e.id for e in page + rest] == [
+        e.id for e in reversed(audit_log_store.get_logs_by_target("user0@example.com"))
+    ]
+    assert audit_log_store.query_logs(actor="admin", action="grant_access") == []
+    before_newest = audit_log_store.query_logs(end=newest[0].timestamp)
+    assert all(e.timestamp < newest[0].timestamp for e in before_newest)
+
+    client = TestClient(app)
+    response = client.get("/api/audit/logs", params={"limit": 3})
+    assert len(response.json()) == 3
+    cursor = response.headers["X-Next-Cursor"]
+    response = client.get("/api/audit/logs", params={"limit": 3, "cursor": cursor})
+    assert len(response.json()) == 3
+    assert "X-Next-Cursor" in response.headers
+
+    response = client.get("/api/audit/export", params={"action": "grant_access"})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 5
+
+    response = client.get("/api/audit/export", params={"format": "csv"})
+    rows = response.text.strip().splitlines()
+    assert rows[0] == "id,timestamp,actor,action,target,status,details"
+    assert len(rows) == 7
+
+
+def test_audit_log_queries_accept_timezone_aware_bounds() -> None:
+    from fastapi.testclient import TestClient
+    from backend.main import app
+
+    audit_log_store.log_event("grant_access", "early@example.com")
+    cutoff = datetime.now().astimezone()
+    audit_log_store.log_event("grant_access", "late@example.com")
+
+    in_utc = cutoff.astimezone(timezone.utc)
+    assert [e.target for e in audit_log_store.query_logs(start=in_utc)] == [
+        "late@example.com"
+    ]
+    assert [e.target for e in audit_log_store.iter_logs(end=in_utc)] == [
+        "early@example.com"
+    ]
+
+    client = TestClient(app)
+    response = client.get("/api/audit/logs", params={"start": in_utc.isoformat()})
+    assert response.status_code == 200
+    assert [e["target"] for e in response.json()] == ["late@example.com"]
+
+
+def test_audit_sink_group_commit_and_rotation(tmp_path: str) -> None:
+    directory = os.path.join(tmp_path, "audit")
+    sink = AuditSink(directory, segment_max_bytes=1024, fsync_every=10)
+    sink.start()
+    audit_log_store.attach_sink(sink)
+
+    for i in range(50):
+        audit_log_store.log_event("grant_access", f"user{i}@example.com")
+    assert sink.flush(timeout=5)
+
+    segments = sorted(os.listdir(directory))
+    assert len(segments) > 1  # Rotated past segment_max_bytes
+    written: List[AuditEvent] = []
+    for name in segments:
+        with open(os.path.join(directory, name)) as f:
+            written.extend(AuditEvent(**json.loads(line)) for line in f)
+    assert [e.target for e in written] == [f"user{i}@example.com" for i in range(50)]
+
+    audit_log_store.log_event("revoke_access", "late@example.com")
+    sink.close(timeout=5)
+    assert sink.events_written == 51
+
+    # A restarted sink opens a fresh segment instead of appending to old ones
+    restarted = AuditSink(directory)
+    restarted.start()
+    assert os.path.basename(restarted.segment_path) not in segments
+    restarted.close(timeout=5)
+
+
+class _FailingFile:
+    """Segment file whose writes fail; everything else is passed through."""
+
+    def __init__(self, file: Any) -> None:
+        self._file = file
+
+    def write(self, data: bytes) -> int:
+        raise OSError("disk full")
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._file, name)
+
+
+def test_audit_sink_survives_io_errors(tmp_path: str, monkeypatch: Any) -> None:
+    directory = os.path.join(tmp_path, "audit")
+    sink = AuditSink(directory, fsync_interval_ms=10)
+    sink.start()
+    audit_log_store.attach_sink(sink)
+
+    # A failed write is kept and retried on a fresh segment
+    monkeypatch.setattr(sink, "_file", _FailingFile(sink._file))
+    for i in range(5):
+        audit_log_store.log_event("grant_access", f"user{i}@example.com")
+    assert not sink.flush(timeout=5)  # reports the failure since last flush
+    assert sink.flush(timeout=5)
+    assert sink.events_written == 5 and sink.pending == 0
+    targets: List[str] = []
+    for name in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, name)) as f:
+            targets.extend(json.loads(line)["target"] for line in f)
+    assert targets == [f"user{i}@example.com" for i in range(5)]
+
+    # A failed fsync does not stop the writer either
+    fsync = os.fsync
+    calls: List[int] = []
+
+    def failing_fsync(fd: int) -> None:
+        calls.append(fd)
+        if len(calls) == 1:
+            raise OSError("I/O error")
+        fsync(fd)
+
+    monkeypatch.setattr("backend.stores.audit_sink.os.fsync", failing_fsync)
+    audit_log_store.log_event("revoke_access", "late@example.com")
+    assert not sink.flush(timeout=5)
+    audit_log_store.log_event("revoke_access", "later@example.com")
+    assert sink.flush(timeout=5)
+    assert sink.close(timeout=5)
+    assert sink.events_written == 7
+
+
+def test_audit_events_keep_their_own_details() -> None:
+    entitlements = ["GitHub:Dev"]
+    details: Dict[str, Any] = {
+        "entitlements": entitlements,
+        "department": "Engineering",
+    }
+    audit_log_store.log_event("grant_access", "user@example.com", details=details)
+    entitlements.append("GitHub:Admin")
+    details["department"] = "Sales"
+
+    (event,) = audit_log_store.get_logs_by_target("user@example.com")
+    assert event.details == {
+        "entitlements": ["GitHub:Dev"],
+        "department": "Engineering",
+    }
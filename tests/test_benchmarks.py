@@ -0,0 +1,53 @@
+import copy
+from typing import List, Set
+
+from benchmarks.bench_jml import compare, run_size
+from benchmarks.workforce import HREvent, WorkforceGenerator
+
+
+def test_workforce_feed_is_seeded_and_consistent() -> None:
+    def feed(seed: int) -> List[HREvent]:
+        generator = WorkforceGenerator(seed=seed, span_of_control=4)
+        return list(generator.onboarding(200)) + list(generator.churn(300))
+
+    assert feed(7) == feed(7)
+    assert feed(7) != feed(8)
+
+    hired: Set[str] = set()
+    active: Set[str] = set()
+    kinds = set()
+    for event_type, payload in feed(7):
+        kinds.add(event_type)
+        employee_id = payload["employee_id"]
+        manager = payload.get("manager_employee_id")
+        # Managers are active before anyone reports to them
+        assert manager is None or manager in active
+        if event_type == "EmployeeCreated":
+            assert employee_id not in hired
+            hired.add(employee_id)
+            active.add(employee_id)
+        else:
+            assert employee_id in active
+            if event_type == "EmployeeTerminated":
+                active.remove(employee_id)
+    assert kinds == {"EmployeeCreated", "EmployeeUpdated", "EmployeeTerminated"}
+
+
+def test_jml_benchmark_reports_flows_and_regressions() -> None:
+    metrics = run_size(100, seed=1)
+    assert metrics["hr_events"] == 110
+    assert metrics["events_per_sec"] > 0
+    for flow in ("joiner", "mover", "leaver", "request_submit", "request_approve"):
+        assert metrics["flows"][flow]["count"] > 0
+        assert metrics["flows"][flow]["p99_ms"] >= metrics["flows"][flow]["p50_ms"]
+
+    baseline = {"sizes": {"100": metrics}}
+    assert compare(baseline, baseline, tolerance=0.1) == []
+
+    slower = copy.deepcopy(baseline)
+    slower["sizes"]["100"]["events_per_sec"] = metrics["events_per_sec"] / 2
+    slower["sizes"]["100"]["flows"]["joiner"]["p99_ms"] *= 3
+    regressions = compare(slower, baseline, tolerance=0.1)
+    assert len(regressions) == 2
+    assert regressions[0].startswith("100 events_per_sec")
+    assert regressions[1].startswith("100 joiner p99_ms")
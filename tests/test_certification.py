@@ -0,0 +1,149 @@
+import json
+from typing import Generator
+import pytest
+from fastapi.testclient import TestClient
+from backend.engines.certification_engine import certification_engine
+from backend.engines.jml_engine import jml_engine
+from backend.main import app
+from backend.stores.identity_store import IdentityProfile, identity_store
+from backend.stores.audit_log import audit_log_store
+
+from connectors.azuread_connector import azure_ad_connector
+from connectors.github_connector import github_connector
+from connectors.slack_connector import slack_connector
+
+
+@pytest.fixture(autouse=True)
+def run_around_tests() -> Generator[None, None, None]:
+    identity_store.reset()
+    audit_log_store.reset()
+    certification_engine.reset()
+    azure_ad_connector.reset()
+    github_connector.reset()
+    slack_connector.reset()
+    yield
+
+
+def _hire(employee_id: str, department: str) -> str:
+    result = jml_engine.process_event(
+        "EmployeeCreated",
+        {
+            "employee_id": employee_id,
+            "first_name": "Cert",
+            "last_name": employee_id,
+            "email": f"{employee_id.lower()}@example.com",
+            "department": department,
+            "job_title": "Staff",
+        },
+    )
+    identity_id: str = result["identity_id"]
+    return identity_id
+
+
+def _identity(identity_id: str) -> IdentityProfile:
+    identity = identity_store.get_identity(identity_id)
+    assert identity is not None
+    return identity
+
+
+def test_campaign_decisions_and_batched_revocations() -> None:
+    eng1 = _hire("CERT1", "Engineering")
+    eng2 = _hire("CERT2", "Engineering")
+    _hire("CERT3", "Sales")
+
+    campaign = certification_engine.create_campaign(
+        "Q1 GitHub review", "system", "GitHub"
+    )
+    items = list(certification_engine.iter_items(campaign.id))
+    assert {(i["identity_id"], i["entitlement"]) for i in items} == {
+        (eng1, "GitHub:Engineering"),
+        (eng2, "GitHub:Engineering"),
+    }
+    assert campaign.progress.total_items == 2
+
+    result = certification_engine.record_decisions(
+        campaign.id,
+        [
+            {
+                "identity_id": eng1,
+                "entitlement": "GitHub:Engineering",
+                "decision": "revoke",
+            },
+            {
+                "identity_id": eng2,
+                "entitlement": "GitHub:Engineering",
+                "decision": "certify",
+            },
+            {"identity_id": eng2, "entitlement": "Slack:general", "decision": "revoke"},
+        ],
+        reviewer="manager@example.com",
+    )
+    assert result["recorded"] == 2
+    assert result["errors"] == [
+        {"index": 2, "message": "Item is not part of this campaign"}
+    ]
+    assert result["progress"]["revocations_pending"] == 1
+    assert list(certification_engine.iter_items(campaign.id, pending_only=True)) == []
+
+    # Nothing is revoked until the batch runs
+    username = _identity(eng1).accounts["github"]
+    assert username in github_connector.teams["Engineering"]
+    applied = certification_engine.apply_revocations(campaign.id, batch_size=10)
+    assert applied["revocations_applied"] == 1
+    assert username not in github_connector.teams["Engineering"]
+    assert "GitHub:Engineering" not in _identity(eng1).entitlements
+
+    completed = certification_engine.complete_campaign(campaign.id)
+    assert completed.status == "completed"
+    assert completed.progress.model_dump() == {
+        "total_items": 2,
+        "decided": 2,
+        "certified": 1,
+        "revoked": 1,
+        "revocations_applied": 1,
+        "revocations_pending": 0,
+    }
+    with pytest.raises(ValueError):
+        certification_engine.record_decisions(campaign.id, [])
+
+
+def test_certification_api_streams_items() -> None:
+    sales = _hire("CERT4", "Sales")
+    client = TestClient(app)
+
+    response = client.post(
+        "/api/certifications",
+        json={"name": "Sales", "scope_type": "department", "scope_value": "Sales"},
+    )
+    assert response.status_code == 200
+    campaign_id = response.json()["id"]
+    assert response.json()["progress"]["total_items"] == 6
+
+    response = client.get(f"/api/certifications/{campaign_id}/items")
+    items = [json.loads(line) for line in response.text.splitlines()]
+    assert {item["identity_id"] for item in items} == {sales}
+    assert all(item["decision"] is None for item in items)
+
+    response = client.post(
+        f"/api/certifications/{campaign_id}/decisions",
+        json={
+            "reviewer_id": "auditor",
+            "decisions": [
+                {
+                    "identity_id": sales,
+                    "entitlement": "AzureAD:Sales",
+                    "decision": "revoke",
+                }
+            ],
+        },
+    )
+    assert response.json()["progress"]["revoked"] == 1
+    response = client.post(f"/api/certifications/{campaign_id}/complete")
+    assert response.json()["progress"]["revocations_applied"] == 1
+    assert "AzureAD:Sales" not in _identity(sales).entitlements
+
+    bad = client.post(
+        "/api/certifications",
+        json={"name": "x", "scope_type": "region", "scope_value": "EU"},
+    )
+    assert bad.status_code == 400
@@ -0,0 +1,253 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Generator, List
+
+import pytest
+
+from backend.engines.certification_engine import certification_engine
+from backend.engines.jml_engine import jml_engine
+from backend.engines.policy_engine import policy_engine
+from backend.engines.request_engine import request_engine
+from backend.stores.audit_log import audit_log_store
+from backend.stores.event_cache import hr_event_cache
+from backend.stores.identity_store import identity_store
+from backend.stores.org_hierarchy import org_hierarchy
+from backend.stores.outbox_store import outbox_store
+from backend.stores.request_store import request_store
+from backend.stores.striped_lock import StripedLock
+from connectors.azuread_connector import azure_ad_connector
+from connectors.github_connector import github_connector
+from connectors.slack_connector import slack_connector
+
+WORKERS = 16
+
+
+@pytest.fixture(autouse=True)
+def run_around_tests() -> Generator[None, None, None]:
+    identity_store.reset()
+    org_hierarchy.reset()
+    request_store.reset()
+    audit_log_store.reset()
+    hr_event_cache.reset()
+    outbox_store.reset()
+    azure_ad_connector.reset()
+    github_connector.reset()
+    slack_connector.reset()
+    certification_engine.reset()
+    yield
+
+
+def _joiner(n: int, department: str = "Engineering") -> Dict[str, Any]:
+    return {
+        "event_id": f"join-{n}",
+        "employee_id": f"CC{n:04d}",
+        "first_name": "Con",
+        "last_name": f"Current{n}",
+        "email": f"con.current{n}@example.com",
+        "department": department,
+        "job_title": "Engineer",
+    }
+
+
+def _run_all(tasks: List[Any]) -> List[Any]:
+    """Run callables on a thread pool, released together by a barrier."""
+    barrier = threading.Barrier(min(len(tasks), WORKERS))
+
+    def run(task: Any) -> Any:
+        try:
+            barrier.wait(timeout=5)
+        except threading.BrokenBarrierError:
+            pass
+        return task()
+
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        return list(pool.map(run, tasks))
+
+
+def test_striped_lock_serialises_a_key_and_not_other_stripes() -> None:
+    locks = StripedLock(stripes=8)
+    key = "EMP1"
+    other = next(
+        f"EMP{i}"
+        for i in range(2, 100)
+        if locks.lock_for(f"EMP{i}") is not locks.lock_for(key)
+    )
+    acquired: Dict[str, bool] = {}
+
+    def probe(name: str) -> None:
+        lock = locks.lock_for(name)
+        acquired[name] = lock.acquire(timeout=0.2)
+        if acquired[name]:
+            lock.release()
+
+    with locks.hold(key):
+        with locks.hold(key):  # Re-entrant
+            threads = [threading.Thread(target=probe, args=(k,)) for k in (key, other)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+    assert acquired == {key: False, other: True}
+
+
+def test_parallel_joiners_and_duplicate_deliveries() -> None:
+    # Every joiner is delivered three times, concurrently
+    tasks = [
+        (lambda n=n: jml_engine.process_event("EmployeeCreated", _joiner(n)))
+        for n in range(40)
+        for _ in range(3)
+    ]
+    results = _run_all(tasks)
+
+    assert all(r["status"] == "success" for r in results)
+    assert sum(1 for r in results if not r.get("duplicate")) == 40
+    assert identity_store.count() == 40
+    slack_ids = [user["id"] for user in slack_connector.users.values()]
+    assert len(slack_ids) == len(set(slack_ids)) == 40
+    for identity in identity_store.list_identities():
+        assert identity.version == 5  # created, entitlements, three accounts
+        assert {"azure_ad", "github", "slack"} <= set(identity.accounts)
+        object_id = identity.accounts["azure_ad_object_id"]
+        assert azure_ad_connector.get_user_groups(object_id) == [
+            "All Users",
+            "Engineering",
+        ]
+
+
+def test_concurrent_movers_for_one_employee_are_serialised() -> None:
+    jml_engine.process_event("EmployeeCreated", _joiner(1))
+    base = identity_store.get_identity_by_employee_id("CC0001")
+    assert base is not None
+    departments = ["Sales", "Engineering", "Marketing", "HR"]
+    movers = [
+        {
+            "employee_id": "CC0001",
+            "department": departments[i % len(departments)],
+            "job_title": f"Title {i}",
+        }
+        for i in range(48)
+    ]
+    # Other employees' events run alongside
+    for n in range(2, 10):
+        jml_engine.process_event("EmployeeCreated", _joiner(n, "Sales"))
+    others = [
+        {"employee_id": f"CC{n:04d}", "job_title": f"Lead {i}"}
+        for n in range(2, 10)
+        for i in range(4)
+    ]
+    tasks = [
+        (lambda payload=payload: jml_engine.process_event("EmployeeUpdated", payload))
+        for payload in movers + others
+    ]
+    results = _run_all(tasks)
+    assert all(r["status"] == "success" for r in results)
+
+    identity = identity_store.get_identity(base.id)
+    assert identity is not None
+    # One store update per mover: none was lost
+    assert identity.version == base.version + len(movers)
+    # Entitlements match the final department exactly
+    expected = set(policy_engine.policy.birthright_access(identity.department))
+    assert set(identity.entitlements) == expected
+    object_id = identity.accounts["azure_ad_object_id"]
+    assert set(azure_ad_connector.get_user_groups(object_id)) == {
+        e.split(":", 1)[1] for e in expected if e.startswith("AzureAD:")
+    }
+
+
+def test_concurrent_approvals_of_one_request() -> None:
+    jml_engine.process_event("EmployeeCreated", _joiner(1))
+    manager = identity_store.get_identity_by_employee_id("CC0001")
+    assert manager is not None
+    jml_engine.process_event(
+        "EmployeeCreated", {**_joiner(2), "manager_id": manager.id}
+    )
+    report = identity_store.get_identity_by_employee_id("CC0002")
+    assert report is not None
+    request = request_engine.submit_request(report.id, "GitHub:Admin", "On call")
+
+    def approve() -> str:
+        try:
+            return request_engine.approve_request(request.id, manager.id).status
+        except ValueError:
+            return "rejected-as-decided"
+
+    outcomes = _run_all([approve for _ in range(12)])
+    assert outcomes.count("approved") == 1
+    assert outcomes.count("rejected-as-decided") == 11
+    grants = [
+        e
+        for e in audit_log_store.get_logs_by_target(report.email)
+        if e.action == "grant_access"
+    ]
+    assert len(grants) == 1
+
+
+def test_concurrent_approve_and_reject_of_one_request() -> None:
+    jml_engine.process_event("EmployeeCreated", _joiner(1))
+    manager = identity_store.get_identity_by_employee_id("CC0001")
+    assert manager is not None
+    jml_engine.process_event(
+        "EmployeeCreated", {**_joiner(2), "manager_id": manager.id}
+    )
+    report = identity_store.get_identity_by_employee_id("CC0002")
+    assert report is not None
+    request = request_engine.submit_request(report.id, "GitHub:Admin", "On call")
+
+    def approve() -> str:
+        try:
+            return request_engine.approve_request(request.id, manager.id).status
+        except ValueError:
+            return "rejected-as-decided"
+
+    def reject() -> str:
+        try:
+            return request_engine.reject_request(request.id, manager.id, "No").status
+        except ValueError:
+            return "rejected-as-decided"
+
+    outcomes = _run_all([approve, reject] * 6)
+    # Exactly one decision wins
+    assert outcomes.count("rejected-as-decided") == 11
+    decided = request_store.get_request(request.id)
+    assert decided is not None and decided.status in outcomes
+    # A rejected request is never provisioned, an approved one exactly once
+    grants = [
+        e
+        for e in audit_log_store.get_logs_by_target(report.email)
+        if e.action == "grant_access"
+    ]
+    assert len(grants) == (1 if decided.status == "approved" else 0)
+
+
+def test_concurrent_certification_decisions_and_revocations() -> None:
+    for n in range(40):
+        jml_engine.process_event("EmployeeCreated", _joiner(n))
+    campaign = certification_engine.create_campaign("Review", "system", "GitHub")
+    items = list(certification_engine.iter_items(campaign.id))
+    assert len(items) == 40
+
+    def decide(item: Dict[str, Any], decision: str) -> Any:
+        return lambda: certification_engine.record_decisions(
+            campaign.id,
+            [{**item, "decision": decision}],
+        )
+
+    # Every item is flipped revoke -> certify -> revoke while batches drain
+    tasks: List[Any] = []
+    for item in items:
+        tasks += [decide(item, d) for d in ("revoke", "certify", "revoke")]
+        tasks.append(lambda: certification_engine.apply_revocations(campaign.id, 3))
+    _run_all(tasks)
+
+    completed = certification_engine.complete_campaign(campaign.id)
+    progress = completed.progress
+    assert progress.decided == 40
+    assert progress.certified + progress.revoked == 40
+    assert progress.revocations_pending == 0
+    held = sum(
+        "GitHub:Engineering" in identity.entitlements
+        for identity in identity_store.list_identities()
+    )
+    # Each applied revocation removed exactly one held entitlement
+    assert progress.revocations_applied == 40 - held
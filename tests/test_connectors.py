@@ -0,0 +1,90 @@
+from typing import Generator
+import pytest
+from connectors.azuread_connector import azure_ad_connector
+from connectors.github_connector import github_connector
+from connectors.membership import MembershipIndex
+from connectors.slack_connector import slack_connector
+
+
+@pytest.fixture(autouse=True)
+def run_around_tests() -> Generator[None, None, None]:
+    # Setup: Clear connectors
+    azure_ad_connector.reset()
+    github_connector.reset()
+    slack_connector.reset()
+    yield
+    # Teardown
+
+
+def test_membership_index_reverse_lookup() -> None:
+    index = MembershipIndex(["general"])
+    assert index.add("general", "alice")
+    assert not index.add("general", "alice")  # Idempotent
+    index.add("engineering", "alice")
+    index.add("general", "bob")
+
+    assert index.groups_of("alice") == ["general", "engineering"]
+    assert index.members_of("general") == ["alice", "bob"]
+
+    assert index.remove("general", "alice")
+    assert not index.remove("general", "alice")
+    assert index.groups_of("alice") == ["engineering"]
+
+    assert index.remove_member("alice") == ["engineering"]
+    assert index.groups_of("alice") == []
+    assert index.members_of("engineering") == []
+    assert index.is_member("general", "bob")
+
+
+def test_github_remove_user_leaves_all_teams() -> None:
+    github_connector.create_user(
+        {"first_name": "Gina", "last_name": "Hub", "email": "gina@example.com"}
+    )
+    github_connector.add_to_team("ginahub", "Engineering")
+    github_connector.add_to_team("ginahub", "DevOps")
+    assert github_connector.get_user_teams("ginahub") == ["Engineering", "DevOps"]
+
+    github_connector.remove_user("ginahub")
+
+    assert github_connector.get_user_teams("ginahub") == []
+    assert "ginahub" not in github_connector.teams["Engineering"]
+    assert "ginahub" not in github_connector.teams["DevOps"]
+
+
+def test_connector_group_membership_queries() -> None:
+    user = azure_ad_connector.create_user({"first_name": "Ada", "last_name": "Zure"})
+    azure_ad_connector.add_to_group(user["objectId"], "Engineering")
+    azure_ad_connector.add_to_group(user["objectId"], "Engineering")
+    assert list(azure_ad_connector.groups["Engineering"]) == [user["objectId"]]
+    assert azure_ad_connector.get_user_groups(user["objectId"]) == ["Engineering"]
+
+    slack_connector.add_to_channel("ada@example.com", "general")
+    slack_connector.remove_from_channel("ada@example.com", "general")
+    slack_connector.remove_from_channel("ada@example.com", "general")
+    assert slack_connector.get_user_channels("ada@example.com") == []
+
+
+def test_bulk_memberships_grouped_by_registry() -> None:
+    from connectors.registry import connector_registry
+
+    accounts = {"azure_ad_object_id": "obj-1", "slack": "U1000"}
+    plan = connector_registry.plan(
+        accounts,
+        "bulk@example.com",
+        ["AzureAD:Sales", "Slack:general", "AzureAD:HR", "GitHub:DevOps", "Jira:X"],
+    )
+    # No GitHub account and no Jira connector: both are left out
+    assert plan == {
+        "AzureAD": [("obj-1", "Sales"), ("obj-1", "HR")],
+        "Slack": [("bulk@example.com", "general")],
+    }
+
+    result = azure_ad_connector.add_to_groups(
+        plan["AzureAD"] + [("obj-2", "Sales"), ("obj-1", "Sales")]
+    )
+    assert result == {"status": "success", "requested": 4, "changed": 3}
+    assert list(azure_ad_connector.groups["Sales"]) == ["obj-1", "obj-2"]
+
+    github_connector.add_to_teams([("ana", "DevOps"), ("ben", "DevOps")])
+    assert github_connector.remove_from_teams([("ana", "DevOps")])["changed"] == 1
+    assert list(github_connector.teams["DevOps"]) == ["ben"]
@@ -0,0 +1,212 @@
+from typing import Generator
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+from backend.main import app
+from backend.stores.identity_store import identity_store
+
+
+@pytest.fixture(autouse=True)
+def run_around_tests() -> Generator[None, None, None]:
+    # Setup
+    identity_store.reset()
+    yield
+    # Teardown
+
+
+def _create() -> str:
+    return identity_store.create_identity(
+        {
+            "employee_id": "PATCH001",
+            "first_name": "Pat",
+            "last_name": "Ch",
+            "email": "pat.ch@example.com",
+            "department": "Engineering",
+            "job_title": "Engineer",
+            "entitlements": ["AzureAD:Engineering"],
+            "accounts": {"github": "patch"},
+        }
+    ).id
+
+
+def test_update_identity_patches_changed_fields_only() -> None:
+    identity_id = _create()
+    original = identity_store.get_identity(identity_id)
+    assert original is not None and original.version == 1
+
+    updated = identity_store.update_identity(
+        identity_id,
+        {"department": "Sales", "job_title": "Engineer", "event_type": "ignored"},
+    )
+
+    assert updated.department == "Sales"
+    assert updated.version == 2
+    assert updated.updated_at >= original.updated_at
+    # The previous instance is untouched and unchanged containers are shared
+    assert original.department == "Engineering"
+    assert updated.accounts is original.accounts
+    assert identity_store.get_identity(identity_id) is updated
+
+
+def test_noop_update_keeps_version() -> None:
+    identity_id = _create()
+    before = identity_store.get_identity(identity_id)
+    after = identity_store.update_identity(
+        identity_id,
+        {"department": "Engineering", "entitlements": ["AzureAD:Engineering"]},
+    )
+    assert after is before
+    assert after.version == 1
+
+
+def test_update_identity_validates_patched_fields() -> None:
+    identity_id = _create()
+    with pytest.raises(ValidationError):
+        identity_store.update_identity(identity_id, {"entitlements": "not-a-list"})
+    identity = identity_store.get_identity(identity_id)
+    assert identity is not None
+    assert identity.version == 1
+    assert identity.entitlements == ["AzureAD:Engineering"]
+
+
+def _populate() -> None:
+    for i in range(12):
+        identity_store.create_identity(
+            {
+                "employee_id": f"LIST{i:03d}",
+                "first_name": "List",
+                "last_name": f"User{11 - i:02d}",
+                "email": f"list{i}@example.com",
+                "department": "Engineering" if i % 3 else "Sales",
+                "job_title": "Engineer",
+                "status": "terminated" if i == 4 else "active",
+            }
+        )
+
+
+def test_query_identities_pages_through_sorted_filtered_results() -> None:
+    _populate()
+    filters = {"department": "Engineering", "status": "active"}
+    pages, cursor = [], None
+    while True:
+        page = identity_store.query_identities(
+            filters, sort="last_name", descending=True, limit=3, cursor=cursor
+        )
+        pages.append([identity.employee_id for identity in page])
+        if len(page) < 3:
+            break
+        cursor = identity_store.cursor_for(page[-1], "last_name")
+    assert pages == [
+        ["LIST001", "LIST002", "LIST005"],
+        ["LIST007", "LIST008", "LIST010"],
+        ["LIST011"],
+    ]
+
+    # The maintained sort order follows updates
+    first = identity_store.get_identity_by_employee_id("LIST011")
+    assert first is not None
+    identity_store.update_identity(first.id, {"last_name": "User99"})
+    top = identity_store.query_identities(filters, "last_name", True, limit=1)
+    assert top[0].employee_id == "LIST011"
+
+    with pytest.raises(ValueError):
+        identity_store.query_identities({"job_title": "Engineer"})
+    with pytest.raises(ValueError):
+        identity_store.query_identities(sort="email", cursor=cursor)
+
+
+def test_list_identities_api_projects_and_supports_etags() -> None:
+    _populate()
+    client = TestClient(app)
+    # The unparameterised listing still returns every full profile
+    everything = client.get("/api/identities").json()
+    assert len(everything) == 12 and "entitlements" in everything[0]
+
+    response = client.get(
+        "/api/identities",
+        params={"department": "Sales", "fields": "id,email", "limit": 2},
+    )
+    assert response.status_code == 200
+    assert [set(item) for item in response.json()] == [{"id", "email"}] * 2
+    etag = response.headers["ETag"]
+
+    second = client.get(
+        "/api/identities",
+        params={
+            "department": "Sales",
+            "fields": "id,email",
+            "limit": 2,
+            "cursor": response.headers["X-Next-Cursor"],
+        },
+    )
+    assert [item["email"] for item in second.json()] == [
+        "list6@example.com",
+        "list9@example.com",
+    ]
+
+    params = {"department": "Sales", "fields": "id,email", "limit": 2}
+    cached = client.get(
+        "/api/identities", params=params, headers={"If-None-Match": etag}
+    )
+    assert cached.status_code == 304 and cached.content == b""
+
+    identity_store.update_identity(response.json()[0]["id"], {"risk_score": "high"})
+    changed = client.get(
+        "/api/identities", params=params, headers={"If-None-Match": etag}
+    )
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
+
+    # Browser frontends on another origin can read the paging headers
+    cross_origin = client.get(
+        "/api/identities", params=params, headers={"Origin": "https://ui.example"}
+    )
+    exposed = cross_origin.headers["Access-Control-Expose-Headers"]
+    assert {h.strip() for h in exposed.split(",")} >= {"X-Next-Cursor", "ETag"}
+
+    assert (
+        client.get("/api/identities", params={"fields": "password"}).status_code == 400
+    )
+    assert client.get("/api/identities", params={"sort": "accounts"}).status_code == 400
+
+
+def test_secondary_indexes_follow_updates() -> None:
+    _populate()
+    manager = identity_store.get_identity_by_employee_id("LIST000")
+    assert manager is not None
+    for employee_id in ("LIST001", "LIST002", "LIST003", "LIST004"):
+        identity = identity_store.get_identity_by_employee_id(employee_id)
+        assert identity is not None
+        identity_store.update_identity(identity.id, {"manager_id": manager.id})
+
+    reports = identity_store.find_identities(
+        department="Engineering", status="active", manager_id=manager.id
+    )
+    assert [identity.employee_id for identity in reports] == ["LIST001", "LIST002"]
+
+    moved = identity_store.get_identity_by_email("list2@example.com")
+    assert moved is not None
+    identity_store.update_identity(
+        moved.id, {"department": "Sales", "email": "list2@sales.example.com"}
+    )
+    assert identity_store.get_identity_by_email("list2@example.com") is None
+    assert identity_store.get_identity_by_email("list2@sales.example.com") == (
+        identity_store.get_identity(moved.id)
+    )
+    assert [
+        identity.employee_id
+        for identity in identity_store.find_identities(
+            department="Engineering", manager_id=manager.id
+        )
+    ] == ["LIST001", "LIST004"]
+    assert len(identity_store.find_identities(department="Sales")) == 5
+    # Sorted index matches and walks over the maintained order agree
+    sales = {"department": "Sales", "status": "active"}
+    assert identity_store.query_identities(sales, "email") == (
+        identity_store.query_identities(sales, "email", limit=100)
+    )
+
+    # A failed update leaves every index untouched
+    with pytest.raises(ValidationError):
+        identity_store.update_identity(moved.id, {"status": None})
+    assert len(identity_store.find_identities(status="active")) == 11
+    assert identity_store.find_identities(department="Legal") == []
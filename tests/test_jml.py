@@ -1,8 +1,12 @@
-from typing import Generator
+import json
+import time
+from typing import Any, Generator, List
 import pytest
 from backend.engines.jml_engine import jml_engine
 from backend.stores.identity_store import identity_store
+from backend.stores.persistence import StoreJournal
 from backend.stores.audit_log import audit_log_store
+from backend.stores.event_cache import EventDedupeCache, hr_event_cache
 
 from connectors.azuread_connector import azure_ad_connector
 from connectors.github_connector import github_connector
@@ -12,15 +16,12 @@ from connectors.slack_connector import slack_connector
 @pytest.fixture(autouse=True)
 def run_around_tests() -> Generator[None, None, None]:
     # Setup: Clear stores and connectors
-    identity_store._identities = {}
-    identity_store._employee_id_map = {}
-    audit_log_store._logs = []
-    azure_ad_connector.users = {}
-    azure_ad_connector.groups = {k: [] for k in azure_ad_connector.groups}
-    github_connector.users = {}
-    github_connector.teams = {k: [] for k in github_connector.teams}
-    slack_connector.users = {}
-    slack_connector.channels = {k: [] for k in slack_connector.channels}
+    identity_store.reset()
+    audit_log_store.reset()
+    hr_event_cache.reset()
+    azure_ad_connector.reset()
+    github_connector.reset()
+    slack_connector.reset()
     yield
     # Teardown
 
@@ -49,6 +50,10 @@ def test_joiner_flow() -> None:
     assert "azure_ad" in identity.accounts
     assert "github" in identity.accounts
 
+    object_id = identity.accounts["azure_ad_object_id"]
+    assert azure_ad_connector.get_object_id(identity.accounts["azure_ad"]) == object_id
+    assert object_id in azure_ad_connector.groups["Engineering"]
+
 
 def test_mover_flow() -> None:
     # 1. Join as Engineering
@@ -106,3 +111,232 @@ def test_leaver_flow() -> None:
     assert identity.status == "terminated"
     assert identity.lifecycle_state == "leaver"
     assert len(identity.entitlements) == 0
+
+    azure_user = azure_ad_connector.get_user(identity.accounts["azure_ad"])
+    assert azure_user is not None
+    assert azure_user["accountEnabled"] is False
+
+
+def test_batch_event_processing() -> None:
+    events = [
+        (
+            "EmployeeCreated",
+            {
+                "employee_id": f"BATCH{i}",
+                "first_name": "Batch",
+                "last_name": f"User{i}",
+                "email": f"batch{i}@example.com",
+                "department": "Sales",
+                "job_title": "Rep",
+            },
+        )
+        for i in range(3)
+    ]
+    events.append(("EmployeeTerminated", {"employee_id": "BATCH0"}))
+    events.append(("EmployeeTerminated", {"employee_id": "MISSING"}))
+
+    results = list(jml_engine.process_events(iter(events)))
+
+    assert [r["status"] for r in results] == [
+        "success",
+        "success",
+        "success",
+        "success",
+        "error",
+    ]
+    assert results[3]["employee_id"] == "BATCH0"
+    identity = identity_store.get_identity_by_employee_id("BATCH0")
+    assert identity is not None
+    assert identity.status == "terminated"
+
+
+def test_batch_endpoint_accepts_array_and_ndjson() -> None:
+    from fastapi.testclient import TestClient
+    from backend.main import app
+
+    client = TestClient(app)
+    joiner = {
+        "event_type": "EmployeeCreated",
+        "employee_id": "NDJ001",
+        "first_name": "Nd",
+        "last_name": "Json",
+        "email": "nd.json@example.com",
+        "department": "Marketing",
+        "job_title": "Marketer",
+    }
+
+    ndjson = "\n".join([json.dumps(joiner), '{"event_type": "EmployeeCreated"}', ""])
+    response = client.post("/api/hr/events:batch", content=ndjson)
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [(r["index"], r["status"]) for r in lines] == [(0, "success"), (1, "error")]
+
+    array = json.dumps([{"event_type": "EmployeeTerminated", "employee_id": "NDJ001"}])
+    response = client.post("/api/hr/events:batch", content=array)
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines == [
+        {
+            "index": 0,
+            "event_type": "EmployeeTerminated",
+            "employee_id": "NDJ001",
+            "status": "success",
+            "message": "Leaver processed",
+        }
+    ]
+
+
+def test_hr_event_stream_parser_handles_split_chunks() -> None:
+    from backend.api.jml import HREventStreamParser
+
+    parser = HREventStreamParser()
+    body = b' [ {"employee_id": "A\xc3\xa9"} , {"employee_id": "B"} ] '
+    records = []
+    for i in range(len(body)):
+        records.extend(parser.feed(body[i : i + 1]))
+    records.extend(parser.close())
+    assert records == [{"employee_id": "Aé"}, {"employee_id": "B"}]
+
+    parser = HREventStreamParser()
+    parser.feed(b'[{"employee_id": "A"}')
+    with pytest.raises(ValueError, match="Unterminated"):
+        parser.close()
+
+    parser = HREventStreamParser()
+    with pytest.raises(ValueError, match="Trailing"):
+        parser.feed(b'[{"employee_id": "A"},]')
+    parser = HREventStreamParser()
+    with pytest.raises(ValueError, match="got ','"):
+        parser.feed(b"[,")
+
+    # A malformed element fails once it outgrows the record cap instead of
+    # being buffered until the end of the body
+    parser = HREventStreamParser(max_record_chars=64)
+    assert parser.feed(b'[{"employee_id": x') == []
+    with pytest.raises(ValueError, match="Malformed"):
+        parser.feed(b" " * 64)
+    parser = HREventStreamParser(max_record_chars=64)
+    with pytest.raises(ValueError, match="exceeds 64"):
+        parser.feed(b'{"employee_id": "' + b"A" * 64)
+
+
+def test_duplex_streaming_response_runs_background_tasks() -> None:
+    import asyncio
+    from starlette.background import BackgroundTask
+    from backend.api.jml import DuplexStreamingResponse
+
+    ran: List[str] = []
+    sent: List[Any] = []
+
+    async def body() -> Any:
+        yield b"line\n"
+
+    async def receive() -> Any:
+        return {"type": "http.disconnect"}
+
+    async def send(message: Any) -> None:
+        sent.append(message)
+
+    response = DuplexStreamingResponse(
+        body(), background=BackgroundTask(ran.append, "done")
+    )
+    asyncio.run(response({"type": "http"}, receive, send))
+    assert sent[-1] == {"type": "http.response.body", "body": b"", "more_body": False}
+    assert ran == ["done"]
+
+
+def test_redelivered_events_are_deduplicated() -> None:
+    joiner = {
+        "event_id": "evt-1",
+        "employee_id": "DUP001",
+        "first_name": "Dee",
+        "last_name": "Dupe",
+        "email": "dee.dupe@example.com",
+        "department": "Sales",
+        "job_title": "Rep",
+    }
+    first = jml_engine.process_event("EmployeeCreated", joiner)
+    again = jml_engine.process_event("EmployeeCreated", joiner)
+    assert again == {**first, "duplicate": True}
+    assert len(identity_store.list_identities()) == 1
+
+    # Errors are not cached: a corrected redelivery is processed
+    mover = {"event_id": "evt-2", "employee_id": "NOPE", "department": "HR"}
+    assert jml_engine.process_event("EmployeeUpdated", mover)["status"] == "error"
+    mover["employee_id"] = "DUP001"
+    assert jml_engine.process_event("EmployeeUpdated", mover)["status"] == "success"
+    assert "duplicate" in jml_engine.process_event("EmployeeUpdated", mover)
+
+
+def test_event_cache_evicts_lru_and_expires(tmp_path: Any) -> None:
+    cache = EventDedupeCache(max_entries=2, ttl_seconds=60)
+    cache.put("a", {"status": "success"})
+    cache.put("b", {"status": "success"})
+    assert cache.get("a") is not None  # "b" is now least recently used
+    cache.put("c", {"status": "success"})
+    assert cache.get("b") is None and len(cache) == 2
+
+    journal = StoreJournal(str(tmp_path))
+    journal.register("hr_events", cache)
+    journal.open()
+    cache.put("d", {"status": "ignored"})
+    journal.close(checkpoint=False)
+
+    restored = EventDedupeCache(max_entries=2, ttl_seconds=60)
+    journal = StoreJournal(str(tmp_path))
+    journal.register("hr_events", restored)
+    journal.open()
+    assert restored.get("d") == {"status": "ignored"}
+    journal.close()
+
+    expired = EventDedupeCache(ttl_seconds=0)
+    expired.put("e", {"status": "success"})
+    time.sleep(0.01)
+    assert expired.get("e") is None
+
+
+def test_mover_only_issues_needed_changes() -> None:
+    jml_engine.process_event(
+        "EmployeeCreated",
+        {
+            "employee_id": "MOV001",
+            "first_name": "Mo",
+            "last_name": "Ver",
+            "email": "mo.ver@example.com",
+            "department": "Engineering",
+            "job_title": "Dev",
+        },
+    )
+    identity = identity_store.get_identity_by_employee_id("MOV001")
+    assert identity is not None
+    identity_store.update_identity(
+        identity.id, {"entitlements": identity.entitlements + ["Jira:Admins"]}
+    )
+
+    # A title change needs no connector calls
+    result = jml_engine.process_event(
+        "EmployeeUpdated", {"employee_id": "MOV001", "job_title": "Lead"}
+    )
+    assert (result["added"], result["removed"], result["connector_calls"]) == (
+        [],
+        [],
+        {},
+    )
+
+    result = jml_engine.process_event(
+        "EmployeeUpdated", {"employee_id": "MOV001", "department": "Sales"}
+    )
+    assert result["added"] == ["AzureAD:Sales", "Salesforce:Users", "Slack:sales"]
+    assert result["removed"] == [
+        "AzureAD:Engineering",
+        "GitHub:Engineering",
+        "Slack:engineering",
+    ]
+    # One bulk grant and one bulk revoke per connector at most
+    assert result["connector_calls"] == {"AzureAD": 2, "Slack": 2, "GitHub": 1}
+
+    identity = identity_store.get_identity_by_employee_id("MOV001")
+    assert identity is not None
+    assert "Jira:Admins" in identity.entitlements  # Ad-hoc grants survive
+    assert "Slack:general" in identity.entitlements
+    assert "mo.ver@example.com" in slack_connector.channels["sales"]
+    assert "mo.ver@example.com" not in slack_connector.channels["engineering"]
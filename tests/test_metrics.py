@@ -0,0 +1,89 @@
+from typing import Generator
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.engines.jml_engine import jml_engine
+from backend.main import app
+from backend.metrics import MetricsRegistry
+from backend.stores.audit_log import audit_log_store
+from backend.stores.event_cache import hr_event_cache
+from backend.stores.identity_store import identity_store
+from backend.stores.outbox_store import outbox_store
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def run_around_tests() -> Generator[None, None, None]:
+    identity_store.reset()
+    audit_log_store.reset()
+    hr_event_cache.reset()
+    outbox_store.reset()
+    yield
+
+
+def test_registry_renders_prometheus_text() -> None:
+    registry = MetricsRegistry()
+    requests = registry.counter("app_requests_total", "Requests", ("path",))
+    latency = registry.histogram(
+        "app_latency_seconds", "Latency", ("path",), buckets=(0.1, 1.0)
+    )
+    registry.gauge("app_queue_depth", "Queued", (), lambda: {(): 3})
+    requests.inc('/a"b')
+    requests.inc('/a"b', amount=2)
+    latency.observe(0.05, "/a")
+    latency.observe(0.5, "/a")
+    latency.observe(5, "/a")
+    with pytest.raises(ValueError):
+        registry.counter("app_requests_total", "Duplicate")
+
+    lines = registry.render().splitlines()
+    assert "# TYPE app_requests_total counter" in lines
+    assert 'app_requests_total{path="/a\\"b"} 3' in lines
+    assert 'app_latency_seconds_bucket{path="/a",le="0.1"} 1' in lines
+    assert 'app_latency_seconds_bucket{path="/a",le="1"} 2' in lines
+    assert 'app_latency_seconds_bucket{path="/a",le="+Inf"} 3' in lines
+    assert 'app_latency_seconds_sum{path="/a"} 5.55' in lines
+    assert 'app_latency_seconds_count{path="/a"} 3' in lines
+    assert "app_queue_depth 3" in lines
+
+
+def test_metrics_endpoint_reports_flows_stages_and_stores() -> None:
+    payload = {
+        "event_id": "metrics-1",
+        "employee_id": "MET001",
+        "first_name": "Mia",
+        "last_name": "Metrics",
+        "email": "mia.metrics@example.com",
+        "department": "Engineering",
+        "job_title": "Engineer",
+    }
+    jml_engine.process_event("EmployeeCreated", payload)
+    jml_engine.process_event("EmployeeCreated", payload)  # Duplicate delivery
+    jml_engine.process_event("EmployeeTerminated", {"employee_id": "MET001"})
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    lines = response.text.splitlines()
+    for prefix in (
+        'iga_hr_events_total{flow="joiner",status="success"}',
+        'iga_hr_events_total{flow="joiner",status="duplicate"}',
+        'iga_jml_flow_duration_seconds_count{flow="leaver"}',
+        'iga_jml_stage_duration_seconds_count{flow="joiner",stage="create_identity"}',
+        'iga_jml_stage_duration_seconds_count{flow="joiner",stage="provision"}',
+        'iga_jml_stage_duration_seconds_count{flow="leaver",stage="disable_accounts"}',
+        'iga_connector_operation_duration_seconds_count{connector="GitHub",'
+        'operation="create_account"}',
+        'iga_connector_operations_total{connector="AzureAD",'
+        'operation="grant_groups",outcome="success"}',
+    ):
+        assert any(line.startswith(prefix + " ") for line in lines), prefix
+    assert 'iga_store_records{store="identity"} 1' in lines
+    assert 'iga_identities{status="terminated"} 1' in lines
+    assert 'iga_queue_depth{queue="outbox_scheduled"} 0' in lines
+    assert (
+        'iga_outbox_operations{status="done"} ' + str(outbox_store.count("done"))
+        in lines
+    )
@@ -0,0 +1,334 @@
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Generator
+import pytest
+from backend.engines.jml_engine import jml_engine
+from backend.engines.outbox_engine import outbox_engine
+from backend.engines.policy_engine import policy_engine
+from backend.engines.request_engine import request_engine
+from backend.stores.audit_log import audit_log_store
+from backend.stores.identity_store import identity_store
+from backend.stores.outbox_store import OutboxStore, outbox_store
+from backend.stores.persistence import StoreJournal
+from backend.stores.request_store import request_store
+
+from connectors.azuread_connector import azure_ad_connector
+from connectors.github_connector import github_connector
+from connectors.registry import connector_registry
+from connectors.slack_connector import slack_connector
+
+JOINER = {
+    "employee_id": "OUT001",
+    "first_name": "Otto",
+    "last_name": "Box",
+    "email": "otto.box@example.com",
+    "department": "Engineering",
+    "job_title": "Engineer",
+}
+
+
+@pytest.fixture(autouse=True)
+def run_around_tests() -> Generator[None, None, None]:
+    identity_store.reset()
+    audit_log_store.reset()
+    request_store.reset()
+    outbox_store.reset()
+    azure_ad_connector.reset()
+    github_connector.reset()
+    slack_connector.reset()
+    yield
+    outbox_engine.stop()
+
+
+def test_failed_connector_call_is_retried_without_replaying_event(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    create_user = azure_ad_connector.create_user
+    calls = []
+
+    def flaky_create_user(user_data: Dict[str, Any]) -> Dict[str, Any]:
+        calls.append(user_data)
+        if len(calls) == 1:
+            raise ConnectionError("AzureAD unavailable")
+        return create_user(user_data)
+
+    monkeypatch.setattr(azure_ad_connector, "create_user", flaky_create_user)
+
+    # The HR event succeeds even though Azure AD is down
+    assert jml_engine.process_event("EmployeeCreated", JOINER)["status"] == "success"
+    identity = identity_store.get_identity_by_employee_id("OUT001")
+    assert identity is not None
+    assert "github" in identity.accounts and "azure_ad" not in identity.accounts
+
+    [failed] = [
+        op for op in outbox_store.list_operations("pending") if op.depends_on is None
+    ]
+    assert failed.attempts == 1 and "AzureAD unavailable" in (failed.last_error or "")
+    # Its group assignment waits for it
+    assert outbox_store.count("pending") == 2
+
+    assert outbox_engine.drain(now=datetime.now() + timedelta(hours=1)) == 2
+    identity = identity_store.get_identity_by_employee_id("OUT001")
+    assert identity is not None
+    object_id = identity.accounts["azure_ad_object_id"]
+    assert object_id in azure_ad_connector.groups["Engineering"]
+    assert outbox_store.count("pending") == 0
+
+    # Resubmitting the same operation is a no-op
+    again = outbox_engine.submit(
+        "create_account",
+        "AzureAD",
+        {"identity_id": identity.id, "system": "AzureAD"},
+        idempotency_key=f"{identity.id}:create:AzureAD",
+    )
+    assert again.id == failed.id and len(calls) == 2
+
+
+def test_dead_lettered_grant_fails_the_request(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    jml_engine.process_event("EmployeeCreated", JOINER)
+    requester = identity_store.get_identity_by_employee_id("OUT001")
+    approver = identity_store.create_identity(
+        {**JOINER, "employee_id": "OUT002", "email": "approver@example.com"}
+    )
+    assert requester is not None
+
+    def broken(memberships: Any) -> Dict[str, Any]:
+        raise RuntimeError("GitHub API error")
+
+    monkeypatch.setattr(connector_registry.get("GitHub"), "add", broken)
+    monkeypatch.setattr(outbox_engine, "max_attempts", 2)
+    req = request_engine.submit_request(requester.id, "GitHub:DevOps", "On call")
+    assert request_engine.approve_request(req.id, approver.id).status == "approved"
+
+    outbox_engine.drain(now=datetime.now() + timedelta(hours=1))
+    [dead] = outbox_store.list_operations("dead")
+    assert dead.attempts == 2 and dead.payload["request_id"] == req.id
+    failed = request_store.get_request(req.id)
+    assert failed is not None and failed.status == "failed"
+    identity = identity_store.get_identity(requester.id)
+    assert identity is not None and "GitHub:DevOps" not in identity.entitlements
+
+    monkeypatch.undo()
+    outbox_store.retry_dead(dead.id)
+    outbox_engine.drain()
+    assert "ottobox" in github_connector.teams["DevOps"]
+
+
+def test_grant_dead_lettered_inline_keeps_the_request_failed(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    jml_engine.process_event("EmployeeCreated", JOINER)
+    requester = identity_store.get_identity_by_employee_id("OUT001")
+    approver = identity_store.create_identity(
+        {**JOINER, "employee_id": "OUT002", "email": "approver@example.com"}
+    )
+    assert requester is not None
+
+    def broken(memberships: Any) -> Dict[str, Any]:
+        raise RuntimeError("GitHub API error")
+
+    monkeypatch.setattr(connector_registry.get("GitHub"), "add", broken)
+    monkeypatch.setattr(outbox_engine, "max_attempts", 1)
+    single = request_engine.submit_request(requester.id, "GitHub:DevOps", "On call")
+    # The grant dead-letters while the approval is still provisioning
+    approved = request_engine.approve_request(single.id, approver.id)
+    assert approved.status == "failed" and approved.approver_id == approver.id
+    assert "GitHub API error" in (approved.comments or "")
+
+    bulk = request_engine.submit_request(requester.id, "GitHub:Admin", "On call")
+    [outcome] = request_engine.decide_requests(
+        approver.id, [{"request_id": bulk.id, "decision": "approve"}]
+    )
+    assert outcome["status"] == "failed"
+    decided = request_store.get_request(bulk.id)
+    assert decided is not None and decided.status == "failed"
+
+
+def test_background_dispatcher_decouples_hr_latency(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    create_user = slack_connector.create_user
+
+    def slow_create_user(user_data: Dict[str, Any]) -> Dict[str, Any]:
+        time.sleep(0.3)
+        return create_user(user_data)
+
+    monkeypatch.setattr(slack_connector, "create_user", slow_create_user)
+    outbox_engine.start()
+
+    started = time.monotonic()
+    assert jml_engine.process_event("EmployeeCreated", JOINER)["status"] == "success"
+    assert time.monotonic() - started < 0.3
+
+    deadline = time.monotonic() + 5
+    while outbox_store.count("done") < outbox_store.count() and (
+        time.monotonic() < deadline
+    ):
+        time.sleep(0.01)
+    outbox_engine.stop()
+    identity = identity_store.get_identity_by_employee_id("OUT001")
+    assert identity is not None
+    assert "otto.box@example.com" in slack_connector.channels["engineering"]
+
+
+def _settle() -> None:
+    """Wait for the background dispatcher to finish every queued operation."""
+    deadline = time.monotonic() + 5
+    while (
+        outbox_store.count("pending") or outbox_store.count("in_progress")
+    ) and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def _azure_down_once(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Fail the first Azure AD account creation, so it waits for a retry."""
+    create_user = azure_ad_connector.create_user
+    calls = []
+
+    def flaky_create_user(user_data: Dict[str, Any]) -> Dict[str, Any]:
+        calls.append(user_data)
+        if len(calls) == 1:
+            raise ConnectionError("AzureAD unavailable")
+        return create_user(user_data)
+
+    monkeypatch.setattr(azure_ad_connector, "create_user", flaky_create_user)
+    monkeypatch.setattr(outbox_engine, "backoff_base_ms", 200)
+
+
+def test_mover_waits_for_an_account_still_being_created(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    _azure_down_once(monkeypatch)
+    outbox_engine.start()
+    moved = {"employee_id": "OUT001", "department": "Sales"}
+    _, result = jml_engine.process_events(
+        [("EmployeeCreated", JOINER), ("EmployeeUpdated", moved)]
+    )
+    # The Azure AD changes are queued behind the account creation
+    assert result["connector_calls"]["AzureAD"] == 2
+    _settle()
+    outbox_engine.stop()
+
+    identity = identity_store.get_identity_by_employee_id("OUT001")
+    assert identity is not None and identity.department == "Sales"
+    object_id = identity.accounts["azure_ad_object_id"]
+    assert set(azure_ad_connector.get_user_groups(object_id)) == {
+        e.split(":", 1)[1]
+        for e in policy_engine.policy.birthright_access("Sales")
+        if e.startswith("AzureAD:")
+    }
+
+
+def test_leaver_disables_an_account_still_being_created(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    _azure_down_once(monkeypatch)
+    outbox_engine.start()
+    left = {"employee_id": "OUT001"}
+    list(
+        jml_engine.process_events(
+            [("EmployeeCreated", JOINER), ("EmployeeTerminated", left)]
+        )
+    )
+    disables = [
+        op for op in outbox_store.list_operations() if op.operation == "disable_account"
+    ]
+    assert {op.connector for op in disables} == {"AzureAD", "GitHub", "Slack"}
+    _settle()
+    outbox_engine.stop()
+
+    assert outbox_store.count("dead") == 0
+    assert not any(user["accountEnabled"] for user in azure_ad_connector.users.values())
+
+
+def test_queued_joiner_work_is_dropped_for_a_leaver(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    _azure_down_once(monkeypatch)
+    add_to_channels = slack_connector.add_to_channels
+    calls = []
+
+    def flaky_add_to_channels(memberships: Any) -> Dict[str, Any]:
+        calls.append(memberships)
+        if len(calls) == 1:
+            raise ConnectionError("Slack unavailable")
+        return add_to_channels(memberships)
+
+    monkeypatch.setattr(slack_connector, "add_to_channels", flaky_add_to_channels)
+    outbox_engine.start()
+    left = {"employee_id": "OUT001"}
+    list(
+        jml_engine.process_events(
+            [("EmployeeCreated", JOINER), ("EmployeeTerminated", left)]
+        )
+    )
+    _settle()
+    outbox_engine.stop()
+
+    # The retried creation and grant find the identity terminated
+    assert azure_ad_connector.users == {}
+    assert all(
+        "otto.box@example.com" not in members
+        for members in slack_connector.channels.values()
+    )
+    assert outbox_store.count("dead") == 0
+
+
+def test_outbox_survives_restart(tmp_path: Any) -> None:
+    store = OutboxStore()
+    journal = StoreJournal(str(tmp_path))
+    journal.register("outbox", store)
+    journal.open()
+    parent, _ = store.enqueue("create_account", "Slack", {}, "k1")
+    child, _ = store.enqueue("grant_groups", "Slack", {}, "k2", depends_on=parent.id)
+    [claimed] = store.claim_ready(datetime.now(), 10)
+    assert claimed.status == "in_progress"
+    journal.close(checkpoint=False)  # Crash mid-attempt
+
+    restored = OutboxStore()
+    journal = StoreJournal(str(tmp_path))
+    journal.register("outbox", restored)
+    journal.open()
+    # The interrupted attempt runs again; the dependent still waits for it
+    assert [op.id for op in restored.claim_ready(datetime.now(), 10)] == [parent.id]
+    restored.complete(parent.id, None)
+    assert [op.id for op in restored.claim_ready(datetime.now(), 10)] == [child.id]
+    journal.close()
+
+
+def test_failing_success_hook_does_not_repeat_connector_call(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    create_user = azure_ad_connector.create_user
+    calls = []
+
+    def counting_create_user(user_data: Dict[str, Any]) -> Dict[str, Any]:
+        calls.append(user_data)
+        return create_user(user_data)
+
+    def broken_hook(payload: Dict[str, Any], result: Any) -> None:
+        raise RuntimeError("identity store unavailable")
+
+    monkeypatch.setattr(azure_ad_connector, "create_user", counting_create_user)
+    monkeypatch.setitem(outbox_engine._success_hooks, "create_account", broken_hook)
+    jml_engine.process_event("EmployeeCreated", JOINER)
+    outbox_engine.drain(now=datetime.now() + timedelta(hours=1))
+
+    assert len(calls) == 1
+    assert outbox_store.count("pending") == 0 and outbox_store.count("dead") == 0
+    assert len(azure_ad_connector.users) == 1
+
+
+def test_done_operations_are_pruned_after_retention() -> None:
+    jml_engine.process_event("EmployeeCreated", JOINER)
+    done = outbox_store.list_operations("done")
+    assert done and outbox_store.count() == len(done)
+    key = done[0].idempotency_key
+
+    assert outbox_engine.prune() == 0  # Still inside the retention period
+    later = datetime.now() + outbox_engine.retention + timedelta(seconds=1)
+    assert outbox_engine.prune(now=later) == len(done)
+    assert outbox_store.count() == 0 and outbox_store.count("done") == 0
+    assert outbox_store.get_by_key(key) is None
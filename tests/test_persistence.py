@@ -0,0 +1,168 @@
+import os
+import time
+from typing import Any, List, Tuple
+
+import pytest
+
+from backend.stores.identity_store import IdentityStore
+from backend.stores.persistence import StoreJournal
+from backend.stores.request_store import RequestStore
+
+
+def _open(directory: str) -> Tuple[StoreJournal, IdentityStore, RequestStore]:
+    identities = IdentityStore()
+    requests = RequestStore()
+    journal = StoreJournal(directory, snapshot_every=1000000)
+    journal.register("identity", identities)
+    journal.register("request", requests)
+    journal.open()
+    return journal, identities, requests
+
+
+def _hire(store: IdentityStore, employee_id: str) -> str:
+    return store.create_identity(
+        {
+            "employee_id": employee_id,
+            "first_name": "Wal",
+            "last_name": employee_id,
+            "email": f"{employee_id.lower()}@example.com",
+            "department": "Engineering",
+            "job_title": "Engineer",
+        }
+    ).id
+
+
+def test_wal_replay_restores_stores(tmp_path: str) -> None:
+    journal, identities, requests = _open(str(tmp_path))
+    alice = _hire(identities, "WAL001")
+    identities.update_identity(alice, {"department": "Sales"})
+    req = requests.create_request(
+        {
+            "requester_id": alice,
+            "target_identity_id": alice,
+            "entitlement": "GitHub:Admin",
+            "justification": "Needed",
+        }
+    )
+    requests.update_request(req.id, {"status": "approved"})
+    # Simulate a crash: durable WAL, no final snapshot
+    journal.close(checkpoint=False)
+
+    journal, identities, requests = _open(str(tmp_path))
+    restored = identities.get_identity_by_employee_id("WAL001")
+    assert restored is not None and restored.department == "Sales"
+    assert [r.id for r in requests.list_requests(status="approved")] == [req.id]
+    assert requests.list_requests(status="pending") == []
+    journal.close(checkpoint=False)
+
+
+def test_snapshot_then_tail_replay(tmp_path: str) -> None:
+    journal, identities, _ = _open(str(tmp_path))
+    for i in range(10):
+        _hire(identities, f"SNAP{i:03d}")
+    snapshot_lsn = journal.checkpoint()
+    assert snapshot_lsn == 10
+    _hire(identities, "TAIL001")
+    journal.close(checkpoint=False)
+
+    files = sorted(os.listdir(tmp_path))
+    assert files == ["snapshot-000000000010.log", "wal-000000000011.log"]
+
+    # Simulate a torn write at the end of the WAL
+    with open(os.path.join(tmp_path, files[1]), "a") as f:
+        f.write('12\tidentity\t{"employee_id": "TO')
+
+    journal, identities, _ = _open(str(tmp_path))
+    assert len(identities.list_identities()) == 11
+    assert identities.get_identity_by_employee_id("TAIL001") is not None
+    assert journal.lsn == 11
+    journal.close()
+
+    # A clean shutdown leaves only the final snapshot to load
+    assert [f for f in os.listdir(tmp_path) if f.startswith("snapshot-")] == [
+        "snapshot-000000000011.log"
+    ]
+
+
+def test_failed_fsync_keeps_flusher_alive(tmp_path: str, monkeypatch: Any) -> None:
+    journal, identities, _ = _open(str(tmp_path))
+    fsync = os.fsync
+    failures = [OSError("I/O error")]
+    broken: List[bool] = []
+
+    def flaky_fsync(fd: int) -> None:
+        if failures:
+            raise failures.pop()
+        if broken:
+            raise OSError("disk gone")
+        fsync(fd)
+
+    monkeypatch.setattr("backend.stores.persistence.os.fsync", flaky_fsync)
+    _hire(identities, "SYNC001")
+    deadline = time.monotonic() + 5
+    while journal.last_error is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert journal.last_error == "I/O error"
+
+    # The flusher keeps running and recovers
+    _hire(identities, "SYNC002")
+    while journal.last_error is not None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert journal.last_error is None
+    # A later successful fsync does not prove the failed one's records
+    # reached the disk; only the final snapshot does
+    assert journal.close(checkpoint=True)
+
+    journal, identities, _ = _open(str(tmp_path))
+    assert identities.get_identity_by_employee_id("SYNC001") is not None
+    broken.append(True)
+    _hire(identities, "SYNC003")
+    with pytest.raises(OSError):
+        journal.sync()
+    assert not journal.close(checkpoint=False)
+
+
+def test_replay_does_not_reroute_requests(tmp_path: str, monkeypatch: Any) -> None:
+    from backend.engines.request_engine import request_engine
+    from backend.stores.identity_store import identity_store
+    from backend.stores.org_hierarchy import org_hierarchy
+    from backend.stores.request_store import request_store
+
+    def reopen() -> StoreJournal:
+        for store in (identity_store, request_store, org_hierarchy):
+            store.reset()
+        journal = StoreJournal(str(tmp_path), snapshot_every=1000000)
+        journal.register("identity", identity_store)
+        journal.register("request", request_store)
+        journal.open()
+        return journal
+
+    journal = reopen()
+    manager = _hire(identity_store, "WALMGR")
+    other = _hire(identity_store, "WALMGR2")
+    alice = _hire(identity_store, "WAL005")
+    identity_store.update_identity(alice, {"manager_id": manager})
+    req = request_engine.submit_request(alice, "GitHub:Admin", "Needed")
+    identity_store.update_identity(alice, {"manager_id": other})
+    identity_store.update_identity(other, {"status": "terminated"})
+    journaled = request_store.get_request(req.id)
+    journal.close(checkpoint=False)
+
+    updates: List[str] = []
+    update_request = request_store.update_request
+
+    def counting_update(request_id: str, changes: Any) -> Any:
+        updates.append(request_id)
+        return update_request(request_id, changes)
+
+    monkeypatch.setattr(request_store, "update_request", counting_update)
+    journal = reopen()
+    try:
+        # Replayed moves and leavers rebuild the hierarchy but act on nothing
+        assert updates == []
+        assert request_store.get_request(req.id) == journaled
+        assert org_hierarchy.management_chain(alice) == [other]
+    finally:
+        journal.close(checkpoint=False)
+        for store in (identity_store, request_store, org_hierarchy):
+            store.reset()
@@ -0,0 +1,281 @@
+import json
+import os
+from typing import Any, Dict
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.engines.policy_engine import PolicyEngine, policy_engine
+from backend.engines.risk_engine import risk_engine
+from backend.main import app
+from backend.stores.identity_store import identity_store
+
+POLICY: Dict[str, Any] = {
+    "version": "v1",
+    "base_access": ["AzureAD:All Users"],
+    "birthright": {
+        "Engineering": ["GitHub:Engineering", "Slack:engineering"],
+        "Sales": ["Salesforce:Users", "Slack:sales"],
+        "Legal": ["AzureAD:Legal"],
+    },
+    "sod_rules": [
+        {"conflicting_groups": ["Salesforce:Users", "GitHub:Admin"], "severity": "high"}
+    ],
+}
+
+
+def _write_policy(path: Any, document: Any, mtime: float) -> str:
+    with open(path, "w") as f:
+        f.write(json.dumps(document) if isinstance(document, dict) else document)
+    os.utime(path, (mtime, mtime))
+    return str(path)
+
+
+def _engine_with_rules() -> PolicyEngine:
+    engine = PolicyEngine()
+    engine.set_sod_rules(
+        [
+            {
+                "conflicting_groups": {"AzureAD:Sales", "AzureAD:Finance-Admin"},
+                "severity": "critical",
+            },
+            {
+                "conflicting_groups": {"AzureAD:HR", "AzureAD:Engineering"},
+                "severity": "high",
+            },
+            {
+                "conflicting_groups": {
+                    "GitHub:Admin",
+                    "AzureAD:Engineering",
+                    "Slack:audit",
+                },
+                "severity": "medium",
+            },
+        ]
+        + [
+            {
+                "conflicting_groups": {f"App{i}:Read", f"App{i}:Approve"},
+                "severity": "low",
+            }
+            for i in range(1000)
+        ]
+    )
+    return engine
+
+
+def test_check_sod_violations_uses_compiled_index() -> None:
+    engine = _engine_with_rules()
+    assert engine.check_sod_violations(["AzureAD:Sales", "Slack:general"]) == []
+
+    violations = engine.check_sod_violations(
+        ["AzureAD:Engineering", "AzureAD:HR", "App7:Read", "App7:Approve"]
+    )
+    assert len(violations) == 2
+    assert "(Severity: high)" in violations[0]
+    assert "(Severity: low)" in violations[1]
+
+    three_way = ["GitHub:Admin", "AzureAD:Engineering", "Slack:audit"]
+    assert len(engine.check_sod_violations(three_way)) == 1
+    assert engine.check_sod_violations(three_way[:2]) == []
+
+
+def test_incremental_check_only_reports_new_violations() -> None:
+    engine = _engine_with_rules()
+    current = ["AzureAD:Engineering", "AzureAD:HR", "GitHub:Admin"]
+
+    # The existing Engineering/HR conflict is not re-reported
+    assert engine.check_sod_for_addition(current, "App1:Read") == []
+    added = engine.check_sod_for_addition(current, "Slack:audit")
+    assert len(added) == 1 and "(Severity: medium)" in added[0]
+    # Already held entitlements introduce nothing new
+    assert engine.check_sod_for_addition(current, "AzureAD:HR") == []
+
+
+def test_incremental_and_full_checks_agree() -> None:
+    engine = _engine_with_rules()
+    current = ["AzureAD:Sales", "App3:Approve"]
+    for new in ["AzureAD:Finance-Admin", "App3:Read", "App4:Read"]:
+        before = set(engine.check_sod_violations(current))
+        after = set(engine.check_sod_violations(current + [new]))
+        assert set(engine.check_sod_for_addition(current, new)) == after - before
+
+
+def test_birthright_access_includes_base_and_department() -> None:
+    engine = PolicyEngine()
+    access = engine.calculate_birthright_access("Engineering")
+    assert {"AzureAD:All Users", "Slack:general", "GitHub:Engineering"} <= set(access)
+    revoked = engine.get_revocation_list("Engineering", "Sales")
+    assert "GitHub:Engineering" in revoked
+    assert not set(revoked) & set(engine.calculate_birthright_access("Sales"))
+
+
+def test_policy_file_is_precompiled_per_department(tmp_path: Any) -> None:
+    path = _write_policy(tmp_path / "policy.json", POLICY, 1000)
+    engine = PolicyEngine(path, departments=["Engineering", "Sales", "HR"])
+
+    assert engine.policy_version == "v1"
+    # Legal is not a configured department; HR has no table in the file
+    assert set(engine.birthright_policies) == {"Engineering", "Sales"}
+    assert engine.calculate_birthright_access("HR") == ["AzureAD:All Users"]
+    assert engine.calculate_birthright_access("Sales") == [
+        "AzureAD:All Users",
+        "Salesforce:Users",
+        "Slack:sales",
+    ]
+    assert engine.get_revocation_list("Engineering", "Sales") == [
+        "GitHub:Engineering",
+        "Slack:engineering",
+    ]
+    assert engine.compute_access_diff(
+        ["AzureAD:All Users", "GitHub:Engineering", "GitHub:Admin"],
+        "Engineering",
+        "Sales",
+    ) == (["Salesforce:Users", "Slack:sales"], ["GitHub:Engineering"])
+    [violation] = engine.check_sod_violations(["Salesforce:Users", "GitHub:Admin"])
+    assert "(Severity: high)" in violation
+
+
+def test_policy_hot_reload_is_atomic(tmp_path: Any) -> None:
+    path = _write_policy(tmp_path / "policy.json", POLICY, 1000)
+    engine = PolicyEngine(path)
+    assert engine.reload_if_changed() is False
+
+    old = engine.policy
+    updated = {**POLICY, "version": "v2", "birthright": {"Sales": ["Slack:sales"]}}
+    _write_policy(path, updated, 2000)
+    assert engine.reload_if_changed() is True
+    assert engine.policy_version == "v2"
+    assert engine.get_revocation_list("Engineering", "Sales") == []
+    # A reader holding the old policy keeps consistent v1 answers
+    assert old.version == "v1" and "GitHub:Engineering" in old.revocations(
+        "Engineering", "Sales"
+    )
+
+    # A broken file is rejected and v2 stays in force
+    _write_policy(path, "{not json", 3000)
+    with pytest.raises(ValueError):
+        engine.reload()
+    assert engine.reload_if_changed() is False
+    _write_policy(path, {**POLICY, "version": ""}, 4000)
+    assert engine.reload_if_changed() is False
+    assert engine.policy_version == "v2"
+
+
+def test_policy_version_is_stamped_on_results(tmp_path: Any) -> None:
+    from backend.engines.jml_engine import jml_engine
+
+    identity_store.reset()
+    client = TestClient(app)
+    assert client.get("/api/policy").json()["version"] == policy_engine.policy_version
+
+    original = policy_engine.policy_file
+    path = _write_policy(tmp_path / "policy.json", {**POLICY, "version": "v9"}, 1000)
+    try:
+        policy_engine.reload(path)
+        result = jml_engine.process_event(
+            "EmployeeCreated",
+            {
+                "employee_id": "POL001",
+                "first_name": "Paula",
+                "last_name": "Icy",
+                "email": "paula.icy@example.com",
+                "department": "Sales",
+                "job_title": "Rep",
+            },
+        )
+        assert result["policy_version"] == "v9"
+        moved = jml_engine.process_event(
+            "EmployeeUpdated", {"employee_id": "POL001", "department": "Engineering"}
+        )
+        assert moved["policy_version"] == "v9"
+        assert moved["removed"] == ["Salesforce:Users", "Slack:sales"]
+        scan = risk_engine.scan_population(update_risk=False, use_numpy=False)
+        assert scan["policy_version"] == "v9"
+
+        _write_policy(path, "[]", 2000)
+        response = client.post("/api/policy/reload")
+        assert response.status_code == 400
+        assert client.get("/api/policy").json()["version"] == "v9"
+    finally:
+        policy_engine.reload(original)
+
+
+def test_population_scan_numpy_matches_python() -> None:
+    pytest.importorskip("numpy")
+    identity_store.reset()
+    profiles = [
+        ["AzureAD:Sales", "AzureAD:Finance-Admin"],  # critical
+        ["AzureAD:Engineering", "AzureAD:HR", "Slack:general"],  # high
+        ["AzureAD:Engineering", "Slack:general"],
+        [],
+    ]
+    for i, entitlements in enumerate(profiles):
+        identity_store.create_identity(
+            {
+                "employee_id": f"SCAN{i}",
+                "first_name": "Scan",
+                "last_name": str(i),
+                "email": f"scan{i}@example.com",
+                "department": "Sales",
+                "job_title": "Rep",
+                "entitlements": entitlements,
+                "risk_score": "medium",
+            }
+        )
+
+    python_result = risk_engine.scan_population(update_risk=False, use_numpy=False)
+    numpy_result = risk_engine.scan_population(use_numpy=True, chunk_size=3)
+
+    assert numpy_result["engine"] == "numpy"
+    assert numpy_result["violations"] == python_result["violations"]
+    assert [v["severity"] for v in numpy_result["violations"]] == ["critical", "high"]
+    assert numpy_result["risk_scores_updated"] == 4
+    scores = [identity.risk_score for identity in identity_store.list_identities()]
+    assert scores == ["critical", "high", "low", "low"]
+
+    # A second scan has nothing left to update
+    assert risk_engine.scan_population()["risk_scores_updated"] == 0
+
+
+def test_population_scan_does_not_overwrite_concurrent_changes(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    identity_store.reset()
+    ids = [
+        identity_store.create_identity(
+            {
+                "employee_id": f"RACE{i}",
+                "first_name": "Race",
+                "last_name": str(i),
+                "email": f"race{i}@example.com",
+                "department": "Sales",
+                "job_title": "Rep",
+                "entitlements": entitlements,
+            }
+        ).id
+        for i, entitlements in enumerate(
+            [
+                ["AzureAD:Sales", "AzureAD:Finance-Admin"],  # critical
+                ["AzureAD:Engineering", "Slack:general"],
+            ]
+        )
+    ]
+    scan_python = risk_engine._scan_python
+
+    def scan_during_changes(*args: Any) -> Any:
+        matches = scan_python(*args)
+        # Access changes after the snapshot, before scores are written
+        identity_store.update_identity(ids[0], {"entitlements": ["AzureAD:Sales"]})
+        identity_store.update_identity(
+            ids[1],
+            {"entitlements": ["AzureAD:Engineering", "AzureAD:HR", "Slack:general"]},
+        )
+        return matches
+
+    monkeypatch.setattr(risk_engine, "_scan_python", scan_during_changes)
+    result = risk_engine.scan_population(use_numpy=False)
+
+    scores = [identity.risk_score for identity in identity_store.list_identities()]
+    # Both are scored from their current access, not the scanned snapshot
+    assert scores == ["low", "high"]
+    assert result["risk_scores_updated"] == 1
@@ -0,0 +1,74 @@
+import threading
+import time
+from typing import Any, List
+import pytest
+from backend.engines.provision_engine import ProvisionEngine, ProvisionTask
+
+
+def test_independent_connectors_run_concurrently() -> None:
+    engine = ProvisionEngine(max_workers=8)
+    calls: List[str] = []
+
+    def op(name: str, delay: float = 0.05) -> Any:
+        def call() -> str:
+            time.sleep(delay)
+            calls.append(name)
+            return name
+
+        return call
+
+    tasks = [
+        ProvisionTask("azure", "AzureAD", op("azure")),
+        ProvisionTask("slack", "Slack", op("slack")),
+        ProvisionTask("github", "GitHub", op("github")),
+    ]
+    started = time.monotonic()
+    results, errors = engine.execute(tasks)
+    elapsed = time.monotonic() - started
+
+    # One round of 50ms, not three sequential calls
+    assert elapsed < 0.12
+    assert results == {"azure": "azure", "slack": "slack", "github": "github"}
+    assert errors == {} and sorted(calls) == ["azure", "github", "slack"]
+    engine.shutdown()
+
+
+def test_connector_concurrency_limit_and_failures() -> None:
+    engine = ProvisionEngine(max_workers=8, concurrency={"GitHub": 2})
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def add_team() -> None:
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.02)
+        with lock:
+            active -= 1
+
+    engine.execute([ProvisionTask(f"t{i}", "GitHub", add_team) for i in range(8)])
+    assert peak == 2
+
+    def fail() -> None:
+        raise RuntimeError("connector down")
+
+    def interrupted() -> None:
+        raise KeyboardInterrupt
+
+    ran: List[str] = []
+    tasks = [
+        ProvisionTask("create", "Slack", fail),
+        ProvisionTask("interrupted", "Slack", interrupted),
+        ProvisionTask("azure", "AzureAD", lambda: ran.append("azure")),
+    ]
+    # Failures, including ones outside Exception, are reported per task
+    results, errors = engine.execute(tasks)
+    assert ran == ["azure"] and list(results) == ["azure"]
+    assert isinstance(errors["create"], RuntimeError)
+    assert isinstance(errors["interrupted"], KeyboardInterrupt)
+
+    with pytest.raises(ValueError, match="Duplicate"):
+        engine.execute([ProvisionTask("a", "Slack", fail)] * 2)
+    engine.shutdown()
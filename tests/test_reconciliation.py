@@ -0,0 +1,117 @@
+from typing import Generator
+import pytest
+from fastapi.testclient import TestClient
+from backend.engines.jml_engine import jml_engine
+from backend.engines.reconciliation_engine import reconciliation_engine
+from backend.main import app
+from backend.stores.audit_log import audit_log_store
+from backend.stores.identity_store import IdentityProfile, identity_store
+from backend.stores.outbox_store import outbox_store
+
+from connectors.azuread_connector import azure_ad_connector
+from connectors.github_connector import github_connector
+from connectors.slack_connector import slack_connector
+
+
+@pytest.fixture(autouse=True)
+def run_around_tests() -> Generator[None, None, None]:
+    identity_store.reset()
+    audit_log_store.reset()
+    outbox_store.reset()
+    azure_ad_connector.reset()
+    github_connector.reset()
+    slack_connector.reset()
+    reconciliation_engine.reset()
+    yield
+
+
+def _hire(employee_id: str, first_name: str) -> IdentityProfile:
+    jml_engine.process_event(
+        "EmployeeCreated",
+        {
+            "employee_id": employee_id,
+            "first_name": first_name,
+            "last_name": "Recon",
+            "email": f"{first_name.lower()}.recon@example.com",
+            "department": "Engineering",
+            "job_title": "Engineer",
+        },
+    )
+    identity = identity_store.get_identity_by_employee_id(employee_id)
+    assert identity is not None
+    return identity
+
+
+def test_incremental_runs_only_rediff_what_changed() -> None:
+    alice = _hire("REC001", "Alice")
+    bob = _hire("REC002", "Bob")
+
+    first = reconciliation_engine.run()
+    assert first["mode"] == "full" and first["identities_checked"] == 2
+    assert first["drift"] == [] and first["orphan_accounts"] == []
+    assert reconciliation_engine.run()["identities_checked"] == 0
+
+    # Out-of-band changes in the connectors
+    azure_ad_connector.remove_from_group(
+        alice.accounts["azure_ad_object_id"], "Engineering"
+    )
+    slack_connector.add_to_channel(alice.email, "sales")
+    github_connector.create_user(
+        {"first_name": "Mallory", "last_name": "X", "email": "m@example.com"}
+    )
+    github_connector.add_to_team("malloryx", "DevOps")
+    # Changes that do not affect memberships are not re-diffed
+    identity_store.update_identity(bob.id, {"risk_score": "high"})
+
+    report = reconciliation_engine.run()
+    assert report["mode"] == "incremental" and report["identities_checked"] == 1
+    [drift] = report["drift"]
+    assert drift["identity_id"] == alice.id
+    assert drift["missing"] == ["AzureAD:Engineering"]
+    assert drift["excess"] == ["Slack:sales"]
+    assert report["orphan_accounts"] == [{"system": "GitHub", "account": "malloryx"}]
+    assert report["orphan_memberships"] == [
+        {"system": "GitHub", "member": "malloryx", "groups": ["DevOps"]}
+    ]
+
+    # Findings carry over to runs that have nothing new to check
+    again = reconciliation_engine.run()
+    assert again["identities_checked"] == 0 and again["drift"] == report["drift"]
+
+    # Entitlement changes on the identity side are picked up too
+    identity_store.update_identity(
+        bob.id, {"entitlements": bob.entitlements + ["GitHub:DevOps"]}
+    )
+    drift_by_id = {d["identity_id"]: d for d in reconciliation_engine.run()["drift"]}
+    assert drift_by_id[bob.id]["missing"] == ["GitHub:DevOps"]
+    assert drift_by_id[alice.id]["excess"] == ["Slack:sales"]
+
+
+def test_remediation_repairs_drift_through_the_outbox() -> None:
+    alice = _hire("REC001", "Alice")
+    reconciliation_engine.run()
+    slack_connector.remove_from_channel(alice.email, "engineering")
+    github_connector.add_to_team(alice.accounts["github"], "Frontend")
+
+    client = TestClient(app)
+    response = client.post("/api/reconciliation/run", params={"remediate": True})
+    assert response.status_code == 200
+    assert response.json()["remediation_ops"] == 2
+    assert alice.email in slack_connector.channels["engineering"]
+    assert alice.accounts["github"] not in github_connector.teams["Frontend"]
+
+    after = client.post("/api/reconciliation/run").json()
+    assert after["identities_checked"] == 1 and after["drift"] == []
+    assert client.get("/api/reconciliation/report").json() == after
+
+
+def test_full_run_after_leaver_reports_stale_memberships() -> None:
+    alice = _hire("REC001", "Alice")
+    jml_engine.process_event("EmployeeTerminated", {"employee_id": "REC001"})
+
+    report = reconciliation_engine.run(full=True)
+    [drift] = report["drift"]
+    assert drift["status"] == "terminated" and drift["missing"] == []
+    assert "Slack:engineering" in drift["excess"]
+    assert "AzureAD:Engineering" in drift["excess"]
+    assert alice.id == drift["identity_id"]